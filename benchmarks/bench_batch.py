@@ -0,0 +1,72 @@
+'''
+Frame time of a population drawn as one grob per shape, against the
+batched markers and polylines grobs built from coordinate arrays: dots
+in two styles, as the ants are drawn, and closed polylines with a color
+each, as the boids' arrows and the pheromone cells are.
+
+    python benchmarks/bench_batch.py [shapes ...]
+'''
+from pypaint.types.canvas  import PILCanvas
+from pypaint.shape         import shape
+from pypaint.batch         import markers, polylines
+
+from common import best_of, report
+
+import numpy
+import sys
+
+SIZES = [1000, 10000]
+
+WIDTH, HEIGHT = 1000, 1000
+
+def main(sizes):
+    canvas = PILCanvas(WIDTH, HEIGHT, gtk=True)
+
+    for size in sizes:
+        numpy.random.seed(size)
+        position = numpy.random.random((size, 2)) * (WIDTH, HEIGHT)
+        chosen   = numpy.random.random(size) < 0.1
+        alpha    = numpy.random.random(size)
+
+        def ovals():
+            s = shape()
+            for (x, y), c in zip(position, chosen):
+                oval = s.oval(x, y, 3, 3)
+                if c:
+                    oval.fill_color = (0.6, 0.8, 0)
+                else:
+                    oval.fill_color = (0.8, 0.8, 0.8, 0.5)
+                canvas.add(oval)
+        def batched_ovals():
+            dots = markers(position[chosen, 0], position[chosen, 1], 3)
+            dots.fill_color = (0.6, 0.8, 0)
+            canvas.add(dots)
+            dots = markers(position[~chosen, 0], position[~chosen, 1], 3)
+            dots.fill_color = (0.8, 0.8, 0.8, 0.5)
+            canvas.add(dots)
+
+        def squares():
+            s = shape()
+            for (x, y), a in zip(position, alpha):
+                rect = s.rectangle(x, y, 5, 5)
+                rect.fill_color = (0.8, 0.8, 0.8, a)
+                canvas.add(rect)
+        def batched_squares():
+            corners = numpy.empty((size, 4, 2))
+            corners[:, :, 0] = position[:, 0, None] + [0, 5, 5, 0]
+            corners[:, :, 1] = position[:, 1, None] + [0, 0, 5, 5]
+            colors = numpy.empty((size, 4))
+            colors[:, :3] = 0.8
+            colors[:, 3]  = alpha
+            canvas.add(polylines(corners.reshape(-1, 2), numpy.arange(size) * 4, colors, closed=True))
+
+        for (name, build) in [("ovals", ovals), ("markers", batched_ovals),
+                              ("rectangles", squares), ("polylines", batched_squares)]:
+            def frame():
+                canvas.begin_frame()
+                build()
+                canvas.draw()
+            report("frame, %d %s" % (size, name), best_of(frame), size, "shape")
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
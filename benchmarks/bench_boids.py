@@ -0,0 +1,48 @@
+'''
+Frame time of a flock update with the rules computed over the flock's
+arrays, against the per boid rules the update used to loop over (for
+small flocks only: they visit every pair of boids).
+
+    python benchmarks/bench_boids.py [boids ...]
+'''
+from pypaint.library.boids import Boids
+
+from common import best_of, report
+
+import numpy
+import sys
+
+SIZES = [1000, 10000, 100000]
+
+## the per boid rules above this many boids take too long to time
+LOOP_LIMIT = 1000
+
+def loop_update(flock):
+    ## the rules as the update applied them, one boid at a time
+    for b in flock:
+        vx1, vy1, vz1 = b.cohesion(100)
+        vx2, vy2, vz2 = b.separation(10)
+        vx3, vy3, vz3 = b.alignment(5)
+        b.vx += vx1 + vx2 + vx3
+        b.vy += vy1 + vy2 + vy3
+        b.vz += vz1 + vz2 + vz3
+        b.limit(30)
+        b.x += b.vx
+        b.y += b.vy
+        b.z += b.vz
+
+def main(sizes):
+    for size in sizes:
+        numpy.random.seed(size)
+        flock = Boids(size, 0, 0, 500, 500)
+        flock.goal(250, 250, 0)
+        flock.noperch()
+
+        report("update, %d boids" % size, best_of(lambda: flock.update(goal=60)), size, "boid")
+        report("update, %d boids, radius 30" % size,
+               best_of(lambda: flock.update(goal=60, radius=30)), size, "boid")
+        if size <= LOOP_LIMIT:
+            report("per boid rules, %d boids" % size, best_of(lambda: loop_update(flock)), size, "boid")
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
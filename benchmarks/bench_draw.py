@@ -0,0 +1,57 @@
+'''
+Per-grob overhead of PILCanvas.draw, with and without the batched
+Draw.paths() entry point, and the cost of a new canvas per frame.
+
+    python benchmarks/bench_draw.py [grobs]
+'''
+from pypaint.types.canvas  import PILCanvas
+from pypaint.shape         import shape
+from pypaint.utils.p_random import random
+
+from common import best_of, report
+
+import sys
+
+WIDTH, HEIGHT = 1000, 1000
+
+def scene(count):
+    s = shape()
+    grobs = []
+    for i in xrange(count):
+        r = s.rectangle(random(WIDTH), random(HEIGHT), 10, 10)
+        r.fill_color = (random(), random(), random(), 0.5)
+        if i % 2:
+            r.stroke_color = (0.0, 0.0, 0.0, 1.0)
+        grobs.append(r)
+    return grobs
+
+def main(count=50000):
+    grobs  = scene(count)
+    canvas = PILCanvas(WIDTH, HEIGHT)
+
+    if not canvas.batch_paths:
+        print "aggdraw has no Draw.paths(), only the per-grob path is timed"
+
+    canvas.batch_paths = False
+    report("draw, one call per grob", best_of(lambda: canvas.draw(grobs)), count)
+
+    if hasattr(canvas.AGG_canvas, "paths"):
+        canvas.batch_paths = True
+        report("draw, batched Draw.paths()", best_of(lambda: canvas.draw(grobs)), count)
+
+    ## an animation frame: a fresh canvas each time, or one canvas
+    ## cleared with begin_frame()
+    frame = grobs[:1000]
+    def new_canvas():
+        PILCanvas(WIDTH, HEIGHT).draw(frame)
+    def reused():
+        canvas.begin_frame()
+        canvas.draw(frame)
+    report("frame, new canvas", best_of(new_canvas, number=20), len(frame))
+    report("frame, begin_frame()", best_of(reused, number=20), len(frame))
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,33 @@
+'''
+Frames per second of render_frames on a supershape morph, from one
+worker process up to the number of CPUs.
+
+    python benchmarks/bench_frames.py [frames]
+'''
+from pypaint.render            import render_frames
+from pypaint.library.supershape import path
+
+from common import best_of, report
+
+from math import sin, cos
+
+import multiprocessing
+import sys
+
+def morph(ctx):
+    i = ctx.FRAME * 0.05
+    ctx.rotate(i * 10)
+    p = path(ctx, 200, 200, 100, 100, 12, 5.0 + sin(i), 10 + cos(i) * 10, sin(i) * 10)
+    ctx.drawpath(p)
+
+def main(frames=200):
+    workers = 1
+    while workers <= multiprocessing.cpu_count():
+        def run():
+            for result in render_frames(morph, range(frames), 400, 400, workers=workers):
+                pass
+        report("render_frames, %d worker(s)" % workers, best_of(run, repeat=1), frames, "frame")
+        workers *= 2
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,121 @@
+'''
+Startup cost of the pypaint entry points, each imported in a fresh
+interpreter. Prints the import time of every module the entry point
+loads, like python -X importtime does on newer Pythons, then the wall
+time of the whole import.
+
+    python benchmarks/bench_import.py [-q] [module ...]
+
+Drawing modules must not load fontTools, the text stack, the library
+or gtk until they are used; the run exits with status 1 if importing
+an entry point pulls in one of LAZY, or if an entry point fails to
+import at all.
+'''
+from common import best_of, report
+
+import subprocess
+import sys
+
+ENTRY_POINTS = ["pypaint.canvas", "pypaint.context", "pypaint.interfaces.PIL.canvas"]
+
+## modules (and their submodules) that load on first use
+LAZY = ["fontTools", "pypaint.types.text", "pypaint.library", "gtk"]
+
+## run in the child: times every import that loads a new module, then
+## prints one line per module, innermost first, and the loaded modules
+CHILD = r'''
+import __builtin__, sys, time
+
+_import = __builtin__.__import__
+nested  = [0.0]
+times   = []
+
+def timed_import(name, *args):
+    if name in sys.modules:
+        return _import(name, *args)
+    nested.append(0.0)
+    start = time.time()
+    try:
+        return _import(name, *args)
+    finally:
+        elapsed = time.time() - start
+        inner = nested.pop()
+        nested[-1] += elapsed
+        times.append((len(nested) - 1, name, elapsed - inner, elapsed))
+
+__builtin__.__import__ = timed_import
+__import__(sys.argv[1])
+__builtin__.__import__ = _import
+
+for (depth, name, own, cumulative) in times:
+    print "import time: %9d | %9d | %s%s" % (own * 1e6, cumulative * 1e6, "  " * depth, name)
+print "loaded:", " ".join(sorted([name for name in sys.modules if sys.modules[name] is not None]))
+'''
+
+def run_python(code, *args):
+    process = subprocess.Popen([sys.executable, "-c", code] + list(args),
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    (out, err) = process.communicate()
+    if process.returncode:
+        ## the last line of the traceback
+        raise ImportError(err.strip().splitlines()[-1].split(": ", 1)[-1])
+    return out
+
+def startup(module):
+    '''
+    Returns a function that imports module in a new interpreter.
+    '''
+    def run():
+        run_python("import " + module)
+    return run
+
+def lazy_loaded(module, loaded):
+    '''
+    Returns the modules importing module loaded that should have been
+    left to load on first use.
+    '''
+    found = []
+    for name in loaded:
+        if module == name or module.startswith(name + "."):
+            continue
+        for lazy in LAZY:
+            if name == lazy or name.startswith(lazy + "."):
+                found.append(name)
+    return found
+
+def main(argv):
+    quiet = "-q" in argv
+    modules = [arg for arg in argv if arg != "-q"] or ENTRY_POINTS
+
+    failed = False
+    interpreter = best_of(lambda: run_python("pass"), repeat=5)
+    report("interpreter startup", interpreter)
+
+    for module in modules:
+        try:
+            out = run_python(CHILD, module)
+        except ImportError, e:
+            ## an entry point that can't be imported fails the run
+            print "%-40s failed (%s)" % (module, e)
+            failed = True
+            continue
+
+        lines  = out.splitlines()
+        loaded = lines[-1].split()[1:]
+        if not quiet:
+            print "\n".join(lines[:-1])
+
+        seconds = best_of(startup(module), repeat=5)
+        report("import " + module, seconds - interpreter)
+
+        eager = lazy_loaded(module, loaded)
+        if eager:
+            print "  loaded at import time:", ", ".join(eager)
+            failed = True
+
+    if failed:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,56 @@
+'''
+Memory and bounds time of a long path stored as a list of PathElements
+and as a compact PathBuffer.
+
+    python benchmarks/bench_pathbuffer.py [vertices]
+'''
+from pypaint.types.paths      import PathElement
+from pypaint.types.pathbuffer import PathBuffer
+from pypaint.utils.defaults   import *
+
+from common import best_of, report
+
+from math import sin, cos
+
+import sys
+
+def listsize(elements):
+    ## the list, each element instance with its __dict__, and its values
+    size = sys.getsizeof(elements)
+    for element in elements:
+        size += sys.getsizeof(element) + sys.getsizeof(element.__dict__)
+        size += sys.getsizeof(element.values)
+        size += sum([sys.getsizeof(value) for value in element.values])
+    return size
+
+def listbounds(elements):
+    X_set = []
+    Y_set = []
+    for element in elements:
+        values = element.values
+        X_set.extend(values[0::2])
+        Y_set.extend(values[1::2])
+    return (min(X_set), min(Y_set), max(X_set), max(Y_set))
+
+def main(count=100000):
+    elements = [PathElement(MOVETO, 0.0, 0.0)]
+    for i in xrange(1, count):
+        elements.append(PathElement(LINETO, i * cos(i * 0.01), i * sin(i * 0.01)))
+
+    buffer = PathBuffer(elements)
+
+    print "%d vertices" % count
+    print "%-40s %10.2f MB" % ("list of PathElements", listsize(elements) / 1048576.0)
+    print "%-40s %10.2f MB" % ("PathBuffer", (buffer.nbytes + sys.getsizeof(buffer)) / 1048576.0)
+
+    report("bounds, list of PathElements", best_of(lambda: listbounds(elements)), count, "vertex")
+    report("bounds, PathBuffer", best_of(lambda: buffer.bounds()), count, "vertex")
+
+    matrix = (0.5, 0.5, -0.5, 0.5, 10.0, 10.0)
+    report("transform, PathBuffer", best_of(lambda: buffer.transform(matrix)), count, "vertex")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,59 @@
+'''
+Renders N independent aggdraw surfaces, one after the other and then
+from N threads at once. aggdraw releases the GIL while rasterizing, so
+on a machine with N cores the threaded run should approach N times the
+serial throughput.
+
+    python benchmarks/bench_threads.py [canvases] [grobs]
+'''
+from pypaint.utils.p_random import random
+
+from common import best_of, report
+
+import aggdraw
+import threading
+import sys
+
+SIZE = 1000
+
+def scene(count):
+    pen   = aggdraw.Pen((0, 0, 0), 1.0)
+    brush = aggdraw.Brush((200, 60, 20), opacity=128)
+    records = []
+    for i in xrange(count):
+        x, y = random(SIZE), random(SIZE)
+        path = aggdraw.Path()
+        path.moveto(x, y)
+        path.curveto(x + 40, y, x + 40, y + 40, x, y + 40)
+        path.close()
+        records.append((path, None, i % 2 and pen or None, brush))
+    return records
+
+def render(records):
+    draw = aggdraw.Draw("RGBA", (SIZE, SIZE), "white")
+    draw.paths(records)
+    draw.tostring()
+
+def threaded(canvases, records):
+    threads = [threading.Thread(target=render, args=(records,)) for i in xrange(canvases)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def main(canvases=4, count=20000):
+    ## the records are shared: paths, pens and brushes can be read
+    ## from several threads at once
+    records = scene(count)
+
+    def serial():
+        for i in xrange(canvases):
+            render(records)
+
+    total = canvases * count
+    report("%d canvases, serial" % canvases, best_of(serial), total)
+    report("%d canvases, %d threads" % (canvases, canvases),
+           best_of(lambda: threaded(canvases, records)), total)
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
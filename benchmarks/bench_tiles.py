@@ -0,0 +1,43 @@
+'''
+Tiled rendering of a large scene, from one worker up to the number of
+CPUs, with worker processes and with worker threads.
+
+    python benchmarks/bench_tiles.py [grobs] [size]
+'''
+from pypaint.types.canvas   import PILCanvas
+from pypaint.shape          import shape
+from pypaint.utils.p_random import random
+
+from common import best_of, report
+
+import multiprocessing
+import sys
+
+def scene(count, size):
+    s = shape()
+    grobs = []
+    for i in xrange(count):
+        r = s.rectangle(random(size), random(size), 5 + random(40), 5 + random(40))
+        r.fill_color = (random(), random(), random(), 0.5)
+        if i % 2:
+            r.stroke_color = (0.0, 0.0, 0.0, 1.0)
+        grobs.append(r)
+    return grobs
+
+def main(count=100000, size=4096):
+    grobs  = scene(count, size)
+    canvas = PILCanvas(size, size)
+
+    report("single surface", best_of(lambda: canvas.draw(grobs), repeat=1), count)
+
+    workers = 1
+    while workers <= multiprocessing.cpu_count():
+        report("tiled, %d process(es)" % workers,
+               best_of(lambda: canvas.draw_tiled(grobs, workers=workers), repeat=1), count)
+        if workers > 1:
+            report("tiled, %d threads" % workers,
+                   best_of(lambda: canvas.draw_tiled(grobs, workers=workers, threads=True), repeat=1), count)
+        workers *= 2
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
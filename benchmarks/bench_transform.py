@@ -0,0 +1,48 @@
+'''
+Cost of building grob transforms and getting their centered matrices,
+as the PIL canvas does for every rotated and scaled grob on each draw.
+
+    python benchmarks/bench_transform.py [grobs]
+'''
+from pypaint.types.transform  import Transform
+from pypaint.utils.p_random   import random
+from pypaint.utils.defaults   import CENTER
+
+from common import best_of, report
+
+from math import pi
+
+import sys
+
+def scene(count):
+    grobs = []
+    for i in xrange(count):
+        t = Transform()
+        t.translate(random(1000), random(1000))
+        t.rotate(random(2 * pi))
+        t.scale(0.5 + random())
+        grobs.append((t, (random(1000), random(1000))))
+    return grobs
+
+def centered(grobs):
+    for (t, (x, y)) in grobs:
+        t.getMatrixWCenter(x, y, CENTER)
+
+def main(count=100000):
+    report("build transforms", best_of(lambda: scene(count)), count)
+
+    grobs = scene(count)
+
+    def fresh():
+        ## a copy has no cached matrix yet
+        centered([(t.copy(), center) for (t, center) in grobs])
+    report("copy + centered matrix", best_of(fresh), count)
+
+    centered(grobs)
+    report("centered matrix, cached", best_of(lambda: centered(grobs)), count)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
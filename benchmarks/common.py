@@ -0,0 +1,22 @@
+import time
+
+def best_of(func, repeat=3, number=1):
+    '''
+    Runs func() number times per round and returns the best
+    round, in seconds per call.
+    '''
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        for j in xrange(number):
+            func()
+        elapsed = (time.time() - start) / number
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def report(name, seconds, count=None, unit="grob"):
+    if count:
+        print "%-40s %10.3f ms  %8.2f us/%s" % (name, seconds * 1000.0, seconds * 1e6 / count, unit)
+    else:
+        print "%-40s %10.3f ms" % (name, seconds * 1000.0)
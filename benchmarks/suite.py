@@ -0,0 +1,340 @@
+'''
+The benchmark suite: seeded workloads at fixed reference sizes, with
+the results written as JSON so runs can be compared across versions.
+
+    python benchmarks/suite.py [-o results.json] [-k name] [--quick]
+    python benchmarks/suite.py --compare old.json new.json [--threshold 0.1]
+
+Every workload is timed as the best of a few rounds. A workload whose
+optional dependency is missing (no FreeType in aggdraw, no
+cPathmatics) raises Skip and is recorded as skipped with the reason;
+one that fails, an ImportError of pypaint itself included, is recorded
+as an error, rather than stopping the run. --compare lists
+the workloads that got slower than the threshold and exits with status
+1 if there are any.
+'''
+from common import best_of
+
+from math import cos, sin, pi
+from optparse import OptionParser
+
+import platform
+import random
+import subprocess
+import sys
+import time
+import json
+
+## (name, setup, sizes, unit); setup(size) builds the scene and returns
+## the function to time
+BENCHMARKS = []
+
+class Skip(Exception):
+    '''
+    Raised by a workload setup when an optional dependency is missing.
+    '''
+
+def benchmark(name, sizes=(1000,), unit="grob"):
+    def register(setup):
+        BENCHMARKS.append((name, setup, sizes, unit))
+        return setup
+    return register
+
+## workloads ###########################################################
+
+@benchmark("context.paths", sizes=(1000, 10000), unit="path")
+def context_paths(size):
+    from pypaint.context import Context
+    ctx = Context(width=1000, height=1000)
+    def run():
+        ctx.canvas.clear()
+        for i in xrange(size // 3):
+            x, y = random.random() * 1000, random.random() * 1000
+            ctx.rect(x, y, 10, 10)
+            ctx.oval(x, y, 10, 10)
+            ctx.beginpath(x, y)
+            ctx.lineto(x + 10, y)
+            ctx.curveto(x + 20, y, x + 20, y + 10, x + 10, y + 10)
+            ctx.endpath()
+    return run
+
+class GrobState:
+    '''
+    The drawing state a Context hands to the grobs it creates, for
+    building grobs without a Context.
+    '''
+    def __init__(self):
+        from pypaint.types.transform import Transform
+        from pypaint.utils.defaults  import CENTER
+        self._fillcolor     = None
+        self._strokecolor   = None
+        self._strokewidth   = 1.0
+        self._transform     = Transform()
+        self._transformmode = CENTER
+
+@benchmark("bezierpath.bounds", sizes=(100, 10000), unit="segment")
+def bezierpath_bounds(size):
+    from pypaint.types.paths import BezierPath
+    path = BezierPath(GrobState())
+    path.moveto(0, 0)
+    for i in xrange(size):
+        x, y = i * cos(i * 0.1), i * sin(i * 0.1)
+        path.curveto(x + 5, y, x + 5, y + 5, x, y + 5)
+    def run():
+        ## re-setting the data invalidates the memoized bounds
+        path.data = path.data
+        path.bounds
+    return run
+
+@benchmark("transform.getMatrixWCenter", sizes=(10000,), unit="transform")
+def transform_centered(size):
+    from pypaint.types.transform import Transform
+    from pypaint.utils.defaults  import CENTER
+    grobs = []
+    for i in xrange(size):
+        t = Transform()
+        t.translate(random.random() * 1000, random.random() * 1000)
+        t.rotate(random.random() * 2 * pi)
+        t.scale(0.5 + random.random())
+        grobs.append((t, random.random() * 1000, random.random() * 1000))
+    def run():
+        for (t, x, y) in grobs:
+            ## re-setting the matrix drops the cached centered matrix
+            t.matrix = t.matrix
+            t.getMatrixWCenter(x, y, CENTER)
+    return run
+
+@benchmark("pilcanvas.draw", sizes=(1000, 10000, 100000))
+def pilcanvas_draw(size):
+    from pypaint.types.canvas import PILCanvas
+    from pypaint.shape        import shape
+    s = shape()
+    grobs = []
+    for i in xrange(size):
+        r = s.rectangle(random.random() * 1000, random.random() * 1000, 10, 10)
+        r.fill_color = (random.random(), random.random(), random.random(), 0.5)
+        if i % 2:
+            r.stroke_color = (0.0, 0.0, 0.0, 1.0)
+        grobs.append(r)
+    canvas = PILCanvas(1000, 1000)
+    def run():
+        canvas.begin_frame()
+        canvas.draw(grobs)
+    return run
+
+@benchmark("bezierpath.draw", sizes=(1000, 10000))
+def bezierpath_draw(size):
+    ## the canvas a Context draws on, with its BezierPath grobs
+    from pypaint.interfaces.PIL.canvas import PILCanvas
+    from pypaint.types.paths           import BezierPath
+    from pypaint.types.color           import Color
+    canvas = PILCanvas(1000, 1000)
+    for i in xrange(size):
+        p = BezierPath(GrobState())
+        p.rect(random.random() * 1000, random.random() * 1000, 10, 10)
+        p._fillcolor = Color(random.random(), random.random(), random.random(), 0.5)
+        if i % 2:
+            p._strokecolor = Color(0.0, 0.0, 0.0, 1.0)
+        canvas.add(p)
+    def run():
+        canvas.draw()
+    return run
+
+@benchmark("pilcanvas.text", sizes=(100, 1000), unit="text")
+def pilcanvas_text(size):
+    from pypaint.types.canvas import PILCanvas
+    from pypaint.text         import text
+    import aggdraw
+    if not hasattr(aggdraw.Draw("RGB", (1, 1)), "text"):
+        raise Skip("aggdraw was built without FreeType")
+    grobs = []
+    for i in xrange(size):
+        t = text("benchmark %d" % i, random.random() * 1000, random.random() * 1000,
+                 font_name="DejaVu Sans")
+        t.font_size = 12
+        grobs.append(t)
+    canvas = PILCanvas(1000, 1000)
+    def run():
+        canvas.begin_frame()
+        canvas.draw(grobs)
+    return run
+
+@benchmark("colorlist.sort", sizes=(1000,), unit="color")
+def colorlist_sort(size):
+    from pypaint.library.color_palette import ColorList, color
+    colors = ColorList(*[color(random.random(), random.random(), random.random())
+                         for i in xrange(size)])
+    def run():
+        ## colors built from rgb values only have the rgb channels
+        colors.sort_by_red()
+        colors.sort_by_green()
+        colors.sort_by_blue()
+    return run
+
+@benchmark("boids.update", sizes=(1000, 10000, 100000), unit="boid")
+def boids_update(size):
+    from pypaint.library.boids import Boids
+    import numpy
+    ## the flock draws its random numbers from numpy
+    numpy.random.seed(size)
+    flock = Boids(size, 0, 0, 500, 500)
+    flock.goal(250, 250, 0)
+    def run():
+        flock.update(goal=60)
+    return run
+
+@benchmark("ant.forage", sizes=(30, 300), unit="ant")
+def ant_forage(size):
+    from pypaint.library.ant import Colony, Food
+    colony = Colony(size, 250, 250, 100)
+    for i in xrange(8):
+        colony.foodsources.append(Food(50 + random.random() * 400,
+                                       50 + random.random() * 400, 30))
+    def run():
+        colony.forage()
+    return run
+
+def _curvelength(x0, y0, x1, y1, x2, y2, x3, y3, n=20):
+    ## the pure-Python reference for cPathmatics.curvelength
+    length = 0.0
+    xi, yi = x0, y0
+    for i in xrange(1, n + 1):
+        t  = float(i) / n
+        mt = 1.0 - t
+        a, b, c, d = mt * mt * mt, 3 * mt * mt * t, 3 * mt * t * t, t * t * t
+        x = a * x0 + b * x1 + c * x2 + d * x3
+        y = a * y0 + b * y1 + c * y2 + d * y3
+        length += ((x - xi) ** 2 + (y - yi) ** 2) ** 0.5
+        xi, yi = x, y
+    return length
+
+@benchmark("curvelength.python", sizes=(10000,), unit="curve")
+def curvelength_python(size):
+    curves = [[random.random() * 100 for j in range(8)] for i in xrange(size)]
+    def run():
+        for curve in curves:
+            _curvelength(*curve)
+    return run
+
+@benchmark("curvelength.cPathmatics", sizes=(10000,), unit="curve")
+def curvelength_c(size):
+    try:
+        from pypaint.cPathmatics import curvelength
+    except ImportError, e:
+        raise Skip(str(e))
+    curves = [[random.random() * 100 for j in range(8)] for i in xrange(size)]
+    def run():
+        for curve in curves:
+            curvelength(*curve)
+    return run
+
+@benchmark("startup.import", sizes=(1,), unit="process")
+def startup_import(size):
+    from bench_import import run_python, startup
+    ## a canvas that doesn't import is an error, not a skip: there is
+    ## nothing optional about it
+    try:
+        run_python("import pypaint.canvas")
+    except ImportError, e:
+        raise RuntimeError("pypaint.canvas does not import: %s" % e)
+    return startup("pypaint.canvas")
+
+## running #############################################################
+
+def revision():
+    try:
+        process = subprocess.Popen(["git", "rev-parse", "HEAD"],
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return process.communicate()[0].strip() or None
+    except OSError:
+        return None
+
+def run(names=None, quick=False, repeat=3, out=sys.stdout):
+    results = []
+    for (name, setup, sizes, unit) in BENCHMARKS:
+        if names and not [n for n in names if n in name]:
+            continue
+        if quick:
+            sizes = sizes[:1]
+
+        for size in sizes:
+            ## every workload sees the same scene on every run
+            random.seed(size)
+            result = {"name": name, "size": size, "unit": unit}
+            try:
+                func = setup(size)
+                result["seconds"] = best_of(func, repeat)
+                result["us_per_unit"] = result["seconds"] * 1e6 / size
+                line = "%10.3f ms  %10.3f us/%s" % (result["seconds"] * 1000.0,
+                                                     result["us_per_unit"], unit)
+            except Skip, e:
+                result["skipped"] = str(e)
+                line = "skipped (%s)" % result["skipped"]
+            except Exception, e:
+                result["error"] = "%s: %s" % (e.__class__.__name__, e)
+                line = "error (%s)" % result["error"]
+            print >> out, "%-32s %8d %s" % (name, size, line)
+            results.append(result)
+
+    return {
+        "revision": revision(),
+        "python":   platform.python_version(),
+        "platform": platform.platform(),
+        "time":     time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results":  results,
+    }
+
+def compare(old, new, threshold=0.1, out=sys.stdout):
+    '''
+    Prints the timing ratio new/old of every workload in both runs and
+    returns the (name, size, ratio) of those slower by more than
+    threshold.
+    '''
+    before = {}
+    for result in old["results"]:
+        if "seconds" in result:
+            before[(result["name"], result["size"])] = result["seconds"]
+
+    regressions = []
+    for result in new["results"]:
+        key = (result["name"], result["size"])
+        if "seconds" not in result or not before.has_key(key) or not before[key]:
+            continue
+        ratio = result["seconds"] / before[key]
+        flag = ""
+        if ratio > 1.0 + threshold:
+            flag = "  REGRESSION"
+            regressions.append((key[0], key[1], ratio))
+        print >> out, "%-32s %8d %8.2fx%s" % (key[0], key[1], ratio, flag)
+    return regressions
+
+def main(argv):
+    parser = OptionParser(usage="%prog [options] | --compare OLD NEW")
+    parser.add_option("-o", "--output", help="write the results as JSON to this file")
+    parser.add_option("-k", dest="names", action="append",
+                      help="only run workloads whose name contains this (repeatable)")
+    parser.add_option("--quick", action="store_true", help="smallest size of every workload only")
+    parser.add_option("--repeat", type="int", default=3, help="rounds per workload (default 3)")
+    parser.add_option("--compare", action="store_true", help="compare two result files")
+    parser.add_option("--threshold", type="float", default=0.1,
+                      help="slowdown reported as a regression (default 0.1, 10%)")
+    (options, args) = parser.parse_args(argv)
+
+    if options.compare:
+        if len(args) != 2:
+            parser.error("--compare takes two result files")
+        old = json.load(open(args[0]))
+        new = json.load(open(args[1]))
+        if compare(old, new, options.threshold):
+            return 1
+        return 0
+
+    results = run(options.names, options.quick, options.repeat)
+    if options.output:
+        output = open(options.output, "w")
+        json.dump(results, output, indent=1, sort_keys=True)
+        output.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -60,6 +60,8 @@
 #include "agg_conv_dash.h"
 #include "agg_vcgen_markers_term.h"
 #include "agg_conv_marker.h"
+
+#include <vector>
 #include "agg_conv_shorten_path.h"
 #include "agg_conv_marker_adaptor.h"
 #include "agg_conv_concat.h"
@@ -70,6 +72,27 @@
 /* -------------------------------------------------------------------- */
 /* AGG Drawing Surface */
 
+/* Threads.  The drawing methods (line, polygon, rectangle, path, paths,
+   masks, symbol, arc, chord, ellipse, pieslice) and the buffer copies (clear,
+   fromstring, tostring, flush) release the GIL while AGG works, so
+   separate Draw objects can be rendered from separate threads in
+   parallel.  While a call runs:
+
+   - the Draw object itself must not be used from another thread; each
+     thread needs its own surface.
+   - Path objects may be drawn by several threads at once, but must not
+     be modified (moveto, lineto, extend, close, ...) meanwhile.
+   - Pen and Brush objects are read-only and can be shared freely.
+   - text and textsize keep the GIL: the FreeType engine and its glyph
+     cache are shared by every Font.
+
+   DRAW_BEGIN/DRAW_END bracket the sections that run without the GIL;
+   they must not touch Python objects other than through the C fields
+   of Pen, Brush and Path objects the caller holds references to. */
+
+#define DRAW_BEGIN Py_BEGIN_ALLOW_THREADS
+#define DRAW_END   Py_END_ALLOW_THREADS
+
 #if defined(HAVE_FREETYPE2)
 typedef agg::font_engine_freetype_int32 font_engine_type;
 typedef agg::font_cache_manager<font_engine_type> font_manager_type;
@@ -88,17 +111,35 @@ typedef struct {
     draw_adaptor_base *draw;
     agg::rendering_buffer* buffer;
     agg::trans_affine* transform;
+    /* set by setorigin(); see there */
+    bool has_origin;
+    double origin_x, origin_y;
     unsigned char* buffer_data;
     int mode; // agg::pix_format_*
     int xsize, ysize;
     int buffer_size;
     PyObject* image;
     PyObject* background;
+    /* shape and strides handed out by the buffer interface */
+    Py_ssize_t view_shape[3];
+    Py_ssize_t view_strides[3];
 } DrawObject;
 
 static PyObject* aggdraw_getcolor_obj;
 static void draw_dealloc(DrawObject* self);
 static PyObject* draw_getattr(DrawObject* self, char* name);
+static int draw_getbuffer(DrawObject* self, Py_buffer* view, int flags);
+static Py_ssize_t draw_getreadbuffer(DrawObject* self, Py_ssize_t segment, void** ptr);
+static Py_ssize_t draw_getsegcount(DrawObject* self, Py_ssize_t* lenp);
+
+static PyBufferProcs draw_as_buffer = {
+    (readbufferproc) draw_getreadbuffer, /* bf_getreadbuffer */
+    (writebufferproc) draw_getreadbuffer, /* bf_getwritebuffer */
+    (segcountproc) draw_getsegcount, /* bf_getsegcount */
+    (charbufferproc) draw_getreadbuffer, /* bf_getcharbuffer */
+    (getbufferproc) draw_getbuffer, /* bf_getbuffer */
+    0, /* bf_releasebuffer */
+};
 
 static PyTypeObject DrawType = {
     PyObject_HEAD_INIT(NULL)
@@ -108,6 +149,18 @@ static PyTypeObject DrawType = {
     0, /* tp_print */
     (getattrfunc) draw_getattr, /* tp_getattr */
     0, /* tp_setattr */
+    0, /* tp_compare */
+    0, /* tp_repr */
+    0, /* tp_as_number */
+    0, /* tp_as_sequence */
+    0, /* tp_as_mapping */
+    0, /* tp_hash */
+    0, /* tp_call */
+    0, /* tp_str */
+    0, /* tp_getattro */
+    0, /* tp_setattro */
+    &draw_as_buffer, /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_NEWBUFFER, /* tp_flags */
 };
 
 typedef struct {
@@ -285,9 +338,12 @@ public:
     const char* mode;
     virtual ~draw_adaptor_base() {};
     virtual void setantialias(bool flag) = 0;
+    virtual void setclip(double x0, double y0, double x1, double y1) = 0;
     virtual void draw(agg::path_storage &path, PyObject* obj1,
                       PyObject* obj2=NULL) = 0;
     virtual void drawtext(float xy[2], PyObject* text, FontObject* font) {};
+    virtual void blendmasks(const unsigned char* atlas, int stride,
+                            const std::vector<int>& boxes, agg::rgba8 color) = 0;
 };
 
 template<class PixFmt> class draw_adaptor : public draw_adaptor_base {
@@ -298,12 +354,62 @@ template<class PixFmt> class draw_adaptor : public draw_adaptor_base {
   agg::rasterizer_scanline_aa<> rasterizer;
   agg::scanline_p8 scanline;
   bool antialias;
+  /* the setclip() box in whole pixels, for blendmasks */
+  int clip[4];
 public:
   draw_adaptor(DrawObject* self_, const char* mode_){
     self = self_;
     mode = mode_;
     setantialias(true);
-    rasterizer.clip_box(0,0, self->xsize, self->ysize);
+    setclip(0, 0, self->xsize, self->ysize);
+  }
+
+  void setclip(double x0, double y0, double x1, double y1){
+    rasterizer.clip_box(x0, y0, x1, y1);
+    clip[0] = (int) floor(x0);
+    clip[1] = (int) floor(y0);
+    clip[2] = (int) ceil(x1) - 1;
+    clip[3] = (int) ceil(y1) - 1;
+  }
+
+  /* blends color into the surface through coverage masks cut from
+     atlas, an 8-bit image stride bytes wide.  boxes holds six ints per
+     mask: the mask's x, y, width and height in the atlas and the
+     surface position of its top left pixel.  Nothing is transformed;
+     the origin and the clip box apply. */
+  void blendmasks(const unsigned char* atlas, int stride,
+                  const std::vector<int>& boxes, agg::rgba8 color){
+    PixFmt pf(*self->buffer);
+    renderer_base rb(pf);
+    if (!rb.clip_box(clip[0], clip[1], clip[2], clip[3]))
+      return;
+
+    int ox = 0, oy = 0;
+    if (self->has_origin) {
+      ox = (int) floor(self->origin_x + 0.5);
+      oy = (int) floor(self->origin_y + 0.5);
+    }
+
+    for (size_t i = 0; i + 5 < boxes.size(); i += 6) {
+      const int sx = boxes[i], sy = boxes[i+1];
+      const int width = boxes[i+2], height = boxes[i+3];
+      const int dx = boxes[i+4] - ox, dy = boxes[i+5] - oy;
+      for (int row = 0; row < height; row++)
+        rb.blend_solid_hspan(dx, dy + row, width, color,
+                             atlas + (sy + row) * stride + sx);
+    }
+  }
+
+  /* feeds the rasterizer, moving the finished outline by the origin.
+     The shift comes after the stroker and contour generators, so they
+     see exactly the coordinates they would on a surface at (0, 0). */
+  template<class VertexSource> void add_path(VertexSource& vs){
+    if (self->has_origin) {
+      agg::trans_affine_translation shift(-self->origin_x, -self->origin_y);
+      agg::conv_transform<VertexSource, agg::trans_affine> shifted(vs, shift);
+      rasterizer.add_path(shifted);
+    } else
+      rasterizer.add_path(vs);
   }
 
   void setantialias(bool flag){
@@ -318,7 +424,7 @@ public:
     dash_stroke<agg::conv_stroke<agg::path_storage> > dash(stroke, 10, 1, pen.width);
     //dash_stroke<agg::path_storage> dash(*path, 6.0, 3.0, pen->width);
     rasterizer.reset();
-    rasterizer.add_path(dash);
+    add_path(dash);
     ren.color(pen.color);
     agg::render_scanlines(rasterizer, scanline, ren);
   }
@@ -330,7 +436,7 @@ public:
     dash_stroke_arrow<agg::conv_stroke<agg::path_storage> > dash(stroke, 10, 1, pen.width);
     //dash_stroke<agg::path_storage> dash(*path, 6.0, 3.0, pen->width);
     rasterizer.reset();
-    rasterizer.add_path(dash);
+    add_path(dash);
     ren.color(pen.color);
     agg::render_scanlines(rasterizer, scanline, ren);
   }
@@ -342,7 +448,7 @@ public:
     stroke_arrow<agg::conv_stroke<agg::path_storage> > stroke_(stroke, pen.width);
     //dash_stroke<agg::path_storage> dash(*path, 6.0, 3.0, pen->width);
     rasterizer.reset();
-    rasterizer.add_path(stroke_);
+    add_path(stroke_);
     ren.color(pen.color);
     agg::render_scanlines(rasterizer, scanline, ren);
   }
@@ -354,7 +460,7 @@ public:
     //dash_stroke<agg::path_storage> dash(*path, 6.0, 3.0, pen->width);
     stroke.width(pen.width);
     rasterizer.reset();
-    rasterizer.add_path(stroke);
+    add_path(stroke);
     ren.color(pen.color);
     agg::render_scanlines(rasterizer, scanline, ren);
   }
@@ -406,7 +512,7 @@ public:
                 contour.width(0.5);
 
             rasterizer.reset();
-            rasterizer.add_path(contour);
+            add_path(contour);
             ren.color(brush->color);
             agg::render_scanlines(rasterizer, scanline, ren);
         }
@@ -418,9 +524,10 @@ public:
           } else{
             draw_pen_solid_arrow(*pen, *p);
           }
-          if (self->transform)
-            delete p;
-    }
+        }
+
+        if (self->transform)
+          delete p;
   }
 
 #if defined(HAVE_FREETYPE2)
@@ -461,9 +568,9 @@ public:
                 if (self->transform) {
                     agg::conv_transform<curve_t, agg::trans_affine>
                         tp(curves, *self->transform);
-                    rasterizer.add_path(tp);
+                    add_path(tp);
                 } else
-                    rasterizer.add_path(curves);
+                    add_path(curves);
                 agg::render_scanlines(rasterizer, scanline, renderer);
             } else {
                 agg::render_scanlines(
@@ -487,6 +594,7 @@ static void clear(DrawObject* self, PyObject* background)
         agg::rgba8 ink = getcolor(background);
         unsigned char* p = self->buffer_data;
         int c, i;
+        DRAW_BEGIN
         switch (self->mode) {
             case agg::pix_format_gray8:
                 c = (ink.r*299 + ink.g*587 + ink.b*114) / 1000;
@@ -523,8 +631,12 @@ static void clear(DrawObject* self, PyObject* background)
                 }
                 break;
         }
-    } else
+        DRAW_END
+    } else {
+        DRAW_BEGIN
         memset(self->buffer_data, 255, self->buffer_size);
+        DRAW_END
+    }
 }
 
 static void draw_setup(DrawObject* self)
@@ -643,6 +755,7 @@ draw_new(PyObject* self_, PyObject* args)
     self->ysize = ysize;
 
     self->transform = NULL;
+    self->has_origin = false;
 
     self->image = image;
     if (image) {
@@ -750,6 +863,7 @@ draw_dib(PyObject* self_, PyObject* args)
     self->ysize = ysize;
 
     self->transform = NULL;
+    self->has_origin = false;
 
     self->image = NULL;
 
@@ -924,7 +1038,9 @@ static PyObject* draw_arc(DrawObject* self, PyObject* args){
 
     arc.approximation_scale(1);
     path.concat_path(arc);
+    DRAW_BEGIN
     self->draw->draw(path, pen);
+    DRAW_END
 
     Py_INCREF(Py_None);
     return Py_None;
@@ -951,7 +1067,9 @@ draw_chord(DrawObject* self, PyObject* args)
     path.concat_path(arc);
     path.close_polygon();
 
+    DRAW_BEGIN
     self->draw->draw(path, pen, brush);
+    DRAW_END
 
     Py_INCREF(Py_None);
     return Py_None;
@@ -972,7 +1090,9 @@ draw_ellipse(DrawObject* self, PyObject* args)
     ellipse.approximation_scale(1);
     path.concat_path(ellipse);
 
+    DRAW_BEGIN
     self->draw->draw(path, pen, brush);
+    DRAW_END
 
     Py_INCREF(Py_None);
     return Py_None;
@@ -987,7 +1107,9 @@ draw_line(DrawObject* self, PyObject* args)
         return NULL;
 
     if (Path_Check(xyIn)) {
+        DRAW_BEGIN
         self->draw->draw(*((PathObject*) xyIn)->path, pen);
+        DRAW_END
     } else {
         int count;
         PointF *xy = getpoints(xyIn, &count);
@@ -998,7 +1120,9 @@ draw_line(DrawObject* self, PyObject* args)
         for (int i = 1; i < count; i++)
             path.line_to(xy[i].X, xy[i].Y);
         delete xy;
+        DRAW_BEGIN
         self->draw->draw(path, pen);
+        DRAW_END
     }
 
     Py_INCREF(Py_None);
@@ -1028,7 +1152,9 @@ static PyObject* draw_pieslice(DrawObject* self, PyObject* args){
     path.line_to(x, y);
     path.close_polygon();
 
+    DRAW_BEGIN
     self->draw->draw(path, pen, brush);
+    DRAW_END
 
     Py_INCREF(Py_None);
     return Py_None;
@@ -1042,7 +1168,9 @@ static PyObject* draw_polygon(DrawObject* self, PyObject* args){
         return NULL;
 
     if (Path_Check(xyIn)) {
+        DRAW_BEGIN
         self->draw->draw(*((PathObject*) xyIn)->path, pen, brush);
+        DRAW_END
     } else {
         int count;
         PointF *xy = getpoints(xyIn, &count);
@@ -1058,7 +1186,9 @@ static PyObject* draw_polygon(DrawObject* self, PyObject* args){
         path.close_polygon();
         delete xy;
 
+        DRAW_BEGIN
         self->draw->draw(path, pen, brush);
+        DRAW_END
     }
 
     Py_INCREF(Py_None);
@@ -1080,7 +1210,9 @@ static PyObject* draw_rectangle(DrawObject* self, PyObject* args){
     path.line_to(x0, y1);
     path.close_polygon();
 
+    DRAW_BEGIN
     self->draw->draw(path, pen, brush);
+    DRAW_END
 
     Py_INCREF(Py_None);
     return Py_None;
@@ -1104,13 +1236,174 @@ static PyObject* draw_path(DrawObject* self, PyObject* args){
   //  tp(*symbol->path, transform);
   //agg::path_storage p;
   //p.add_path(tp, 0, false);
+  DRAW_BEGIN
   self->draw->draw(*path->path, pen, brush);
+  DRAW_END
   
   Py_INCREF(Py_None);
   return Py_None;
   
 };
 
+static int
+gettransform(PyObject* transformIn, agg::trans_affine* transform)
+{
+    /* accepts any 6-item sequence, in AGG order (see settransform) */
+    PyObject* seq = PySequence_Fast(transformIn, "transform must be a sequence");
+    if (!seq)
+        return 0;
+
+    if (PySequence_Fast_GET_SIZE(seq) != 6) {
+        PyErr_SetString(PyExc_TypeError, "expected 6-item transform");
+        Py_DECREF(seq);
+        return 0;
+    }
+
+    double m[6];
+    for (int i = 0; i < 6; i++)
+        m[i] = GETFLOAT(PySequence_Fast_GET_ITEM(seq, i));
+    Py_DECREF(seq);
+
+    if (PyErr_Occurred())
+        return 0;
+
+    *transform = agg::trans_affine(m[0], m[1], m[2], m[3], m[4], m[5]);
+    return 1;
+}
+
+/* Draws a whole sequence of (path, transform, pen, brush) records with a
+   single call.  The transform, pen and brush may be None; a None transform
+   uses the transform set by settransform.  The draw transform is left
+   untouched afterwards.
+
+   All records are checked before anything is drawn, and the whole
+   sequence is then rasterized without the GIL.  The sequence keeps the
+   records, and so their paths, pens and brushes, alive meanwhile. */
+struct paths_record {
+    agg::path_storage* path;
+    bool has_transform;
+    agg::trans_affine transform;
+    PyObject* pen;
+    PyObject* brush;
+};
+
+static PyObject* draw_paths(DrawObject* self, PyObject* args){
+    PyObject* pathsIn;
+    if (!PyArg_ParseTuple(args, "O:paths", &pathsIn))
+        return NULL;
+
+    PyObject* seq = PySequence_Fast(pathsIn, "argument must be a sequence");
+    if (!seq)
+        return NULL;
+
+    int n = PySequence_Fast_GET_SIZE(seq);
+    std::vector<paths_record> records(n);
+
+    for (int i = 0; i < n; i++) {
+        PathObject* path;
+        PyObject* transformIn = Py_None;
+        PyObject* pen = Py_None;
+        PyObject* brush = Py_None;
+
+        if (!PyArg_ParseTuple(PySequence_Fast_GET_ITEM(seq, i),
+                              "O!|OOO:paths", &PathType, &path,
+                              &transformIn, &pen, &brush)) {
+            Py_DECREF(seq);
+            return NULL;
+        }
+
+        paths_record& record = records[i];
+        record.path = path->path;
+        record.has_transform = (transformIn != Py_None);
+        if (record.has_transform &&
+            !gettransform(transformIn, &record.transform)) {
+            Py_DECREF(seq);
+            return NULL;
+        }
+        record.pen = (pen == Py_None) ? NULL : pen;
+        record.brush = (brush == Py_None) ? NULL : brush;
+    }
+
+    agg::trans_affine* saved = self->transform;
+
+    DRAW_BEGIN
+    for (int i = 0; i < n; i++) {
+        paths_record& record = records[i];
+        self->transform = record.has_transform ? &record.transform : saved;
+        self->draw->draw(*record.path, record.pen, record.brush);
+    }
+    self->transform = saved;
+    DRAW_END
+
+    Py_DECREF(seq);
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+/* masks(atlas, width, boxes, brush) blends the brush color into the
+   surface through coverage masks, as used for text drawn from a glyph
+   atlas.  atlas is a buffer of 8-bit coverage, width bytes to a row;
+   boxes is a sequence of (x, y, w, h, dx, dy): a mask's box in the
+   atlas and the surface position it goes to.  The draw transform is
+   not applied.
+
+   The boxes are checked against the atlas before the GIL is released;
+   the atlas buffer is held, so a bytearray can't be resized meanwhile. */
+static PyObject* draw_masks(DrawObject* self, PyObject* args){
+    Py_buffer atlas;
+    int stride;
+    PyObject* boxesIn;
+    BrushObject* brush;
+    if (!PyArg_ParseTuple(args, "s*iOO!:masks", &atlas, &stride,
+                          &boxesIn, &BrushType, &brush))
+        return NULL;
+
+    if (stride <= 0) {
+        PyBuffer_Release(&atlas);
+        PyErr_SetString(PyExc_ValueError, "masks() width must be positive");
+        return NULL;
+    }
+    int rows = (int) (atlas.len / stride);
+
+    PyObject* seq = PySequence_Fast(boxesIn, "boxes must be a sequence");
+    if (!seq) {
+        PyBuffer_Release(&atlas);
+        return NULL;
+    }
+
+    int n = PySequence_Fast_GET_SIZE(seq);
+    std::vector<int> boxes(6 * n);
+    for (int i = 0; i < n; i++) {
+        int* box = &boxes[6 * i];
+        if (!PyArg_ParseTuple(PySequence_Fast_GET_ITEM(seq, i), "iiiiii:masks",
+                              box, box+1, box+2, box+3, box+4, box+5)) {
+            Py_DECREF(seq);
+            PyBuffer_Release(&atlas);
+            return NULL;
+        }
+        if (box[0] < 0 || box[1] < 0 || box[2] < 0 || box[3] < 0 ||
+            box[0] + box[2] > stride || box[1] + box[3] > rows) {
+            Py_DECREF(seq);
+            PyBuffer_Release(&atlas);
+            PyErr_SetString(PyExc_ValueError, "masks() box outside the atlas");
+            return NULL;
+        }
+    }
+    Py_DECREF(seq);
+
+    agg::rgba8 color = brush->color;
+
+    DRAW_BEGIN
+    self->draw->blendmasks((const unsigned char*) atlas.buf, stride, boxes, color);
+    DRAW_END
+
+    PyBuffer_Release(&atlas);
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
 static PyObject* draw_symbol(DrawObject* self, PyObject* args){
     PyObject* xyIn;
     PathObject* symbol;
@@ -1125,6 +1418,7 @@ static PyObject* draw_symbol(DrawObject* self, PyObject* args){
     if (!xy)
         return NULL;
 
+    DRAW_BEGIN
     for (int i = 0; i < count; i++) {
         agg::trans_affine_translation transform(xy[i].X,xy[i].Y);
         agg::conv_transform<agg::path_storage, agg::trans_affine>
@@ -1134,6 +1428,7 @@ static PyObject* draw_symbol(DrawObject* self, PyObject* args){
         p.concat_path(tp);
         self->draw->draw(p, pen, brush);
     }
+    DRAW_END
 
     delete xy;
 
@@ -1203,6 +1498,42 @@ draw_setantialias(DrawObject* self, PyObject* args)
     return Py_None;
 }
 
+static PyObject*
+draw_setclip(DrawObject* self, PyObject* args)
+{
+    /* sets the box geometry is clipped to before rasterization; it is
+       the surface by default. A box larger than the surface makes a
+       tile rasterize exactly like the same area of a bigger surface. */
+    double x0, y0, x1, y1;
+    if (!PyArg_ParseTuple(args, "(dddd):setclip", &x0, &y0, &x1, &y1))
+        return NULL;
+
+    self->draw->setclip(x0, y0, x1, y1);
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+static PyObject*
+draw_setorigin(DrawObject* self, PyObject* args)
+{
+    /* makes the surface a window onto a larger one: geometry is drawn
+       as if the surface's top left pixel were at (x, y). Unlike a
+       translated transform, this does not change the coordinates the
+       stroker sees, so a surface split into windows renders the same
+       pixels as a single surface. */
+    double x, y;
+    if (!PyArg_ParseTuple(args, "(dd):setorigin", &x, &y))
+        return NULL;
+
+    self->has_origin = (x != 0 || y != 0);
+    self->origin_x = x;
+    self->origin_y = y;
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
 static PyObject*
 draw_settransform(DrawObject* self, PyObject* args)
 {
@@ -1234,9 +1565,11 @@ draw_fromstring(DrawObject* self, PyObject* args)
     if (!PyArg_ParseTuple(args, "s#:fromstring", &data, &data_size))
         return NULL;
 
-    if (data_size >= self->buffer_size)
+    if (data_size >= self->buffer_size) {
+        DRAW_BEGIN
         memcpy(self->buffer_data, data, self->buffer_size);
-    else {
+        DRAW_END
+    } else {
         PyErr_SetString(PyExc_ValueError, "not enough data");
         return NULL;
     }
@@ -1251,7 +1584,16 @@ draw_tostring(DrawObject* self, PyObject* args)
     if (!PyArg_ParseTuple(args, ":tostring"))
         return NULL;
 
-    return PyString_FromStringAndSize((char*) self->buffer_data, self->buffer_size);
+    PyObject* string = PyString_FromStringAndSize(NULL, self->buffer_size);
+    if (!string)
+        return NULL;
+
+    char* data = PyString_AS_STRING(string);
+    DRAW_BEGIN
+    memcpy(data, self->buffer_data, self->buffer_size);
+    DRAW_END
+
+    return string;
 }
 static PyObject* draw_tobuffer(DrawObject* self, PyObject* args){
   if (!PyArg_ParseTuple(args, ":tobuffer"))
@@ -1347,6 +1689,92 @@ draw_flush(DrawObject* self, PyObject* args)
     return self->image;
 }
 
+/* The buffer interface exposes the pixels in place: memoryview(draw) or
+   numpy.asarray(draw) give a writable (height, width, bands) array of
+   bytes that shares memory with the surface, without a copy.  The view
+   keeps the Draw object alive; drawing after the view was taken shows
+   through it. */
+
+static int
+draw_bands(DrawObject* self)
+{
+    switch (self->mode) {
+    case agg::pix_format_gray8:
+        return 1;
+    case agg::pix_format_rgb24:
+    case agg::pix_format_bgr24:
+        return 3;
+    default:
+        return 4;
+    }
+}
+
+static bool
+draw_contiguous(DrawObject* self)
+{
+    return self->buffer->stride() == self->xsize * draw_bands(self);
+}
+
+static int
+draw_getbuffer(DrawObject* self, Py_buffer* view, int flags)
+{
+    int bands = draw_bands(self);
+
+    if (!draw_contiguous(self) && !(flags & PyBUF_STRIDES)) {
+        PyErr_SetString(PyExc_BufferError, "surface rows are not contiguous");
+        return -1;
+    }
+
+    self->view_shape[0] = self->ysize;
+    self->view_shape[1] = self->xsize;
+    self->view_shape[2] = bands;
+    self->view_strides[0] = self->buffer->stride();
+    self->view_strides[1] = bands;
+    self->view_strides[2] = 1;
+
+    view->buf = self->buffer->row_ptr(0);
+    view->obj = (PyObject*) self;
+    Py_INCREF(self);
+    view->len = self->xsize * self->ysize * bands;
+    view->readonly = 0;
+    view->itemsize = 1;
+    view->format = (flags & PyBUF_FORMAT) ? (char*) "B" : NULL;
+    if (flags & PyBUF_ND) {
+        view->ndim = 3;
+        view->shape = self->view_shape;
+    } else {
+        view->ndim = 1;
+        view->shape = NULL;
+    }
+    view->strides = (flags & PyBUF_STRIDES) ? self->view_strides : NULL;
+    view->suboffsets = NULL;
+    view->internal = NULL;
+    return 0;
+}
+
+static Py_ssize_t
+draw_getreadbuffer(DrawObject* self, Py_ssize_t segment, void** ptr)
+{
+    if (segment != 0) {
+        PyErr_SetString(PyExc_SystemError, "accessing non-existent segment");
+        return -1;
+    }
+    if (!draw_contiguous(self)) {
+        PyErr_SetString(PyExc_BufferError, "surface rows are not contiguous");
+        return -1;
+    }
+    *ptr = self->buffer->row_ptr(0);
+    return self->xsize * self->ysize * draw_bands(self);
+}
+
+static Py_ssize_t
+draw_getsegcount(DrawObject* self, Py_ssize_t* lenp)
+{
+    if (lenp)
+        *lenp = self->xsize * self->ysize * draw_bands(self);
+    return 1;
+}
+
 static PyMethodDef draw_methods[] = {
     {"line", (PyCFunction) draw_line, METH_VARARGS},
     {"polygon", (PyCFunction) draw_polygon, METH_VARARGS},
@@ -1358,6 +1786,8 @@ static PyMethodDef draw_methods[] = {
 #endif
 
     {"path", (PyCFunction) draw_path, METH_VARARGS},
+    {"paths", (PyCFunction) draw_paths, METH_VARARGS},
+    {"masks", (PyCFunction) draw_masks, METH_VARARGS},
     {"symbol", (PyCFunction) draw_symbol, METH_VARARGS},
 
     {"arc", (PyCFunction) draw_arc, METH_VARARGS},
@@ -1367,6 +1797,8 @@ static PyMethodDef draw_methods[] = {
 
     {"settransform", (PyCFunction) draw_settransform, METH_VARARGS},
     {"setantialias", (PyCFunction) draw_setantialias, METH_VARARGS},
+    {"setclip", (PyCFunction) draw_setclip, METH_VARARGS},
+    {"setorigin", (PyCFunction) draw_setorigin, METH_VARARGS},
 
     {"flush", (PyCFunction) draw_flush, METH_VARARGS},
 
@@ -1742,6 +2174,144 @@ path_rcurveto(PathObject* self, PyObject* args)
     return Py_None;
 }
 
+static PyObject*
+path_extend(PathObject* self, PyObject* args)
+{
+    /* appends a whole path given as an opcode buffer (one byte per
+       element: 0 moveto, 1 lineto, 2 curve3to, 3 curveto, 4 close) and
+       a buffer of doubles holding the coordinates of all elements.
+       Curves are flattened once at the end, like curveto() does,
+       unless the optional third argument is false. */
+
+    static const int sizes[] = { 2, 2, 4, 6, 0 };
+
+    PyObject* opcodesIn;
+    PyObject* coordsIn;
+    int flatten = 1;
+    if (!PyArg_ParseTuple(args, "OO|i:extend", &opcodesIn, &coordsIn, &flatten))
+        return NULL;
+
+    const void* opcodes_buffer;
+    const void* coords_buffer;
+    Py_ssize_t opcodes_size, coords_size;
+    if (PyObject_AsReadBuffer(opcodesIn, &opcodes_buffer, &opcodes_size) < 0 ||
+        PyObject_AsReadBuffer(coordsIn, &coords_buffer, &coords_size) < 0)
+        return NULL;
+
+    const unsigned char* opcodes = (const unsigned char*) opcodes_buffer;
+    const double* coords = (const double*) coords_buffer;
+    Py_ssize_t count = coords_size / sizeof(double);
+
+    /* validate everything first, so a bad buffer leaves the path as is */
+    Py_ssize_t needed = 0;
+    for (Py_ssize_t i = 0; i < opcodes_size; i++) {
+        if (opcodes[i] > 4) {
+            PyErr_Format(PyExc_ValueError, "unknown path opcode %d", opcodes[i]);
+            return NULL;
+        }
+        needed += sizes[opcodes[i]];
+    }
+    if (needed != count) {
+        PyErr_SetString(PyExc_ValueError, "coordinate count does not match opcodes");
+        return NULL;
+    }
+
+    agg::path_storage* path = self->path;
+    const double* c = coords;
+    for (Py_ssize_t i = 0; i < opcodes_size; i++) {
+        switch (opcodes[i]) {
+        case 0:
+            path->move_to(c[0], c[1]);
+            break;
+        case 1:
+            path->line_to(c[0], c[1]);
+            break;
+        case 2:
+            path->curve3(c[0], c[1], c[2], c[3]);
+            break;
+        case 3:
+            path->curve4(c[0], c[1], c[2], c[3], c[4], c[5]);
+            break;
+        case 4:
+            path->close_polygon(0);
+            break;
+        }
+        c += sizes[opcodes[i]];
+    }
+
+    /* expand curves once for the whole path */
+    if (flatten)
+        expandPaths(self);
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+static PyObject*
+path_dump(PathObject* self, PyObject* args)
+{
+    /* the inverse of extend(): returns the path as an (opcodes, coords)
+       pair of strings, one opcode byte per element and native doubles
+       for the coordinates. Both are plain strings, so a path can be
+       pickled and rebuilt in another process. */
+
+    if (!PyArg_ParseTuple(args, ":dump"))
+        return NULL;
+
+    agg::path_storage* path = self->path;
+    unsigned total = path->total_vertices();
+
+    std::vector<unsigned char> opcodes;
+    std::vector<double> coords;
+    opcodes.reserve(total);
+    coords.reserve(total * 2);
+
+    double x, y;
+    unsigned i = 0;
+    while (i < total) {
+        unsigned cmd = path->vertex(i, &x, &y);
+        if (agg::is_move_to(cmd)) {
+            opcodes.push_back(0);
+        } else if (cmd == agg::path_cmd_line_to) {
+            opcodes.push_back(1);
+        } else if (cmd == agg::path_cmd_curve3 && i + 1 < total) {
+            opcodes.push_back(2);
+            coords.push_back(x);
+            coords.push_back(y);
+            path->vertex(++i, &x, &y);
+        } else if (cmd == agg::path_cmd_curve4 && i + 2 < total) {
+            opcodes.push_back(3);
+            coords.push_back(x);
+            coords.push_back(y);
+            path->vertex(++i, &x, &y);
+            coords.push_back(x);
+            coords.push_back(y);
+            path->vertex(++i, &x, &y);
+        } else {
+            if (agg::is_end_poly(cmd) && agg::is_closed(cmd))
+                opcodes.push_back(4);
+            i++;
+            continue;
+        }
+        coords.push_back(x);
+        coords.push_back(y);
+        i++;
+    }
+
+    PyObject* opcodesOut = PyString_FromStringAndSize(
+        opcodes.empty() ? "" : (char*) &opcodes[0], opcodes.size());
+    PyObject* coordsOut = PyString_FromStringAndSize(
+        coords.empty() ? "" : (char*) &coords[0], coords.size() * sizeof(double));
+
+    if (!opcodesOut || !coordsOut) {
+        Py_XDECREF(opcodesOut);
+        Py_XDECREF(coordsOut);
+        return NULL;
+    }
+
+    return Py_BuildValue("(NN)", opcodesOut, coordsOut);
+}
+
 static PyObject* path_close(PathObject* self, PyObject* args){
     if (!PyArg_ParseTuple(args, ":close"))
         return NULL;
@@ -1789,7 +2359,9 @@ path_polygon(PathObject* self, PyObject* args)
 static PyObject*
 path_bounds(PathObject* self, PyObject* args)
 {
-  if (!PyArg_ParseTuple(args, ":coords"))
+  /* returns (x0, y0, x1, y1) over the flattened path, or all zeros
+     for an empty path */
+  if (!PyArg_ParseTuple(args, ":bounds"))
     return NULL;
 
   agg::conv_curve<agg::path_storage> curve(*self->path);
@@ -1797,23 +2369,30 @@ path_bounds(PathObject* self, PyObject* args)
   curve.rewind(0);
   curve.approximation_scale(1);
 
-  double x = 0;
-  double y = 0;
+  double x0 = 0, y0 = 0, x1 = 0, y1 = 0;
   double X,  Y;
+  bool first = true;
   
   unsigned cmd;
   while (!agg::is_stop(cmd = curve.vertex(&X, &Y))) {
     if (agg::is_vertex(cmd)) {
-      if (X > x){
-        x = X;
+      if (first) {
+        x0 = x1 = X;
+        y0 = y1 = Y;
+        first = false;
+        continue;
       }
-      if (Y > y){
-        y = Y;
-      }
-
+      if (X < x0)
+        x0 = X;
+      if (X > x1)
+        x1 = X;
+      if (Y < y0)
+        y0 = Y;
+      if (Y > y1)
+        y1 = Y;
     }
   }
-  return Py_BuildValue("(ii)", x, y);
+  return Py_BuildValue("(dddd)", x0, y0, x1, y1);
 }
 
 static PyObject*
@@ -1868,6 +2447,8 @@ static PyMethodDef path_methods[] = {
     {"close", (PyCFunction) path_close, METH_VARARGS},
 
     {"polygon", (PyCFunction) path_polygon, METH_VARARGS},
+    {"extend", (PyCFunction) path_extend, METH_VARARGS},
+    {"dump", (PyCFunction) path_dump, METH_VARARGS},
 
     {"coords", (PyCFunction) path_coords, METH_VARARGS},
     {"bounds", (PyCFunction) path_bounds, METH_VARARGS},
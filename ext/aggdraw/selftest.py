@@ -108,6 +108,149 @@ def testpath():
 
     """
 
+def testpaths():
+    """
+
+    >>> draw = Draw("RGB", (500, 500))
+
+    >>> pen = Pen("black")
+    >>> brush = Brush("black")
+
+    >>> p = Path()
+    >>> p.moveto(0, 0)
+    >>> p.lineto(10, 10)
+    >>> p.lineto(0, 10)
+    >>> p.close()
+
+    >>> draw.paths([])
+    >>> draw.paths([(p,)])
+    >>> draw.paths([(p, None, pen, None), (p, (1, 0, 0, 1, 20, 20), None, brush)])
+    >>> draw.paths([(p, (1, 0, 0, 1, 20, 20), pen, brush)] * 100)
+
+    >>> draw.paths([(p, (1, 0, 0))])
+    Traceback (most recent call last):
+    TypeError: expected 6-item transform
+
+    >>> draw.paths([(None,)])
+    Traceback (most recent call last):
+    TypeError: paths() argument 1 must be Path, not None
+
+    """
+
+def testpathextend():
+    """
+
+    >>> from array import array
+
+    >>> p = Path()
+    >>> p.extend(array('B', [0, 1, 1, 4]), array('d', [0, 0, 10, 0, 10, 10]))
+    >>> p.coords()
+    [0.0, 0.0, 10.0, 0.0, 10.0, 10.0]
+
+    >>> p = Path()
+    >>> p.extend(array('B', [0, 3]), array('d', [0, 0, 0, 10, 10, 10, 10, 0]))
+    >>> len(p.coords()) > 4
+    True
+
+    >>> Path().bounds()
+    (0.0, 0.0, 0.0, 0.0)
+    >>> p = Path()
+    >>> p.extend(array('B', [0, 1, 1, 4]), array('d', [-5, 2, 10, 0, 10, 10]))
+    >>> p.bounds()
+    (-5.0, 0.0, 10.0, 10.0)
+
+    >>> p.extend(array('B', [0, 1]), array('d', [0, 0]))
+    Traceback (most recent call last):
+    ValueError: coordinate count does not match opcodes
+
+    >>> p.extend(array('B', [9]), array('d'))
+    Traceback (most recent call last):
+    ValueError: unknown path opcode 9
+
+    >>> p = Path()
+    >>> p.extend(array('B', [0, 3]), array('d', [0, 0, 0, 10, 10, 10, 10, 0]))
+    >>> opcodes, coords = p.dump()
+    >>> q = Path()
+    >>> q.extend(array('B', opcodes), array('d', coords), False)
+    >>> q.coords() == p.coords()
+    True
+
+    """
+
+def testtile():
+    """
+
+    >>> draw = Draw("RGB", (10, 10))
+    >>> draw.setclip((0, 0, 20, 20))
+    >>> draw.setorigin((10, 0))
+    >>> draw.rectangle((12, 2, 18, 8), None, Brush("red"))
+    >>> data = draw.tostring()
+    >>> data[(5 * 10 + 5) * 3:(5 * 10 + 6) * 3]
+    '\\xff\\x00\\x00'
+    >>> data[5 * 10 * 3:(5 * 10 + 1) * 3]
+    '\\xff\\xff\\xff'
+
+    >>> draw.setclip((0, 0))
+    Traceback (most recent call last):
+    TypeError: setclip() argument 1 must be sequence of length 4, not 2
+
+    """
+
+def testthreads():
+    """
+
+    >>> import threading
+    >>> p = Path()
+    >>> p.moveto(2, 2); p.lineto(8, 2); p.lineto(8, 8); p.close()
+    >>> records = [(p, None, Pen("black"), Brush("red"))] * 100
+    >>> def render(out):
+    ...     draw = Draw("RGB", (10, 10))
+    ...     draw.paths(records)
+    ...     out.append(draw.tostring())
+    >>> out = []
+    >>> threads = [threading.Thread(target=render, args=(out,)) for i in range(4)]
+    >>> for t in threads: t.start()
+    >>> for t in threads: t.join()
+    >>> len(out), len(set(out))
+    (4, 1)
+
+    """
+
+def testbuffer():
+    """
+
+    >>> draw = Draw("RGB", (3, 2))
+    >>> view = memoryview(draw)
+    >>> view.shape, view.strides, view.format, view.readonly
+    ((2L, 3L, 3L), (9L, 3L, 1L), 'B', False)
+
+    >>> draw.rectangle((0, 0, 3, 2), None, Brush("red"))
+    >>> view.tobytes()[:6]
+    '\\xff\\x00\\x00\\xff\\x00\\x00'
+
+    >>> import ctypes
+    >>> pixels = (ctypes.c_ubyte * 18).from_buffer(draw)
+    >>> pixels[0] = 7
+    >>> draw.tostring()[:3]
+    '\\x07\\x00\\x00'
+
+    """
+
+def testmasks():
+    """
+
+    >>> atlas = bytearray("\\x00\\xff\\x80\\xff")
+    >>> draw = Draw("L", (4, 2), "black")
+    >>> draw.masks(atlas, 2, [(0, 0, 2, 2, 1, 0)], Brush("white"))
+    >>> draw.tostring()
+    '\\x00\\x00\\xff\\x00\\x00\\x7f\\xff\\x00'
+
+    >>> draw.masks(atlas, 2, [(1, 0, 2, 2, 0, 0)], Brush("white"))
+    Traceback (most recent call last):
+    ValueError: masks() box outside the atlas
+
+    """
+
 def testsymbol():
     """
 
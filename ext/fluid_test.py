@@ -34,9 +34,11 @@ def vector_print(list):
 #a.add_force(*d)
 #pygame = PyGameCanvas(500, 500)
 
+ctx = Canvas(width=500, height=500, gtk_draw=True)
+
 def draw():
     global m
-    ctx = Canvas(width=500, height=500, gtk_draw=True)
+    ctx.begin_frame()
     wn = 500.0 / (grid_size - 1)
     hn = 500.0 / (grid_size - 1)
     
@@ -1169,13 +1169,17 @@ static PyObject* pFT_Bitmap_new(PyObject* self, PyObject* args) {
     FT_Vector origin;
     FT_Render_Mode mode;
     FT_Glyph bitmap;
+    int orig_x, orig_y;
     
     pFT_Bitmap *res;
     pFT_Glyph *glyph;
     
+    /* FT_Pos is a long, wider than the "i" format on 64-bit builds */
     if (!PyArg_ParseTuple(args, "O!iii", &pFT_Glyph_Type, &glyph,
-                          &mode, &origin.x, &origin.y))
+                          &mode, &orig_x, &orig_y))
         return NULL;
+    origin.x = orig_x;
+    origin.y = orig_y;
     
     err = FT_Glyph_Copy(glyph->glyph, &bitmap);
     if (err)
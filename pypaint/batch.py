@@ -0,0 +1,137 @@
+"""
+Grobs for a whole population of shapes at once, built from coordinate
+arrays instead of one grob per shape:
+
+    markers(x, y, w, h)                 # n ellipses drawn in one style
+    polylines(points, starts, colors)   # n polylines, a color each
+
+Their geometry is handed to aggdraw with Path.extend() from opcode and
+coordinate buffers built with numpy, and the canvas draws them as one
+path per style, so a frame of thousands of particles or trails costs a
+few records rather than thousands of grobs.
+"""
+from pypaint.mixins           import *
+from pypaint.types.color      import Color
+from pypaint.types.pathbuffer import OP_MOVETO, OP_LINETO, OP_CURVETO, OP_CLOSE, KAPPA
+from aggdraw                  import Path
+
+import numpy
+
+## an ellipse as the path grob's ellipse() makes it: a moveto, four quarter curves
+## and a close, with its 13 points on the unit circle
+ELLIPSE_OPCODES = numpy.array([OP_MOVETO] + [OP_CURVETO] * 4 + [OP_CLOSE], dtype=numpy.uint8)
+ELLIPSE_X = numpy.array([-1, -1, -KAPPA, 0, KAPPA, 1, 1, 1, KAPPA, 0, -KAPPA, -1, -1])
+ELLIPSE_Y = numpy.array([0, -KAPPA, -1, -1, -1, -KAPPA, 0, KAPPA, 1, 1, 1, KAPPA, 0])
+
+def ellipseBuffers(x, y, w, h):
+    """Return the (opcodes, coords) buffers of ellipses with top left
+    corners (x, y) and sizes (w, h), arrays or numbers for all."""
+    (x, y, w, h) = [a.ravel() for a in numpy.broadcast_arrays(*[numpy.asarray(v, dtype=numpy.float64)
+                                                                for v in (x, y, w, h)])]
+    (rx, ry) = (w / 2, h / 2)
+    coords = numpy.empty((len(x), len(ELLIPSE_X), 2))
+    coords[:, :, 0] = (x + rx)[:, None] + rx[:, None] * ELLIPSE_X
+    coords[:, :, 1] = (y + ry)[:, None] + ry[:, None] * ELLIPSE_Y
+    return numpy.tile(ELLIPSE_OPCODES, len(x)), coords.ravel()
+
+def polylineBuffers(points, starts, closed=False):
+    """Return the (opcodes, coords) buffers of the polylines in an
+    (m, 2) array of points, each starting at the index in starts."""
+    points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 2)
+    starts = numpy.asarray(starts, dtype=numpy.int64)
+
+    opcodes = numpy.empty(len(points), dtype=numpy.uint8)
+    opcodes.fill(OP_LINETO)
+    opcodes[starts] = OP_MOVETO
+    if closed and len(starts):
+        ## a close, which takes no coordinates, after each last point
+        ends = numpy.append(starts[1:], len(points))
+        opcodes = numpy.insert(opcodes, ends, OP_CLOSE)
+    return opcodes, numpy.ascontiguousarray(points).ravel()
+
+class markers(Grob, TransformMixin, ColorMixin):
+    """Ellipses with top left corners (x, y) and sizes (w, h), arrays
+    or numbers for all, as one path in a single fill and stroke."""
+    type = 'path'
+    def __init__(self, x, y, w, h=None, **kwargs):
+        TransformMixin.__init__(self)
+        ColorMixin.__init__(self, **kwargs)
+        if h is None:
+            h = w
+        self.path = Path()
+        self.path.extend(*ellipseBuffers(x, y, w, h))
+
+class polylines(Grob, TransformMixin, ColorMixin):
+    """Polylines from an (m, 2) array of points, each starting at the
+    index in starts, with an optional (n, 3) or (n, 4) array of colors,
+    one for each.
+
+    Open polylines are stroked in their color. Closed ones (polygons)
+    are filled with it, and stroked in the grob's stroke color if it has
+    one. Without colors, the grob's fill and stroke are used for all.
+    """
+    type = 'polylines'
+    def __init__(self, points, starts, colors=None, closed=False, **kwargs):
+        TransformMixin.__init__(self)
+        ColorMixin.__init__(self, **kwargs)
+
+        self.points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 2)
+        self.starts = numpy.asarray(starts, dtype=numpy.int64)
+        self.colors = colors
+        self.closed = closed
+        self._paths = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _group(self, order, bounds):
+        ## the polylines in order as a path for each run between bounds,
+        ## sliced from buffers built for all of them at once
+        lengths = numpy.diff(numpy.append(self.starts, len(self.points)))[order]
+        ends    = numpy.cumsum(lengths)
+        first   = ends - lengths
+        rows    = numpy.repeat(self.starts[order] - first, lengths) + numpy.arange(ends[-1])
+        (opcodes, coords) = polylineBuffers(self.points[rows], first, self.closed)
+
+        ## where each polyline starts in the buffers, with a close for
+        ## each one before it when closed
+        opstarts    = numpy.append(first + self.closed * numpy.arange(len(first)), len(opcodes))
+        coordstarts = numpy.append(first, ends[-1]) * 2
+
+        paths = []
+        for (a, b) in zip(bounds[:-1], bounds[1:]):
+            p = Path()
+            p.extend(opcodes[opstarts[a]:opstarts[b]], coords[coordstarts[a]:coordstarts[b]])
+            paths.append(p)
+        return paths
+
+    def paths(self):
+        """Return a (path, fill color, stroke color) for each color
+        used, drawing the polylines of that color."""
+        if self._paths is not None:
+            return self._paths
+
+        count = len(self.starts)
+        if not count:
+            self._paths = []
+        elif self.colors is None:
+            (p,) = self._group(numpy.arange(count), [0, count])
+            self._paths = [(p, self._fillcolor, self._strokecolor)]
+        else:
+            ## colors the same in 0-255 share a style, and a path
+            colors = numpy.asarray(self.colors, dtype=numpy.float64).reshape(count, -1)
+            if colors.shape[1] == 3:
+                colors = numpy.hstack((colors, numpy.ones((count, 1))))
+            levels = numpy.clip(numpy.round(colors * 255), 0, 255).astype(numpy.int64)
+            keys   = numpy.dot(levels, [1 << 24, 1 << 16, 1 << 8, 1])
+            order  = numpy.argsort(keys, kind='mergesort')
+            bounds = numpy.concatenate(([0], numpy.flatnonzero(numpy.diff(keys[order])) + 1, [count]))
+
+            self._paths = []
+            for (start, p) in zip(bounds, self._group(order, bounds)):
+                color = Color(*[c / 255.0 for c in levels[order[start]]])
+                if self.closed:
+                    self._paths.append((p, color, self._strokecolor))
+                else:
+                    self._paths.append((p, None, color))
+        return self._paths
@@ -20,9 +20,42 @@ class Canvas(CanvasMixin):
     def reset_canvas(self, r, g, b):
         self.backend.reset_canvas(r, g, b)
 
+    def begin_frame(self, background=None):
+        '''
+        Empties the display list and clears the backend surface for the
+        next frame of an animation, reusing both.
+        '''
+        self.clear()
+        self.backend.begin_frame(background)
+
     def draw(self):
         self.backend.draw(stack=self.data)
 
+    def scaled(self, width, height=None):
+        '''
+        Draws the retained display list onto a new backend surface of the
+        given size and returns it; this canvas is left untouched.
+        '''
+        scale = float(width) / self.width
+        if height is None:
+            height = int(self.height * scale)
+
+        backend = self.backend.__class__(width, height, gtk=self.gtk_draw)
+        backend.draw(stack=self.data, scale=scale)
+        return backend
+
+    def enable_stats(self, log=None):
+        '''
+        Starts recording render stats on the backend; see utils.profile.
+        '''
+        return self.backend.enable_stats(log)
+
+    def disable_stats(self):
+        self.backend.disable_stats()
+
+    def stats(self):
+        return self.backend.stats()
+
     def show(self):
         self.backend.show()
 
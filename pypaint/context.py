@@ -1,10 +1,10 @@
 from PIL                             import Image
 from pypaint.types.transform         import Transform
-from pypaint.types.text              import Text
-from pypaint.types.canvas            import BezierPath
+from pypaint.types.paths             import BezierPath
 from pypaint.types.canvas            import PILCanvas
 from pypaint.types.color             import Color
 from pypaint.utils                   import util
+from pypaint.utils                   import fonts
 from pypaint.utils.defaults          import *
 
 from math        import *
@@ -75,6 +75,18 @@ class Context:
         self.canvas.draw()
         self.canvas.output(filename, "PNG")
         #self.canvas.show()
+
+    def enable_stats(self, log=None):
+        '''
+        Starts recording render stats on the canvas; see utils.profile.
+        '''
+        return self.canvas.enable_stats(log)
+
+    def disable_stats(self):
+        self.canvas.disable_stats()
+
+    def stats(self):
+        return self.canvas.stats()
     
     def size(self, width, height):
         self.WIDTH  = width
@@ -504,6 +516,8 @@ class Context:
         return self._makeInstance(Image, args, kwargs)
 
     def Text(self, *args, **kwargs):
+        ## fontTools and the text layout code load with the first text
+        from pypaint.types.text import Text
         return self._makeInstance(Text, args, kwargs)
 
     def color(self, *args):
@@ -546,7 +560,7 @@ class Context:
         txt = self.Text(txt, x, y, path=path, **kwargs)
 
         if outline:
-          path = txt.path
+          path = txt.sentence()
           if draw:
               self.canvas.add(path)
           return path
@@ -562,19 +576,28 @@ class Context:
         Draws an outlined path of the input text
         '''
         txt = self.Text(txt, x=x, y=y, width=width, height=height, **kwargs)
-        path = txt.path
+        path = txt.sentence()
         if draw:
             self.canvas.add(path)
         return path
 
     def textmetrics(self, txt, width=None, height=None, **kwargs):
         '''Returns the width and height of a string of text as a tuple
-        (according to current font settings).
+        (according to current font settings, or the font file and
+        fontsize given as keywords).
+
+        The width is the kerned advance of the string and the height is
+        the font's line height, ascent - descent + line gap at the size,
+        rather than the extent of the laid out glyphs. Text is not
+        wrapped: width and height are accepted as in NodeBox, but unused.
         '''
-        # for now only returns width and height (as per Nodebox behaviour)
-        # but maybe we could use the other data from cairo
-        txt = self.Text(txt, 0, 0, width, height, **kwargs)
-        return txt.metrics
+        fontfile = kwargs.pop('font', self._fontfile)
+        fontsize = kwargs.pop('fontsize', self._fontsize)
+        if kwargs:
+            raise TypeError("textmetrics() got unexpected keyword arguments: %s"
+                            % ", ".join(sorted(kwargs)))
+        # measured from the font's tables, memoized; no Text is made
+        return fonts.textsize(fontfile, fontsize, txt)
 
     def textwidth(self, txt, width=None):
         '''Returns the width of a string of text according to the current
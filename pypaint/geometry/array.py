@@ -85,6 +85,15 @@ def unionRect((xMin1, yMin1, xMax1, yMax1), (xMin2, yMin2, xMax2, yMax2)):
                               max(xMax1, xMax2), max(yMax1, yMax2))
     return (xMin, yMin, xMax, yMax)
 
+def transformRect((xMin, yMin, xMax, yMax), (a, b, c, d, e, f)):
+    """Return the bounding rectangle of the rectangle mapped through the
+    affine matrix (a, b, c, d, e, f), where x' = a*x + c*y + e and
+    y' = b*x + d*y + f.
+    """
+    xs = (a*xMin + c*yMin, a*xMax + c*yMin, a*xMin + c*yMax, a*xMax + c*yMax)
+    ys = (b*xMin + d*yMin, b*xMax + d*yMin, b*xMin + d*yMax, b*xMax + d*yMax)
+    return min(xs) + e, min(ys) + f, max(xs) + e, max(ys) + f
+
 def rectCenter((xMin, yMin, xMax, yMax)):
     """Return the center of the rectangle as an (x, y) coordinate."""
     return (xMin+xMax)/2, (yMin+yMax)/2
@@ -59,6 +59,71 @@ def calculateCubicBounds(pt1, pt2, pt3, pt4):
     return array.calculateBounds(points)
 
 
+def calculateQuadraticExtrema(pt1, pt2, pt3):
+    """
+    Vectorized calculateQuadraticBounds: pt1, pt2 and pt3 are (n, 2)
+    arrays holding n quadratic segments. Returns the points where the
+    segments reach their extrema in x or y, as a (2n, 2) array; segments
+    without an extremum inside (0, 1) contribute their first anchor.
+    """
+    a, b, c = calculateQuadraticParameters(pt1, pt2, pt3)
+    ## first derivative: 2at + b = 0
+    t = _divide(-b, a * 2.0)
+    t = numpy.where((t > 0) & (t < 1), t, 0.0)
+
+    points = []
+    for axis in (0, 1):
+        ts = t[:, axis:axis+1]
+        points.append(a*ts*ts + b*ts + c)
+    return numpy.concatenate(points)
+
+
+def calculateCubicExtrema(pt1, pt2, pt3, pt4):
+    """
+    Vectorized calculateCubicBounds: pt1 to pt4 are (n, 2) arrays holding
+    n cubic segments. Returns the points where the segments reach their
+    extrema in x or y, as a (4n, 2) array; roots outside (0, 1) evaluate
+    to the first anchor. The end anchors are not included: add them for
+    the bounds.
+
+    >>> pts = [numpy.array([pt], dtype=float) for pt in ((0, 0), (25, 100), (75, 100), (100, 0))]
+    >>> calculateCubicExtrema(*pts).max(axis=0).tolist()
+    [50.0, 75.0]
+    >>> numpy.concatenate([calculateCubicExtrema(*pts), pts[0], pts[3]]).max(axis=0).tolist()
+    [100.0, 75.0]
+    """
+    a, b, c, d = calculateCubicParameters(pt1, pt2, pt3, pt4)
+    ## first derivative: 3at^2 + 2bt + c = 0, as in calculateCubicBounds
+    qa = a * 3.0
+    qb = b * 2.0
+    qc = c
+
+    linear = numpy.abs(qa) < epsilon
+    disc = qb*qb - 4.0*qa*qc
+    valid = (disc >= 0) & ~linear
+    root = numpy.sqrt(numpy.where(valid, disc, 0.0))
+    denominator = numpy.where(linear, 1.0, 2.0*qa)
+
+    t1 = numpy.where(linear, _divide(-qc, qb), (-qb + root) / denominator)
+    t2 = numpy.where(linear, 0.0, (-qb - root) / denominator)
+    valid = valid | linear
+
+    points = []
+    for t in (t1, t2):
+        t = numpy.where(valid & (t > 0) & (t < 1), t, 0.0)
+        for axis in (0, 1):
+            ts = t[:, axis:axis+1]
+            points.append(a*ts*ts*ts + b*ts*ts + c*ts + d)
+    return numpy.concatenate(points)
+
+
+def _divide(numerator, denominator):
+    ## elementwise division that yields 0 (an anchor) where the
+    ## denominator vanishes
+    safe = numpy.where(numpy.abs(denominator) < epsilon, 1.0, denominator)
+    return numpy.where(numpy.abs(denominator) < epsilon, 0.0, numerator / safe)
+
+
 def splitLine(pt1, pt2, where, isHorizontal):
     """Split the line between pt1 and pt2 at position 'where', which
     is an x coordinate if isHorizontal is False, a y coordinate if
@@ -0,0 +1,190 @@
+"""
+A uniform grid spatial hash over an (n, dims) array of points, for
+finding the points near each other without testing every pair.
+
+The points are binned into cubic cells of a given size and sorted by
+cell, so the points of a cell are a slice of the sorted order. With
+cells at least as large as the search radius, everything within the
+radius of a point lies in the 3**dims cells around it, and nothing
+further away is visited: for evenly spread points a query costs the
+same however many there are.
+
+    grid = SpatialHash(positions, 10)
+    (i, j) = grid.pairs(10)         # every ordered pair closer than 10
+    grid.query((x, y), 5)           # the points within 5 of (x, y)
+    grid.within(others, 5)          # pairs of others and points within 5
+
+The hash is a snapshot: build a new one when the points move.
+"""
+import numpy
+
+## slices are looked up in a table with an entry per cell while there
+## are no more than this many cells per point; sparser grids use a
+## binary search over the occupied cells
+DENSE_CELLS = 16
+
+## iterpairs() walks the points in runs of about this many candidate
+## pairs, to bound the memory of dense neighbourhoods
+CANDIDATES = 1 << 20
+
+class SpatialHash:
+    def __init__(self, points, cell):
+        if cell <= 0:
+            raise ValueError("SpatialHash cell size must be positive")
+
+        self.points = numpy.asarray(points, dtype=numpy.float64)
+        self.cell   = float(cell)
+        count, dims = self.points.shape
+
+        cells = numpy.floor(self.points / self.cell).astype(numpy.int64)
+        if count:
+            self.low  = cells.min(axis=0)
+            self.high = cells.max(axis=0)
+        else:
+            self.low  = self.high = numpy.zeros(dims, dtype=numpy.int64)
+        ## cells are numbered row by row over the occupied range
+        self.cells   = cells - self.low
+        self.extent  = self.high - self.low + 1
+        self.strides = numpy.cumprod(numpy.concatenate((self.extent[1:], [1]))[::-1])[::-1]
+
+        keys = numpy.dot(self.cells, self.strides)
+        self.order = numpy.argsort(keys, kind='mergesort')
+        self.keys  = keys
+
+        total = int(numpy.prod(self.extent))
+        if total <= DENSE_CELLS * max(count, 1024):
+            ## the slice of the sorted order each cell holds
+            counts = numpy.bincount(keys, minlength=total)
+            self.counts = counts
+            self.starts = numpy.cumsum(counts) - counts
+            self.occupied = None
+        else:
+            (self.occupied, first, counts) = numpy.unique(keys[self.order],
+                                                          return_index=True, return_counts=True)
+            self.starts = first
+            self.counts = counts
+
+    def slices(self, keys):
+        """Return the (start, count) in the sorted order of the cells
+        keys; keys of -1 are cells outside the grid, with no points."""
+        outside = keys < 0
+        if self.occupied is None:
+            keys = numpy.where(outside, 0, keys)
+            return self.starts[keys], numpy.where(outside, 0, self.counts[keys])
+
+        index = numpy.minimum(numpy.searchsorted(self.occupied, keys), len(self.occupied) - 1)
+        found = numpy.logical_and(self.occupied[index] == keys, ~outside)
+        return self.starts[index], numpy.where(found, self.counts[index], 0)
+
+    def offsets(self, half=False):
+        """Return the offsets from a cell to its neighbours and itself.
+        With half, only one of each opposite pair of offsets is given,
+        for visiting each pair of cells once."""
+        dims = len(self.extent)
+        steps = numpy.indices((3,) * dims).reshape(dims, -1).T - 1
+        if half:
+            ## (0, ..., 0) and the offsets after it
+            steps = steps[len(steps) // 2:]
+        return steps
+
+    def candidates(self, cells, keys, offsets):
+        """Return (row, index): for each row of cells (relative to the
+        grid, with their keys), the indices of the points in the cells
+        offsets away from it."""
+        rows    = []
+        indices = []
+        if not len(self.order):
+            empty = numpy.zeros(0, dtype=numpy.int64)
+            return empty, empty
+
+        for offset in offsets:
+            neighbour = keys + numpy.dot(offset, self.strides)
+            for axis in range(len(offset)):
+                moved = cells[:, axis] + offset[axis]
+                outside = numpy.logical_or(moved < 0, moved >= self.extent[axis])
+                neighbour = numpy.where(outside, -1, neighbour)
+
+            (starts, counts) = self.slices(neighbour)
+            total = counts.sum()
+            if not total:
+                continue
+
+            ## each row's slice of the sorted order, laid end to end
+            row   = numpy.repeat(numpy.arange(len(cells)), counts)
+            first = numpy.cumsum(counts) - counts
+            slot  = numpy.arange(total) - numpy.repeat(first - starts, counts)
+            rows.append(row)
+            indices.append(self.order[slot])
+
+        if not rows:
+            empty = numpy.zeros(0, dtype=numpy.int64)
+            return empty, empty
+        return numpy.concatenate(rows), numpy.concatenate(indices)
+
+    def iterpairs(self, radius, budget=CANDIDATES):
+        """Yield (i, j) index arrays of the ordered pairs of points
+        closer than radius, which must not be larger than the cell size,
+        a run of points at a time. Every pair comes once in each order;
+        points are not paired with themselves."""
+        if radius > self.cell:
+            raise ValueError("SpatialHash radius larger than the cell size")
+
+        ## walked in cell order, so neighbouring points are near in
+        ## memory, and over half the neighbours: each pair is found once
+        ## and given in both orders
+        order   = self.order
+        cells   = self.cells[order]
+        keys    = self.keys[order]
+        offsets = self.offsets(half=True)
+
+        ## about as many candidates as points in the cells around each
+        estimate = len(offsets) * (self.counts * self.counts).sum()
+        step = max(1, int(len(order) * budget // max(estimate, 1)))
+
+        for start in xrange(0, len(order), step):
+            (row, j) = self.candidates(cells[start:start+step], keys[start:start+step], offsets)
+            i = order.take(row + start)
+
+            ## pairs within one cell come in both orders: keep i < j
+            once = numpy.logical_or(i < j, self.keys.take(i) != self.keys.take(j))
+            near = numpy.logical_and(self.distance(i, j) < radius * radius, once)
+            (i, j) = (i[near], j[near])
+            yield numpy.concatenate((i, j)), numpy.concatenate((j, i))
+
+    def pairs(self, radius):
+        """Return iterpairs(radius) as two index arrays (i, j)."""
+        chunks = list(self.iterpairs(radius))
+        if not chunks:
+            empty = numpy.zeros(0, dtype=numpy.int64)
+            return empty, empty
+        return (numpy.concatenate([i for (i, j) in chunks]),
+                numpy.concatenate([j for (i, j) in chunks]))
+
+    def distance(self, i, j):
+        """Return the squared distances between points i and j."""
+        distance = numpy.zeros(len(i))
+        for axis in range(self.points.shape[1]):
+            values = numpy.ascontiguousarray(self.points[:, axis])
+            delta = values.take(i) - values.take(j)
+            distance += delta * delta
+        return distance
+
+    def within(self, points, radius):
+        """Return (i, j): each pair of a row i of points (any points,
+        not only hashed ones) and a hashed point j closer than radius."""
+        if radius > self.cell:
+            raise ValueError("SpatialHash radius larger than the cell size")
+        points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, self.points.shape[1])
+        cells = numpy.floor(points / self.cell).astype(numpy.int64) - self.low
+        ## cells beyond the grid may still neighbour it; keys are only
+        ## used for cells inside it
+        keys  = numpy.dot(cells, self.strides)
+        (i, j) = self.candidates(cells, keys, self.offsets())
+        delta = self.points[j] - points[i]
+        near = (delta * delta).sum(axis=1) < radius * radius
+        return i[near], j[near]
+
+    def query(self, point, radius):
+        """Return the indices of the points closer than radius to point."""
+        (i, j) = self.within([point], radius)
+        return numpy.sort(j)
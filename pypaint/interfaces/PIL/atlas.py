@@ -0,0 +1,201 @@
+'''
+A glyph atlas for raster text.
+
+Draw.text() has FreeType render every glyph of a string each time it is
+drawn. A GlyphAtlas rasterizes a glyph once, with the ft2 font engine,
+and packs its coverage into an 8-bit atlas image; text drawn again at
+the same size is blended straight from the atlas with Draw.masks().
+
+Glyphs are keyed on (font file, size, glyph index, subpixel offset):
+the pen position is kept in fractions of a pixel, and each glyph is
+rendered at subpixels horizontal offsets so kerned and proportional text
+keeps its spacing. Laid out strings are cached too, relative to their
+starting pixel, so redrawing a label is a dict lookup and one masks()
+call.
+
+Only untransformed text can come from the atlas; the canvas draws
+transformed text as outlines.
+'''
+from pypaint.utils.cache import LRUCache
+
+from math import floor
+
+## FreeType constants, as exported by ft2
+FT_LOAD_DEFAULT        = 0
+FT_RENDER_MODE_NORMAL  = 0
+FT_KERNING_DEFAULT     = 0
+
+class GlyphAtlas:
+    '''
+    Rasterized glyphs packed on shelves into data, a bytearray of
+    coverage width bytes wide that grows a row at a time up to maxrows.
+    When it is full it is emptied and glyphs are rendered again as they
+    are used.
+    '''
+    def __init__(self, width=1024, maxrows=2048, subpixels=4):
+        self.width     = width
+        self.maxrows   = maxrows
+        self.subpixels = subpixels
+
+        self.library = None
+        self.faces   = {}
+        ## the size each face is set to
+        self.sizes   = {}
+        self.layouts = LRUCache(1024)
+        self.reset()
+
+        ## glyphs rendered into the atlas, and times it was emptied
+        self.renders = 0
+        self.resets  = 0
+
+    def reset(self):
+        self.data   = bytearray()
+        self.rows   = 0
+        self.glyphs = {}
+        self.layouts.clear()
+
+        ## the shelf being filled: its top, height and the next free x
+        self.shelf_y = 0
+        self.shelf_h = 0
+        self.shelf_x = 0
+
+    ### FreeType ###
+    def face(self, file, size):
+        '''
+        Returns the ft2 face of file, set to size pixels per em.
+        '''
+        face = self.faces.get(file)
+        if face is None:
+            from pypaint import ft2
+            if self.library is None:
+                self.library = ft2.Library()
+            face = self.faces[file] = ft2.Face(self.library, open(file, "rb"), 0)
+        if self.sizes.get(file) != size:
+            face.setPixelSizes(0, size)
+            self.sizes[file] = size
+        return face
+
+    def glyphIndex(self, file, size, char):
+        return self.face(file, size).getCharIndex(ord(char))
+
+    def kerning(self, file, size, left, right):
+        return self.face(file, size).getKerning(left, right, FT_KERNING_DEFAULT)[0] / 64.0
+
+    def ascender(self, file, size):
+        return self.face(file, size).getMetrics()[4] / 64.0
+
+    def rasterize(self, file, size, index, offset):
+        '''
+        Renders glyph index moved right by offset pixels and returns
+        (advance, left, top, width, rows, coverage).
+        '''
+        from pypaint import ft2
+        glyph  = ft2.Glyph(self.face(file, size), index, FT_LOAD_DEFAULT)
+        bitmap = ft2.Bitmap(glyph, FT_RENDER_MODE_NORMAL, int(offset * 64), 0)
+        ## glyph advances are 16.16 fixed point
+        return (glyph.advance[0] / 65536.0, bitmap.left, bitmap.top,
+                bitmap.width, bitmap.rows, bitmap.bitmap)
+
+    ### packing ###
+    def glyph(self, file, size, index, subpixel):
+        '''
+        Returns (x, y, width, rows, left, top, advance) of a glyph in
+        the atlas, rendering it on a miss, or None when it does not fit.
+        '''
+        key = (file, size, index, subpixel)
+        entry = self.glyphs.get(key)
+        if entry is None:
+            offset = float(subpixel) / self.subpixels
+            (advance, left, top, width, rows, coverage) = self.rasterize(file, size, index, offset)
+            place = self.place(width, rows, coverage)
+            if place is None:
+                return None
+            entry = self.glyphs[key] = place + (width, rows, left, top, advance)
+            self.renders += 1
+        return entry
+
+    def place(self, width, rows, coverage):
+        '''
+        Copies a width x rows coverage bitmap into the atlas and returns
+        its (x, y), or None when the atlas is full.
+        '''
+        if width > self.width:
+            return None
+        ## a pixel of space between glyphs keeps them from bleeding
+        if self.shelf_x + width > self.width:
+            self.shelf_y += self.shelf_h + 1
+            self.shelf_x  = 0
+            self.shelf_h  = 0
+        if self.shelf_y + rows > self.maxrows:
+            return None
+
+        (x, y) = (self.shelf_x, self.shelf_y)
+        self.shelf_x += width + 1
+        self.shelf_h  = max(self.shelf_h, rows)
+
+        if y + rows > self.rows:
+            self.data.extend(bytearray((y + rows - self.rows) * self.width))
+            self.rows = y + rows
+        stride = self.width
+        for row in xrange(rows):
+            start = (y + row) * stride + x
+            self.data[start:start+width] = coverage[row*width:(row+1)*width]
+        return (x, y)
+
+    ### layout ###
+    def layout(self, file, size, string, x, y):
+        '''
+        Returns the masks() boxes that draw string with its top left
+        corner at (x, y), as Draw.text() places it, or None if the
+        string does not fit in the atlas.
+        '''
+        ix = int(floor(x))
+        iy = int(floor(y + 0.5))
+        subpixel = int((x - ix) * self.subpixels)
+
+        key = (file, size, string, subpixel)
+        boxes = self.layouts.get(key)
+        if boxes is None:
+            boxes = self.build(file, size, string, float(subpixel) / self.subpixels)
+            if boxes is None:
+                ## start over with an empty atlas, once
+                self.reset()
+                self.resets += 1
+                boxes = self.build(file, size, string, float(subpixel) / self.subpixels)
+                if boxes is None:
+                    return None
+            self.layouts.put(key, boxes)
+
+        return [(sx, sy, w, h, dx + ix, dy + iy) for (sx, sy, w, h, dx, dy) in boxes]
+
+    def build(self, file, size, string, pen):
+        '''
+        Lays string out from pen, a fraction of a pixel, with the
+        baseline an ascender below 0, and returns the boxes relative to
+        (0, 0).
+        '''
+        baseline = self.ascender(file, size)
+        subpixels = self.subpixels
+
+        boxes = []
+        previous = None
+        for char in string:
+            index = self.glyphIndex(file, size, char)
+            if not index:
+                ## no glyph, no room, as in Draw.text()
+                continue
+            if previous is not None:
+                pen += self.kerning(file, size, previous, index)
+            previous = index
+
+            whole = floor(pen)
+            subpixel = int((pen - whole) * subpixels)
+            entry = self.glyph(file, size, index, subpixel)
+            if entry is None:
+                return None
+            (sx, sy, width, rows, left, top, advance) = entry
+            if width and rows:
+                boxes.append((sx, sy, width, rows,
+                              int(whole) + left, int(floor(baseline + 0.5)) - top))
+            pen += advance
+        return boxes
@@ -1,55 +1,132 @@
 from pypaint.interfaces.PIL.helper  import PILHelper
+from pypaint.interfaces.PIL.helper  import style_cache
+from pypaint.interfaces.PIL.helper  import offscreen
+from pypaint.interfaces.PIL.helper  import surfaceArray
+from pypaint.interfaces.PIL.helper  import loadedType
 from pypaint.interfaces.PIL.context import PILContext
-from pypaint.interfaces.PIL.path    import PathWrap
 from pypaint.types.transform        import Transform
-from pypaint.types.text             import Text
 from pypaint.types.paths            import BezierPath
 from pypaint.utils.defaults         import *
 from pypaint.types.mixins           import *
 from pypaint.utils.util             import *
-from pypaint                        import ft2
-
-from fontTools.ttLib                import TTFont
+from pypaint.utils.profile          import StatsMixin
 
 from PIL      import Image
-from uuid     import uuid4
+from time     import time
 from aggdraw  import *
 
 import os
 
 
-class PILCanvas:
+class PILCanvas(CanvasMixin, StatsMixin):
     def __init__(self, width=None, height=None):
+        CanvasMixin.__init__(self, width, height)
+
         self.canvas      = Image.new("RGB", (width, height), "white")
         self.AGG_canvas  = Draw(self.canvas)
         self.helper      = PILHelper()
+        self.styles      = style_cache
         self.context     = PILContext()
         
         self.AGG_canvas.setantialias(True)
 
+        self.compiles = 0
+        self.compiles_skipped = 0
+
+        ## skip paths that fall entirely outside the surface
+        self.cull   = True
+        self.culled = 0
+
+    def begin_frame(self, background="white"):
+        '''
+        Starts a new frame on the same surface: the display list is
+        emptied and the pixels are cleared to background, so an
+        animation can draw every frame on one canvas.
+        '''
+        self.clear()
+        self.AGG_canvas.clear(background)
+        self.AGG_canvas.flush()
+
+    def gtk(self):
+        '''
+        The surface as RGBA data, after the last draw().
+        '''
+        return self.canvas.convert("RGBA").tostring()
+
     def show(self, *arguments):
         self.AGG_canvas.flush()
         self.canvas.show()
         
     def output(self, filename, file_ext):
+        profile = self.profiler
+        if profile:
+            start = time()
+
         self.AGG_canvas.flush()
+        if profile:
+            start = profile.lap('flush', start)
+
         self.canvas.save(filename, file_ext)
+        if profile:
+            profile.lap('encode', start)
+
+    def pixels(self):
+        '''
+        The surface as a (height, width, 3) RGB numpy array, without a
+        copy; see surfaceArray.
+        '''
+        return surfaceArray(self.AGG_canvas)
         
     def draw(self, ctx=None):
         if not ctx:
             ctx = self.context
 
-        ## Draws things
-        while not self.grobStack.empty():
-            (priority, item) = self.grobStack.get()
+        ## paths compiled / reused from the previous frame
+        self.compiles = 0
+        self.compiles_skipped = 0
+        self.culled = 0
+
+        size = (self.width, self.height)
+
+        ## stats are taken only with a profiler; the stages of a path
+        ## are timed in drawpath()
+        profile = self.profiler
+        if profile:
+            profile.begin_frame()
+            start = time()
+
+        ## Draws things; the display list is kept, so the scene can be
+        ## drawn again (to another file, after a new background...)
+        ## the text stack (fontTools, numpy) is only loaded by scripts
+        ## that make text
+        Text = loadedType("pypaint.types.text", "Text")
+
+        for item in self.displaylist:
             if isinstance(item, RestoreCtx):
                 ctx.restore()
             else:
+                if profile:
+                    item_start = clock = time()
+
                 if isinstance(item, BezierPath):
                     deltax, deltay = item.center
                     m = item._transform.getMatrixWCenter(deltax, deltay, item._transformmode)
+                    if profile:
+                        profile.lap('transform', clock)
+
+                    if self.cull:
+                        strokewidth = item._strokecolor and (item._strokewidth or 1.0)
+                        if offscreen(item.bounds, m, size, strokewidth):
+                            self.culled += 1
+                            if profile:
+                                profile.count('culled')
+                            continue
+
                     self.AGG_canvas.settransform(tuple(m))
                     self.drawpath(item, ctx)
+                    if profile:
+                        profile.lap('path', item_start)
+                        profile.count('path')
 
                 elif isinstance(item, Text):
                     x, y = item.bounds
@@ -58,25 +135,43 @@ class PILCanvas:
                     #ctx.transform(m)
                     #ctx.translate(item.x, item.y - item.baseline)
                     self.AGG_canvas.settransform(tuple(m))
+                    if profile:
+                        profile.lap('transform', clock)
 
                     self.draw_text(item, ctx)
+                    if profile:
+                        profile.lap('text', item_start)
+                        profile.count('text')
 
                 elif isinstance(item, Image):
                     deltax, deltay = item.center
                     m = item._transform.getMatrixWCenter(deltax, deltay, item._transformmode)
                     ctx.transform(m)
                     self.drawimage(item, ctx)
+                    if profile:
+                        profile.lap('image', item_start)
+                        profile.count('image')
 
-            self.grobStack.task_done()
+        if profile:
+            clock = time()
+        self.AGG_canvas.flush()
+        if profile:
+            profile.lap('flush', clock)
+            profile.lap('draw', start)
 
     def draw_text(self, text, ctx=None):
         #print text.draw_glyph._sentence
-        R, G, B, A = text._fillcolor
-        R=int(R/1.0*255)
-        G=int(G/1.0*255)
-        B=int(B/1.0*255)
-        font = Font((R, G, B), text._fontfile, size=text._fontsize)
+        profile = self.profiler
+        if profile:
+            clock = time()
+
+        font = self.styles.font(text._fillcolor, text._fontfile, text._fontsize)
+        if profile:
+            clock = profile.lap('style', clock)
+
         self.AGG_canvas.text((text.x, text.y), text.text, font)
+        if profile:
+            profile.lap('rasterize', clock)
 
     def drawclip(self, path, ctx=None):
         '''Passes the path to a Cairo context.'''
@@ -118,23 +213,42 @@ class PILCanvas:
         ctx.clip()
     
     def drawpath(self, path, ctx=None):
-        strokeWidth = None
-        strokeColor = None
-        ellipse     = False
-
         if not isinstance(path, BezierPath):
             raise Exception("drawpath(): Expecting a BezierPath, got %s" % (path))
 
-        
-        if isinstance(path.path, PathWrap):
-            path.path.initPath()
-            nPath = path.path.path
+        ## the native path only depends on the path's elements, transforms
+        ## are applied at draw time, so it is rebuilt only after a mutation
+        profile = self.profiler
+        if profile:
+            clock = time()
+
+        version = path.version
+        if path._native is None or path._native_version != version:
+            path._native = self.compilepath(path)
+            path._native_version = version
+            self.compiles += 1
+            if profile:
+                clock = profile.lap('compile', clock)
         else:
-            return
-        
+            self.compiles_skipped += 1
+
+        arguments = self.buildPenBrush(path, templateArgs=path._native)
+        if profile:
+            clock = profile.lap('style', clock)
+
+        self.AGG_canvas.path(*arguments)
+        if profile:
+            profile.lap('rasterize', clock)
+
+    def compilepath(self, path):
+        nPath = Path()
+
+        if path.compact:
+            return path.data.compile(nPath)
+
         for element in path.data:
-            cmd    = element[0]
-            values = element[1:]
+            cmd    = element.cmd
+            values = element.values
 
             if cmd == MOVETO:
                 nPath.moveto(*values)
@@ -177,9 +291,7 @@ class PILCanvas:
             else:
                 raise Exception("PathElement(): error parsing path element command (got '%s')" % cmd)
 
-        arguments = self.buildPenBrush(path, templateArgs=nPath)
-        self.AGG_canvas.path(*arguments)
-        self.AGG_canvas.flush()
+        return nPath
 
     def buildPenBrush(self, path, templateArgs=None):
         if templateArgs:
@@ -187,31 +299,13 @@ class PILCanvas:
         else:
             PathArgs      = []
 
-        PenArguments  = []
-        PenDict       = {}
-        brush         = None
-
+        if path._strokecolor:
+            PathArgs.append(self.styles.pen(path._strokecolor, path._strokewidth or 1.0))
         if path._fillcolor:
-            (R, G, B, A) = self.helper.decToRgba(path._fillcolor)
-            color = (R, G, B)
-            brush = Brush(color, opacity=A)
+            PathArgs.append(self.styles.brush(path._fillcolor))
 
-        if path._strokecolor:
-            (R, G, B, A) = self.helper.decToRgba(path._strokecolor)
-            PenDict["color"]   = (R, G, B)
-            PenDict["opacity"] = A
-            
-        if path._strokewidth:
-            PenDict["width"] = path._strokewidth
-
-        if PenDict.has_key("color"):
-            PathArgs.append(Pen(**PenDict))
-        if brush:
-            PathArgs.append(brush)
-        
-        
         arguments = tuple(PathArgs)
         return arguments
 
-
-
+    def cache_stats(self):
+        return self.styles.stats()
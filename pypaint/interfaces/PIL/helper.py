@@ -1,3 +1,8 @@
+from pypaint.utils.cache    import LRUCache
+from pypaint.geometry.array import transformRect
+
+import aggdraw
+import sys
 
 class PILHelper:
     def decToRgba(self, RGBA):
@@ -6,3 +11,106 @@ class PILHelper:
         B = int(RGBA.b * 255)
         A = int(RGBA.a * 255)
         return (R, G, B, A)
+
+def paddedRect(bounds, matrix, strokewidth=None):
+    '''
+    Returns the surface area a grob with the given untransformed bounds
+    can paint when drawn with matrix.
+
+    aggdraw strokes the transformed path, so the pen width is in pixels.
+    Miter joins (limit 4) can reach twice the width past the geometry and
+    the stroke arrowheads a few pixels more; fills are widened by half a
+    pixel. The box is padded by all of that plus a pixel of antialiasing.
+    '''
+    (x0, y0, x1, y1) = transformRect(bounds, matrix)
+    if strokewidth:
+        pad = 2.0 * strokewidth + 4.0
+    else:
+        pad = 1.5
+    return (x0 - pad, y0 - pad, x1 + pad, y1 + pad)
+
+def offscreen(bounds, matrix, size, strokewidth=None):
+    '''
+    Returns True when a grob with the given untransformed bounds, drawn
+    with matrix, cannot touch a surface of the given (width, height).
+    '''
+    (x0, y0, x1, y1) = paddedRect(bounds, matrix, strokewidth)
+    (width, height) = size
+    return x1 < 0 or y1 < 0 or x0 > width or y0 > height
+
+def loadedType(module, name):
+    '''
+    Returns the class name of module if module has been imported, and
+    an empty tuple otherwise, for isinstance() tests against classes
+    whose modules are expensive to import. Nothing can be an instance
+    of a class that was never loaded.
+    '''
+    module = sys.modules.get(module)
+    if module is None:
+        return ()
+    return getattr(module, name)
+
+def surfaceArray(draw):
+    '''
+    Returns the pixels of an aggdraw surface as a (height, width, bands)
+    uint8 numpy array sharing memory with it. Nothing is copied: later
+    drawing shows through the array, and writes to the array change the
+    surface.
+    '''
+    import numpy
+    (width, height) = draw.size
+    pixels = numpy.frombuffer(draw, numpy.uint8)
+    return pixels.reshape((height, width, len(draw.mode)))
+
+class StyleCache:
+    '''
+    Interns aggdraw Pen, Brush and Font objects so that grobs sharing
+    a style share one native object.
+
+    Pens are keyed on (rgb, opacity, width), brushes on (rgb, opacity)
+    and fonts on (color, font file, size). Colors are keyed on their
+    0-1 components, so the conversion to 0-255 only happens on a miss.
+    '''
+    def __init__(self, maxsize=256):
+        self.pens    = LRUCache(maxsize)
+        self.brushes = LRUCache(maxsize)
+        self.fonts   = LRUCache(maxsize)
+
+    def _rgba(self, color):
+        return (int(color.r * 255), int(color.g * 255), int(color.b * 255), int(color.a * 255))
+
+    def pen(self, color, width=1.0):
+        key = (color.r, color.g, color.b, color.a, width)
+        def build():
+            (R, G, B, A) = self._rgba(color)
+            return aggdraw.Pen((R, G, B), width=width, opacity=A)
+        return self.pens.get(key, build)
+
+    def brush(self, color):
+        key = (color.r, color.g, color.b, color.a)
+        def build():
+            (R, G, B, A) = self._rgba(color)
+            return aggdraw.Brush((R, G, B), opacity=A)
+        return self.brushes.get(key, build)
+
+    def font(self, color, font_file, size):
+        (R, G, B) = tuple(color)[:3]
+        key = (R, G, B, font_file, size)
+        def build():
+            return aggdraw.Font((int(R*255), int(G*255), int(B*255)), font_file, size)
+        return self.fonts.get(key, build)
+
+    def clear(self):
+        self.pens.clear()
+        self.brushes.clear()
+        self.fonts.clear()
+
+    def stats(self):
+        return {
+            'pen':   self.pens.stats(),
+            'brush': self.brushes.stats(),
+            'font':  self.fonts.stats(),
+            }
+
+## shared by every PIL canvas in the process
+style_cache = StyleCache()
@@ -0,0 +1,246 @@
+'''
+Tiled rendering for large PIL canvases.
+
+The surface is split into tiles, every grob is binned into the tiles its
+transformed bounds touch, and each tile is rasterized on its own
+aggdraw surface, in a pool of worker processes (or threads). The tiles
+are then stitched back into one RGBA buffer.
+
+Grobs are sent to the workers as plain, picklable records:
+
+    ('path', opcodes, coords, matrix, pen, brush)
+    ('text', (x, y), string, font, matrix, brush)
+
+where opcodes/coords come from aggdraw's Path.dump(), pen is
+((r, g, b), width, opacity), brush ((r, g, b), opacity) and font
+((r, g, b), font file, size), or None for no pen/brush.
+
+With glyph_masks, untransformed text is blended from a glyph atlas, one
+per worker, as the canvas draws it, so tiles match a single surface.
+'''
+from pypaint.interfaces.PIL.helper import PILHelper
+from pypaint.interfaces.PIL.helper import paddedRect
+from pypaint.interfaces.PIL.atlas  import GlyphAtlas
+
+import aggdraw
+import multiprocessing
+import multiprocessing.pool
+import threading
+
+DEFAULT_TILE = 512
+
+def tile_boxes(size, tile=DEFAULT_TILE):
+    '''
+    Returns the (x0, y0, x1, y1) boxes covering a surface of size, row
+    by row.
+    '''
+    (width, height) = size
+    boxes = []
+    for y in xrange(0, height, tile):
+        for x in xrange(0, width, tile):
+            boxes.append((x, y, min(x + tile, width), min(y + tile, height)))
+    return boxes
+
+def bin_records(records, extents, boxes):
+    '''
+    Splits records over the tiles their extent (x0, y0, x1, y1) touches,
+    keeping the drawing order. An extent of None goes to every tile.
+    '''
+    bins = [[] for box in boxes]
+    for record, extent in zip(records, extents):
+        for i, (x0, y0, x1, y1) in enumerate(boxes):
+            if extent is not None:
+                (ex0, ey0, ex1, ey1) = extent
+                if ex1 < x0 or ey1 < y0 or ex0 > x1 or ey0 > y1:
+                    continue
+            bins[i].append(record)
+    return bins
+
+## the glyph atlas of each worker thread
+_atlases = threading.local()
+
+def glyphAtlas():
+    '''
+    Returns this worker's GlyphAtlas, or None without ft2.
+    '''
+    atlas = getattr(_atlases, 'atlas', False)
+    if atlas is False:
+        try:
+            from pypaint import ft2
+        except ImportError:
+            atlas = None
+        else:
+            atlas = GlyphAtlas()
+        _atlases.atlas = atlas
+    return atlas
+
+def drawmasks(draw, xy, string, font, matrix, brush):
+    ## blends text from the worker's glyph atlas, as PILCanvas.drawmasks()
+    ## does; returns False when it has to be drawn with Draw.text()
+    if tuple(matrix[:4]) != (1, 0, 0, 1):
+        return False
+    atlas = glyphAtlas()
+    if atlas is None:
+        return False
+
+    (color, font_file, font_size) = font
+    (x, y) = xy
+    boxes = atlas.layout(font_file, font_size, string, x + matrix[4], y + matrix[5])
+    if boxes is None:
+        return False
+    if boxes:
+        (color, opacity) = brush
+        draw.masks(atlas.data, atlas.width, boxes, aggdraw.Brush(color, opacity=opacity))
+    return True
+
+def render_tile(job):
+    '''
+    Rasterizes one tile; job is (box, size, records, background,
+    antialias, glyph_masks). Returns (box, RGBA string). Runs in the
+    worker processes.
+    '''
+    (box, size, records, background, antialias, glyph_masks) = job
+    (x0, y0, x1, y1) = box
+    (width, height) = size
+
+    draw = aggdraw.Draw("RGBA", (x1 - x0, y1 - y0), background)
+    draw.setantialias(antialias)
+
+    ## the tile is a window onto the whole surface: geometry keeps its
+    ## coordinates and is clipped to the surface rather than the tile,
+    ## so it rasterizes to the same pixels as on one big surface
+    draw.setorigin((x0, y0))
+    draw.setclip((-x0, -y0, width - x0, height - y0))
+
+    pens    = {}
+    brushes = {}
+    batch   = []
+
+    for record in records:
+        if record[0] == 'path':
+            (kind, opcodes, coords, matrix, pen, brush) = record
+
+            path = aggdraw.Path()
+            path.extend(opcodes, coords, False)
+
+            if pen is not None:
+                if not pens.has_key(pen):
+                    (color, width, opacity) = pen
+                    pens[pen] = aggdraw.Pen(color, width=width, opacity=opacity)
+                pen = pens[pen]
+
+            if brush is not None:
+                if not brushes.has_key(brush):
+                    (color, opacity) = brush
+                    brushes[brush] = aggdraw.Brush(color, opacity=opacity)
+                brush = brushes[brush]
+
+            batch.append((path, matrix, pen, brush))
+
+        elif record[0] == 'text':
+            (kind, xy, string, font, matrix, brush) = record
+            if batch:
+                draw.paths(batch)
+                batch = []
+            if glyph_masks and drawmasks(draw, xy, string, font, matrix, brush):
+                continue
+            draw.settransform(matrix)
+            draw.text(xy, string, aggdraw.Font(*font))
+
+    if batch:
+        draw.paths(batch)
+
+    return (box, draw.tostring())
+
+def stitch(size, tiles):
+    '''
+    Copies (box, RGBA string) tiles into one RGBA string of size.
+    '''
+    (width, height) = size
+    out = bytearray(width * height * 4)
+    for (box, data) in tiles:
+        (x0, y0, x1, y1) = box
+        row = (x1 - x0) * 4
+        for y in xrange(y1 - y0):
+            start = ((y0 + y) * width + x0) * 4
+            out[start:start + row] = data[y * row:(y + 1) * row]
+    return str(out)
+
+def render(size, records, extents, background="white", antialias=False,
+           tile=DEFAULT_TILE, workers=None, threads=False, glyph_masks=False):
+    '''
+    Renders records onto a surface of size, tile by tile, and returns the
+    RGBA string. glyph_masks draws untransformed text from glyph atlases
+    rather than as outlines, as the canvas does when it can.
+
+    workers is the pool size (the number of CPUs by default); with a
+    single worker the tiles are drawn in this process. threads=True uses
+    a thread pool instead of processes: aggdraw releases the GIL while
+    rasterizing, and the records need not be pickled.
+    '''
+    boxes = tile_boxes(size, tile)
+    bins  = bin_records(records, extents, boxes)
+    jobs  = [(box, size, records, background, antialias, glyph_masks)
+             for box, records in zip(boxes, bins)]
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    if workers <= 1:
+        tiles = map(render_tile, jobs)
+    else:
+        if threads:
+            pool = multiprocessing.pool.ThreadPool(workers)
+        else:
+            pool = multiprocessing.Pool(workers)
+        try:
+            tiles = pool.map(render_tile, jobs)
+        finally:
+            pool.close()
+            pool.join()
+
+    return stitch(size, tiles)
+
+class TileRecorder:
+    '''
+    Turns the grobs of a retained canvas into tile records, with the
+    surface extent each one can paint.
+    '''
+    def __init__(self):
+        self.helper = PILHelper()
+
+    def path(self, item, matrix):
+        return self.record(item.path, matrix, item._fillcolor, item._strokecolor, item._strokewidth)
+
+    def polylines(self, item, matrix):
+        '''
+        A record for each (path, fill, stroke) of a polylines batch, as
+        the canvas draws it.
+        '''
+        return [self.record(n_path, matrix, fillcolor, strokecolor, item._strokewidth)
+                for (n_path, fillcolor, strokecolor) in item.paths()]
+
+    def record(self, n_path, matrix, fillcolor, strokecolor, strokewidth):
+        pen   = None
+        brush = None
+
+        if fillcolor:
+            (R, G, B, A) = self.helper.decToRgba(fillcolor)
+            brush = ((R, G, B), A)
+
+        if strokecolor:
+            (R, G, B, A) = self.helper.decToRgba(strokecolor)
+            pen = ((R, G, B), strokewidth, A)
+        else:
+            strokewidth = None
+
+        (opcodes, coords) = n_path.dump()
+        record = ('path', opcodes, coords, tuple(matrix), pen, brush)
+        return record, paddedRect(n_path.bounds(), matrix, strokewidth)
+
+    def text(self, item, matrix):
+        (R, G, B, A) = self.helper.decToRgba(item.fill_color)
+        font  = ((R, G, B), item.font_file, item.font_size)
+        brush = ((R, G, B), A)
+        ## no cheap extent for text, it goes to every tile
+        return ('text', (item.X, item.Y), item.Text, font, tuple(matrix), brush), None
@@ -1,9 +1,11 @@
-from pypaint.utils.p_random  import random
-from math                    import *
-from pypaint.shape           import shape
-from pypaint.canvas          import Canvas
-from pypaint.path            import path
-from pypaint.pygtk           import paint_gtk
+from pypaint.utils.p_random       import random
+from pypaint.geometry.spatial     import SpatialHash
+from math                         import *
+
+import numpy
+
+## the simulation runs without the drawing stack; draw() and main()
+## import it when the demo is shown
 
 WIDTH, HEIGHT = (500, 500)
 frame = 0
@@ -14,15 +16,101 @@ class Food:
         self.y = y
         self.size = size
 
-class Pheromone:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.strength = 1.0
-        
-    def evaporate(self, d=0.985):
-        self.strength *= d
-        if self.strength < 0.05: self.strength = 0
+    def reach(self):
+        ## how close an ant must be to take from it
+        return max(2, self.size/2)
+
+## a cell and its neighbours, as (row, column) offsets
+NEIGHBOURS = [(0, 0), (-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+class Pheromones:
+    """ The pheromone trails, as a field of strengths over a grid of
+    cells: strength[row, column] covers the cell-sized square at
+    (column*cell, row*cell).
+
+    Ants bringing food home mark the cells they cross. Every tick the
+    field evaporates and diffuses into neighbouring cells, so the
+    trails blur, weaken and disappear unless ants keep using them.
+    Trails run from the food to the nest at home, so an ant following
+    one heads for the marked cell furthest from home.
+
+    """
+
+    def __init__(self, width, height, home, cell=5, evaporation=0.985, diffusion=0.1, threshold=0.05):
+        self.cell = cell
+        self.evaporation = evaporation
+        self.diffusion = diffusion
+        self.threshold = threshold
+
+        rows, columns = int(ceil(float(height)/cell)), int(ceil(float(width)/cell))
+        self.strength = numpy.zeros((rows, columns))
+
+        ## how far each cell's centre is from home
+        y, x = numpy.indices((rows, columns)) * cell + cell * 0.5
+        self.distance = numpy.hypot(x - home[0], y - home[1])
+
+        ## what sense() reads, worked out once per change to the field
+        self._outward = None
+
+    def _cell(self, x, y):
+        ## the (row, column) of the cell under x, y, or None off the field
+        column = int(floor(x / self.cell))
+        row = int(floor(y / self.cell))
+        rows, columns = self.strength.shape
+        if 0 <= row < rows and 0 <= column < columns:
+            return row, column
+        return None
+
+    def deposit(self, x, y, amount=1.0):
+        cell = self._cell(x, y)
+        if cell is not None:
+            self.strength[cell] = max(self.strength[cell], amount)
+            self._outward = None
+
+    def sample(self, x, y):
+        cell = self._cell(x, y)
+        if cell is None:
+            return 0.0
+        return float(self.strength[cell])
+
+    def _trails(self):
+        ## for every cell, which of it and its eight neighbours is the
+        ## marked one furthest from home, and its strength
+        if self._outward is None:
+            rows, columns = self.strength.shape
+            strength = numpy.pad(self.strength, 1, mode='constant')
+            distance = numpy.pad(self.distance, 1, mode='constant')
+            around = numpy.array([strength[1+dy:1+dy+rows, 1+dx:1+dx+columns]
+                                  for dy, dx in NEIGHBOURS])
+            further = numpy.array([distance[1+dy:1+dy+rows, 1+dx:1+dx+columns]
+                                   for dy, dx in NEIGHBOURS])
+            which = numpy.where(around > 0, further, -1).argmax(axis=0)
+            chosen = numpy.choose(which, around)
+            self._outward = (chosen, which)
+        return self._outward
+
+    def sense(self, x, y):
+        """ The strength of the trail around x, y,
+        and the direction (dx, dy) along it away from home.
+        """
+
+        cell = self._cell(x, y)
+        if cell is None:
+            return 0.0, 0.0, 0.0
+        strength, which = self._trails()
+        dy, dx = NEIGHBOURS[which[cell]]
+        return float(strength[cell]), float(dx), float(dy)
+
+    def evaporate(self):
+        s = self.strength
+        if self.diffusion:
+            edges = numpy.pad(s, 1, mode='edge')
+            around = (edges[:-2, 1:-1] + edges[2:, 1:-1] + edges[1:-1, :-2] + edges[1:-1, 2:]) * 0.25
+            s = s * (1 - self.diffusion) + around * self.diffusion
+        s *= self.evaporation
+        s[s < self.threshold] = 0
+        self.strength = s
+        self._outward = None
 
 class Ant:
     def __init__(self, colony, x, y):
@@ -34,7 +122,6 @@ class Ant:
         self.vy = 0
         
         self.has_food = False
-        self.trail = []
         self.wandering = random(10)
     
     def near(self, obj, radius=10):
@@ -101,45 +188,59 @@ class Ant:
         """Follow a nearby pheromone trail.
         
         If the ant is not carrying food to the colony,
-        follow any nearby trail.
+        follow the trail it is on away from the colony,
+        which leads to the food.
         If the pheromone has evaporated to much,
         the ant might lose interest in the trail,
         this ensures it doesn't get "stuck" on a useless trail.
         
         """
-        
-        for ant in self.colony:
-            if ant != self or self.has_food == False:
-                for pheromone in ant.trail:
-                    if self.near(pheromone):
-                        if random() > pheromone.strength: return
-                        self.goal(pheromone)
-                        if pheromone.strength > 0.5: return
-                        else: break
+
+        if self.has_food:
+            return
+
+        strength, dx, dy = self.colony.pheromones.sense(self.x, self.y)
+        if strength == 0 or random() > strength:
+            return
+
+        d = hypot(dx, dy)
+        if d == 0:
+            return
+        self.vx = dx / d
+        self.vy = dy / d
+        self.wandering = 0
     
-    def harvest(self):
+    def harvest(self, foods=None):
         
         """Collect nearby food.
         
         If the ant is not carrying anything,
         and it is near a source of food,
         pick up food and start marking the trail home.
+        The food sources to check come from the colony's
+        spatial index unless they are given.
         
         """
 
-        for food in self.colony.foodsources:
-            if self.near(food, radius=max(2,food.size/2)) and self.has_food == False: 
+        if self.has_food:
+            return
+        if foods is None:
+            foods = self.colony.foodnear(self.x, self.y)
+
+        for food in foods:
+            if food.size > 0 and hypot(self.x-food.x, self.y-food.y) < food.reach():
                 food.size -= 1
                 if food.size == 0: self.colony.foodsources.remove(food)
-                self.trail = [Pheromone(food.x, food.y)]
-                self.trail.append(Pheromone(self.x, self.y))
+                self.colony.pheromones.deposit(food.x, food.y)
+                self.colony.pheromones.deposit(self.x, self.y)
                 self.has_food = True
+                return
         
     def hoard(self, trail=0.5):
         
         """Return straight home with food.
         
-        Leave a trail of pheromone markers,
+        Leave a trail of pheromone,
         which the other ants smell and follow to the food.
         
         """
@@ -147,19 +248,19 @@ class Ant:
         if self.has_food:
             self.goal(self.colony)
             if random() < trail:
-                self.trail.append(Pheromone(self.x, self.y))
+                self.colony.pheromones.deposit(self.x, self.y)
         
         #Drop food and start wandering again
         if self.near(self.colony) and self.has_food:
-            self.trail.append(Pheromone(self.colony.x, self.colony.y))
+            self.colony.pheromones.deposit(self.colony.x, self.colony.y)
             self.vx = 0
             self.vy = 0
             self.has_food = False
             self.colony.food += 1
     
-    def forage(self, speed=2):
+    def forage(self, speed=2, foods=None):
         self.follow() #follow nearby trails to food.
-        self.harvest() #harvest nearby food source
+        self.harvest(foods) #harvest nearby food source
         self.hoard() #bring food directly to colony
         self.wander() #some random wandering is more efficient
 
@@ -168,17 +269,12 @@ class Ant:
         
         self.x += self.vx
         self.y += self.vy
-        
-        #trail evaporation
-        for pheromone in self.trail:
-            pheromone.evaporate()
-            if pheromone.strength == 0:
-                self.trail.remove(pheromone)
 
 class Colony(list):
-    def __init__(self, n, x, y, r):
+    def __init__(self, n, x, y, r, width=WIDTH, height=HEIGHT):
         self.foodsources = []
         self.food = 0
+        self.pheromones = Pheromones(width, height, (x, y))
         
         for i in range(n):
             self.append(Ant(self, x, y))
@@ -187,6 +283,47 @@ class Colony(list):
         self.y = y
         self.r = r
 
+        ## the food sources the index was built from
+        self._indexed = None
+        self._food_index = None
+
+    def _index(self):
+        ## a spatial hash of the food sources, rebuilt when they change
+        if self._indexed != self.foodsources:
+            self._indexed = list(self.foodsources)
+            self._food_index = None
+            if self.foodsources:
+                reach = max([food.reach() for food in self.foodsources])
+                self._food_index = SpatialHash([(food.x, food.y) for food in self.foodsources], reach)
+        return self._food_index
+
+    def foodnear(self, x, y):
+        """ The food sources that might be in reach of x, y.
+        """
+
+        index = self._index()
+        if index is None:
+            return []
+        return [self._indexed[j] for j in index.query((x, y), index.cell)]
+
+    def forage(self, speed=2):
+        """ Moves every ant, then lets the pheromones evaporate.
+
+        The food in reach of each ant is looked up for the whole
+        colony at once.
+        """
+
+        nearby = {}
+        index = self._index()
+        if index is not None and len(self):
+            (i, j) = index.within([(ant.x, ant.y) for ant in self], index.cell)
+            for (a, f) in zip(i, j):
+                nearby.setdefault(a, []).append(self._indexed[f])
+
+        for k, ant in enumerate(self):
+            ant.forage(speed, nearby.get(k, ()))
+        self.pheromones.evaporate()
+
 def colony(n, x, y, r):
     return Colony(n, x, y, r)
 
@@ -208,13 +345,19 @@ def demo_setup():
         
         colony.foodsources.append(food(x, y, s))
     
+## one canvas for the whole animation, cleared for every frame
+ctx = None
+
 def draw():
-    global colony
+    from pypaint.canvas import Canvas
+    from pypaint.shape  import shape
+    from pypaint.batch  import markers, polylines
 
-    ctx = Canvas(width=500, height=500, gtk_draw=True)
-    bg = ctx.background()
-    bg.fill_color = 0.2
-    ctx.add(bg)
+    global colony, ctx
+
+    if ctx is None:
+        ctx = Canvas(width=500, height=500, gtk_draw=True)
+    ctx.begin_frame(0.2)
 
     ## Draw the hoarded food in the colony.
     shapes = shape()
@@ -232,41 +375,45 @@ def draw():
         oval.fill_color = (0.6, 0.8, 0, 0.1)
         ctx.add(oval)
     
-    for ant in colony:
-        p = path()
-        ## Draw the pheromone trail for each ant.
-        ## Ants leave a trail of scent from the foodsource,
-        ## enabling other ants to find the food as well!
-        if len(ant.trail) > 0:
-            p.moveto(ant.trail[0].x, ant.trail[0].y)
-            for k in ant.trail: 
-                p.lineto(k.x, k.y)
-                
-        p.stroke_color = (0.8, 0.8, 0.8, 1.0)
-        p.stroke_width = (0.5)
-        
-        ctx.add(p)
-
-        ## Change ant color when carrying food.
-        
-        ## The main ant behaviour:
-        ## 1) follow an encountered trail,
-        ## 2) harvest nearby food source,
-        ## 3) bring food back to colony,
-        ## 4) wander aimlessly
-        ant.forage()
-        oval = shapes.oval(ant.x, ant.y, 3, 3)
-        if ant.has_food: 
-            oval.fill_color = (0.6, 0.8, 0)
-        else:
-            oval.fill_color = (0.8, 0.8, 0.8, 0.5)
+    ## Draw the pheromone trails, a square for each marked cell.
+    ## Ants leave a trail of scent from the foodsource,
+    ## enabling other ants to find the food as well!
+    pheromones = colony.pheromones
+    c = pheromones.cell
+    (rows, columns) = numpy.nonzero(pheromones.strength)
+    corners = numpy.empty((len(rows), 4, 2))
+    corners[:, :, 0] = (columns * c)[:, None] + [0, c, c, 0]
+    corners[:, :, 1] = (rows * c)[:, None] + [0, 0, c, c]
+    colors = numpy.empty((len(rows), 4))
+    colors[:, :3] = 0.8
+    colors[:, 3] = pheromones.strength[rows, columns]
+    ctx.add(polylines(corners.reshape(-1, 2), numpy.arange(len(rows)) * 4, colors, closed=True))
 
-        ctx.add(oval)
+    ## The main ant behaviour:
+    ## 1) follow an encountered trail,
+    ## 2) harvest nearby food source,
+    ## 3) bring food back to colony,
+    ## 4) wander aimlessly
+    colony.forage()
+
+    ## Change ant color when carrying food.
+    position = numpy.array([(ant.x, ant.y) for ant in colony]).reshape(-1, 2)
+    has_food = numpy.array([ant.has_food for ant in colony], dtype=bool)
+
+    carrying = markers(position[has_food, 0], position[has_food, 1], 3)
+    carrying.fill_color = (0.6, 0.8, 0)
+    ctx.add(carrying)
+
+    searching = markers(position[~has_food, 0], position[~has_food, 1], 3)
+    searching.fill_color = (0.8, 0.8, 0.8, 0.5)
+    ctx.add(searching)
 
     ctx.draw()
     return ctx.gtk()
 
 def main():
+    from pypaint.pygtk import paint_gtk
+
     demo_setup()
     draw()
 
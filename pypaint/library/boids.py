@@ -1,180 +1,270 @@
 from pypaint.utils.p_random import random
+from pypaint.geometry.spatial import SpatialHash
+
+import numpy
 
 WIDTH  = 500
 HEIGHT = 500
 
-class Boid:
-    def __init__(self, boids, x, y, z, ctx=None):
+## the flock rules, computed for every boid at once from (n, 3) arrays
+## of positions or velocities
+
+def neighbourhood(position, velocity, r=10, radius=None):
+    """ Returns (separation, centre, average): the separation of
+    every boid from the boids closer than r, and the mean position
+    and velocity of the boids within radius of it, in one pass over
+    a spatial hash. Without a radius, or for boids alone in theirs,
+    centre and average are their own position and velocity.
+    """
+
+    n = len(position)
+    force = numpy.zeros_like(position)
+    if radius:
+        sums   = numpy.zeros((n, 6))
+        counts = numpy.zeros(n)
+    reach = max(r, radius or 0)
+    if reach <= 0:
+        return force, position.copy(), velocity.copy()
+
+    grid = SpatialHash(position, reach)
+    for (i, j) in grid.iterpairs(reach):
+        distance = grid.distance(i, j)
+
+        near = distance < r * r
+        (ni, nj) = (i[near], j[near])
+        for axis in range(3):
+            delta = position[ni, axis] - position[nj, axis]
+            force[:, axis] += numpy.bincount(ni, weights=delta, minlength=n)
+
+        if radius:
+            local = distance < radius * radius
+            (li, lj) = (i[local], j[local])
+            counts += numpy.bincount(li, minlength=n)
+            for axis in range(3):
+                sums[:, axis]   += numpy.bincount(li, weights=position[lj, axis], minlength=n)
+                sums[:, axis+3] += numpy.bincount(li, weights=velocity[lj, axis], minlength=n)
+
+    if not radius:
+        return force, position.copy(), velocity.copy()
+    alone = counts == 0
+    sums[alone] = numpy.hstack((position, velocity))[alone]
+    sums /= numpy.maximum(counts, 1)[:, None]
+    return force, sums[:, :3], sums[:, 3:]
+
+def cohesion(position, d=100, centre=None):
+    """ Boids move towards the flock's centre of mass.
+
+    The centre of mass is the average position of all boids,
+    not including itself (the "perceived centre"),
+    unless each boid's centre is given.
+
+    """
+
+    n = len(position)
+    if centre is None:
+        if n < 2:
+            return numpy.zeros_like(position)
+        centre = (position.sum(axis=0) - position) / (n-1)
+    return (centre - position) / d
+
+def separation(position, r=10):
+    """ Boids keep a small distance from other boids.
+
+    Ensures that boids don't collide into each other,
+    in a smoothly accelerated motion: every boid closer
+    than r pushes a boid away.
+
+    """
+
+    return neighbourhood(position, position, r)[0]
+
+def alignment(velocity, d=5, average=None):
+    """ Boids match velocity with other boids,
+    the whole flock unless each boid's average is given.
+    """
+
+    n = len(velocity)
+    if average is None:
+        if n < 2:
+            return numpy.zeros_like(velocity)
+        average = (velocity.sum(axis=0) - velocity) / (n-1)
+    return (average - velocity) / d
+
+## the rules under names update()'s arguments don't hide
+_cohesion   = cohesion
+_alignment  = alignment
+
+class Boid(object):
+    """ A view of one boid in its flock's arrays.
+
+    Reading or setting x, vx, is_perching, ... reads or sets the
+    flock's position, velocity and perching arrays at index.
+
+    """
+
+    def __init__(self, boids, index, ctx=None):
         self.boids = boids
         self.flock = boids
-    
-        self.x = 1.0 * x
-        self.y = 1.0 * y
-        self.z = 1.0 * z
-        
-        self.vx = 0
-        self.vy = 0
-        self.vz = 0
-        
-        self.is_perching = False
-        self._perch_t = 0
-        self._ctx = ctx
-                
+        self.index = index
+        self._ctx  = ctx
+
+    def _position(axis):
+        def get(self):
+            return float(self.flock.position[self.index, axis])
+        def set(self, value):
+            self.flock.position[self.index, axis] = value
+        return property(get, set)
+
+    def _velocity(axis):
+        def get(self):
+            return float(self.flock.velocity[self.index, axis])
+        def set(self, value):
+            self.flock.velocity[self.index, axis] = value
+        return property(get, set)
+
+    x  = _position(0)
+    y  = _position(1)
+    z  = _position(2)
+    vx = _velocity(0)
+    vy = _velocity(1)
+    vz = _velocity(2)
+    del _position, _velocity
+
+    def _get_is_perching(self):
+        return bool(self.flock.perching[self.index])
+    def _set_is_perching(self, value):
+        self.flock.perching[self.index] = value
+    is_perching = property(_get_is_perching, _set_is_perching)
+
+    def _get_perch_t(self):
+        return float(self.flock.perch_t[self.index])
+    def _set_perch_t(self, value):
+        self.flock.perch_t[self.index] = value
+    _perch_t = property(_get_perch_t, _set_perch_t)
+
     def copy(self):
-        b = Boid(self.boids, self.x, self.y, self.z, self._ctx)
-        b.vx = self.vx
-        b.vy = self.vy
-        b.vz = self.vz
-        b.is_perching = self.is_perching
-        b._perch_t = self._perch_t
-        
-        return b
-        
+        # A boid is a row of its flock, so the copy is the same boid
+        # in a copy of the flock.
+        return self.flock.copy()[self.index]
+
     def cohesion(self, d=100):
-        """ 
-        Boids move towards the flock's centre of mass.
-        
-        The centre of mass is the average position of all boids,
-        not including itself (the "perceived centre").
-        
-        """
-        
-        vx = vy = vz = 0
-        for b in self.boids:
-            if b != self:
-                vx, vy, vz = vx+b.x, vy+b.y, vz+b.z
-                
-        n = len(self.boids)-1
-        vx, vy, vz = vx/n, vy/n, vz/n
-        
-        return (vx-self.x)/d, (vy-self.y)/d, (vz-self.z)/d
-                
+        position = self.flock.position
+        n = len(position)-1
+        centre = (position.sum(axis=0) - position[self.index]) / n
+        return tuple((centre - position[self.index]) / d)
+
     def separation(self, r=10):
-        
-        """ Boids keep a small distance from other boids.
-        
-        Ensures that boids don't collide into each other,
-        in a smoothly accelerated motion.
-        
-        """
-        
-        vx = vy = vz = 0
-        for b in self.boids:
-            if b != self:
-                if abs(self.x-b.x) < r: vx += (self.x-b.x)
-                if abs(self.y-b.y) < r: vy += (self.y-b.y)
-                if abs(self.z-b.z) < r: vz += (self.z-b.z)
-                
-        return vx, vy, vz
-        
+        delta = self.flock.position[self.index] - self.flock.position
+        near = (delta * delta).sum(axis=1) < r * r
+        return tuple(delta[near].sum(axis=0))
+
     def alignment(self, d=5):
-        
-        """ Boids match velocity with other boids.
-        """
-        
-        vx = vy = vz = 0
-        for b in self.boids:
-           if b != self:
-               vx, vy, vz = vx+b.vx, vy+b.vy, vz+b.vz
-        
-        n = len(self.boids)-1
-        vx, vy, vz = vx/n, vy/n, vz/n
-        
-        return (vx-self.vx)/d, (vy-self.vy)/d, (vz-self.vz)/d
-        
+        velocity = self.flock.velocity
+        n = len(velocity)-1
+        average = (velocity.sum(axis=0) - velocity[self.index]) / n
+        return tuple((average - velocity[self.index]) / d)
+
     def limit(self, max=30):
-        
+
         """ The speed limit for a boid.
-        
+
         Boids can momentarily go very fast,
         something that is impossible for real animals.
-        
+
         """
-        
-        if abs(self.vx) > max: 
-            self.vx = self.vx/abs(self.vx)*max
-        if abs(self.vy) > max: 
-            self.vy = self.vy/abs(self.vy)*max
-        if abs(self.vz) > max: 
-            self.vz = self.vz/abs(self.vz)*max
-        
+
+        velocity = self.flock.velocity[self.index]
+        velocity[:] = numpy.clip(velocity, -max, max)
+
     def _angle(self):
-        
+
         """ Returns the angle towards which the boid is steering.
         """
-        
+
         from math import atan, pi, degrees
         a = degrees(atan(self.vy/self.vx)) + 360
         if self.vx < 0: a += 180
 
         return a
-    
+
     angle = property(_angle)
-        
+
     def goal(self, x, y, z, d=50.0):
-        
+
         """ Tendency towards a particular place.
         """
-        
+
         return (x-self.x)/d, (y-self.y)/d, (z-self.z)/d
-        
+
 class Boids(list):
-    
+    """ A flock, kept as arrays: position and velocity are (n, 3),
+    perching and perch_t hold each boid's perching state. The list
+    holds a Boid view per row, for code that walks the flock.
+    """
+
     def __init__(self, n, x, y, w, h):
-        
-        for i in range(n):
-            dx = random(w)
-            dy = random(h)
-            z = random(200)
-            b = Boid(self, x+dx, y+dy, z)
-            self.append(b)
-            
+
+        self.position = numpy.empty((n, 3))
+        self.position[:, 0] = x + numpy.random.random(n) * w
+        self.position[:, 1] = y + numpy.random.random(n) * h
+        self.position[:, 2] = numpy.random.random(n) * 200
+        self.velocity = numpy.zeros((n, 3))
+        self.perching = numpy.zeros(n, dtype=bool)
+        self.perch_t  = numpy.zeros(n)
+        self.views()
+
         self.x = x
         self.y = y
         self.w = w
         self.h = h
-        
+
         self.scattered = False
         self._scatter = 0.005
         self._scatter_t = 50
         self._scatter_i = 0
-        
+
         self._perch = 1.0 # Lower this number to simulate diving.
         self._perch_y = HEIGHT
         self._perch_t = lambda:25+random(50)
-    
+
         self.has_goal = False
         self.flee = False
         self._gx = 0
         self._gy = 0
         self._gz = 0
-    
+
+    def views(self):
+        self[:] = [Boid(self, i) for i in xrange(len(self.position))]
+
     # Backwards compatibility:
     def _boids(self): return self
     boids = property(_boids)
-    
+
     def copy(self):
-        
+
         boids = Boids(0, self.x, self.y, self.w, self.h)
-        
+
         boids.scattered = self.scattered
         boids._scatter = self._scatter
         boids._scatter_t = self._scatter_t
         boids._scatter_i = self._scatter_i
-        
+
         boids._perch = self._perch
         boids._perch_y = self._perch_y
         boids._perch_t = self._perch_t
-        
+
         boids.has_goal = self.has_goal
         boids.flee = self.flee
         boids._gx = self._gx
         boids._gy = self._gy
         boids._gz = self._gz
-        
-        for boid in self:
-            boids.append(boid.copy())
-            
+
+        boids.position = self.position.copy()
+        boids.velocity = self.velocity.copy()
+        boids.perching = self.perching.copy()
+        boids.perch_t  = self.perch_t.copy()
+        boids.views()
+
         return boids
 
     def scatter(self, chance=0.005, frames=50):
@@ -226,24 +316,27 @@ class Boids(list):
         
         dx = self.w * 0.1
         dy = self.h * 0.1 
-        
-        for b in self:
-            
-            if b.x < self.x-dx: b.vx += random(dx)
-            if b.y < self.y-dy: b.vy += random(dy)
-            if b.x > self.x+self.w+dx: b.vx -= random(dx)
-            if b.y > self.y+self.h+dy: b.vy -= random(dy)
-            if b.z < 0: b.vz += 10
-            if b.z > 100: b.vz -= 10
-            
-            if b.y > self._perch_y and random() < self._perch:
-                b.y = self._perch_y
-                b.vy = -abs(b.vy) * 0.2
-                b.is_perching = True
-                try:
-                    b._perch_t = self._perch_t()
-                except:
-                    b._perch_t = self._perch_t
+
+        position = self.position
+        velocity = self.velocity
+        n = len(position)
+
+        # Boids outside the cage get a random push back in.
+        push = numpy.random.random((n, 2)) * (dx, dy)
+        velocity[:, :2] += numpy.where(position[:, :2] < (self.x-dx, self.y-dy), push, 0)
+        velocity[:, :2] -= numpy.where(position[:, :2] > (self.x+self.w+dx, self.y+self.h+dy), push, 0)
+        velocity[position[:, 2] < 0, 2] += 10
+        velocity[position[:, 2] > 100, 2] -= 10
+
+        land = (position[:, 1] > self._perch_y) & (numpy.random.random(n) < self._perch)
+        if land.any():
+            position[land, 1] = self._perch_y
+            velocity[land, 1] = -abs(velocity[land, 1]) * 0.2
+            self.perching[land] = True
+            if callable(self._perch_t):
+                self.perch_t[land] = [self._perch_t() for i in xrange(land.sum())]
+            else:
+                self.perch_t[land] = self._perch_t
             
     def update(self, 
                shuffled=True, 
@@ -251,17 +344,21 @@ class Boids(list):
                separation=10, 
                alignment=5, 
                goal=20,
-               limit=30):
+               limit=30,
+               radius=None):
         
         """ Calculates the next motion frame for the flock.
+
+        Every boid steers from the positions and velocities of the
+        last frame, so the order of the boids no longer matters and
+        shuffled is ignored.
+
+        Separation looks at the boids within the separation distance,
+        found through a spatial hash. With a neighbour radius, cohesion
+        and alignment follow the boids within it instead of the whole
+        flock.
         """
         
-        # Shuffling the list of boids ensures fluid movement.
-        # If you need the boids to retain their position in the list
-        # each update, set the shuffled parameter to False.
-        from random import shuffle
-        if shuffled: shuffle(self)
-        
         m1 = 1.0 # cohesion
         m2 = 1.0 # separation
         m3 = 1.0 # alignment
@@ -288,38 +385,56 @@ class Boids(list):
             m4 = 0
         if self.flee:
             m4 = -m4
-        
-        for b in self:
-            
-            # A boid that is perching will continue to do so
-            # until Boid._perch_t reaches zero.
-            if b.is_perching:
-                if b._perch_t > 0:
-                    b._perch_t -= 1
-                    continue
-                else:
-                    b.is_perching = False
-            
-            vx1, vy1, vz1 = b.cohesion(cohesion)
-            vx2, vy2, vz2 = b.separation(separation)
-            vx3, vy3, vz3 = b.alignment(alignment)
-            vx4, vy4, vz4 = b.goal(self._gx, self._gy, self._gz, goal)
-            
-            b.vx += m1*vx1 + m2*vx2 + m3*vx3 + m4*vx4
-            b.vy += m1*vy1 + m2*vy2 + m3*vy3 + m4*vy4
-            b.vz += m1*vz1 + m2*vz2 + m3*vz3 + m4*vz4
-            
-            b.limit(limit)
-        
-            b.x += b.vx
-            b.y += b.vy
-            b.z += b.vz
+
+        position = self.position
+        velocity = self.velocity
+
+        # A boid that is perching will continue to do so
+        # until Boid._perch_t reaches zero.
+        waiting = self.perching & (self.perch_t > 0)
+        self.perch_t[waiting] -= 1
+        self.perching &= waiting
+        moving = ~waiting
+
+        # One pass over a spatial hash finds the boids within the
+        # separation distance and the neighbour radius.
+        (force, centre, average) = neighbourhood(position, velocity, separation, radius)
+        if not radius:
+            centre = average = None
+
+        steer = m1 * _cohesion(position, cohesion, centre) \
+              + m2 * force \
+              + m3 * _alignment(velocity, alignment, average)
+        if m4:
+            steer += m4 * ((self._gx, self._gy, self._gz) - position) / goal
+
+        velocity[moving] = numpy.clip(velocity[moving] + steer[moving], -limit, limit)
+        position[moving] += velocity[moving]
         
         self.constrain()
-        
+
 def flock(n, x, y, w, h, ctx):
     return Boids(n, x, y, w, h, ctx)
 
+## the outline of shape().arrow(), tip first, around its middle
+ARROW = numpy.array([(0.5, 0), (0.1, 0.4), (0.1, 0.2), (-0.5, 0.2),
+                     (-0.5, -0.2), (0.1, -0.2), (0.1, -0.4)])
+
+def arrows(position, velocity, width):
+    """ Returns (points, starts) of an arrow of the given widths
+    centred on each position, pointing along its velocity.
+    """
+    (x, y)   = position[:, 0], position[:, 1]
+    (dx, dy) = velocity[:, 0], velocity[:, 1]
+    length = numpy.hypot(dx, dy)
+    length[length == 0] = 1
+    c = (dx / length * width)[:, None]
+    s = (dy / length * width)[:, None]
+
+    points = numpy.empty((len(position), len(ARROW), 2))
+    points[:, :, 0] = x[:, None] + c * ARROW[:, 0] - s * ARROW[:, 1]
+    points[:, :, 1] = y[:, None] + s * ARROW[:, 0] + c * ARROW[:, 1]
+    return points.reshape(-1, 2), numpy.arange(len(position)) * len(ARROW)
 
 def setup():    
     # Create 3 flocks each with 10 boids.
@@ -333,11 +448,14 @@ def setup():
         flock.noperch()
         flocks.append(flock)
     
+## one canvas for the whole animation, cleared for every frame
+ctx = None
+
 def draw():
-    ctx = Canvas(width=500, height=500, gtk_draw=True)
-    bg = ctx.background()
-    bg.fill_color = 0.2
-    ctx.add(bg)
+    global ctx
+    if ctx is None:
+        ctx = Canvas(width=500, height=500, gtk_draw=True)
+    ctx.begin_frame(0.2)
 
     ## Update each flock.
     global flocks
@@ -345,17 +463,14 @@ def draw():
     for flock in flocks:
         flock.update(goal=60)
         
-        ## Draw a grey arrow for each boid in a block.
+        ## Draw a grey arrow for each boid, the whole flock at once.
         ## Radius and opacity depend on the boids z-position.
-        for boid in flock:
-            r = 10 + boid.z * 0.25
-            alpha = 0.5 + boid.z*0.01
-            s = shape()
-            arrow = s.arrow(boid.x-r/2, boid.y-r/2, r)
-            arrow.fill_color = (0.6, 0.6, 0.6, alpha)
-
-            arrow.rotate(-boid.angle)
-            ctx.add(arrow)
+        z = flock.position[:, 2]
+        colors = numpy.empty((len(flock), 4))
+        colors[:, :3] = 0.6
+        colors[:, 3] = 0.5 + z * 0.01
+        (points, starts) = arrows(flock.position, flock.velocity, 10 + z * 0.25)
+        ctx.add(polylines(points, starts, colors, closed=True))
 
     ctx.draw()
     return ctx.gtk()
@@ -374,7 +489,7 @@ def main():
 
 if __name__ == "__main__":
     from pypaint.canvas import Canvas
-    from pypaint.shape  import shape
+    from pypaint.batch  import polylines
     from pypaint.pygtk  import paint_gtk
 
     '''
@@ -278,8 +278,8 @@ class ColorList(_list):
         for arg in args:
             
             # From a Color object.
-
-            self.append(color(arg.r, arg.g, arg.b, mode="rgb"))
+            if isinstance(arg, Color):
+                self.append(color(arg.r, arg.g, arg.b, mode="rgb"))
                 
             # From a Web.KulerTheme or Web.ColrTheme object.
             try:
@@ -293,10 +293,8 @@ class ColorList(_list):
             if isinstance(arg, _list) \
             or isinstance(arg, tuple):
                 for clr in arg:
-                    if clr.__class__ == Color:
+                    if isinstance(clr, Color):
                         self.append(clr)
-                    if clr.__class__ == BaseColor:
-                        self.append(color(clr))
 
             # From a string (image/name/context).
             if isinstance(arg, (str, unicode)):
@@ -1,10 +1,19 @@
-from pypaint.context         import Context
-from pypaint.types.canvas    import BezierPath
+from pypaint.canvas          import Canvas
+from pypaint.batch           import markers
 from pypaint.utils.p_random  import random
 
 from math import pi, sin, cos, radians
 
-ctx = Context(width=600, height=600)
+import numpy
+
+ctx = Canvas(width=600, height=600)
+
+def style(ovals):
+    """ Outlines the ovals thinly in half transparent white.
+    """
+    ovals.stroke_color = (1, 0.5)
+    ovals.stroke_width = 0.5
+    return ovals
 
 class Tendril:
     def __init__(self, x, y, width=15):
@@ -35,17 +44,18 @@ class Tendril:
             (self.x, self.y, self.angle)
         )
         
-    def draw(self, path=None):
-        """ Draws all the segments in the tendril,
-        as separate ovals or as a single path if one is supplied.
+    def ovals(self):
+        """ Returns the x, y and size arrays of the segment ovals.
         """
         n = len(self.segments)
-        for i, (x, y, angle) in enumerate(self.segments):
-            r = (1-float(i)/n) * self.width # size gradually decreases.
-            if path != None:
-                path.oval(x, y, r, r)
-            else:
-                ctx.oval(x, y, r, r)
+        segments = numpy.array(self.segments, dtype=float).reshape(-1, 3)
+        r = (1 - numpy.arange(n, dtype=float)/max(n, 1)) * self.width # size gradually decreases.
+        return segments[:, 0], segments[:, 1], r
+
+    def draw(self):
+        """ Draws all the segments in the tendril as ovals.
+        """
+        ctx.add(style(markers(*self.ovals())))
         
 class Plant:
     def __init__(self, x, y, tendrils=30, width=15):
@@ -68,28 +78,26 @@ class Plant:
     def draw(self):
         """ Draw the plant.
         """
-        for tendril in self.tendrils:
-            tendril.draw()
+        ctx.add(self.path())
         
     def path(self):
-        """ Return the plant as a path consisting of ovals.
+        """ Return the plant as a single path of ovals.
         """
-        path = BezierPath()
-        for tendril in self.tendrils:
-            tendril.draw(path)
-
-        return path
+        ovals = [tendril.ovals() for tendril in self.tendrils]
+        x, y, r = [numpy.concatenate(values) for values in zip(*ovals)]
+        return style(markers(x, y, r))
 
 
 if __name__ == "__main__":
-    ctx.background(0.12, 0.12, 0.06)
-    ctx.nofill()
-    ctx.stroke(1, 0.5)
-    ctx.strokewidth(0.5)
+    from pypaint.types.color import Color
+    from PIL                 import Image
+
+    ctx.begin_frame(Color(0.12, 0.12, 0.06))
  
     plant = Plant(300, 300, tendrils=20)
     for i in range(200): 
         plant.grow(curl=1, step=0.02)
  
     plant.draw()
-    ctx.save('test_images/tendrils.png')
+    ctx.draw()
+    Image.fromstring("RGBA", (600, 600), ctx.gtk()).save('test_images/tendrils.png', "PNG")
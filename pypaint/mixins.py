@@ -1,7 +1,7 @@
 from pypaint.utils.defaults      import *
 from pypaint.geometry.transform  import Transform
 from pypaint.types.color         import Color
-from pypaint.styles              import style
+from pypaint.types.displaylist   import DisplayList
 
 import math
 
@@ -153,16 +153,14 @@ class CanvasMixin:
         self.width  = width
         self.height = height
 
-        self.data = []
+        self.data = DisplayList()
         self.font_size = 12
 
-        self.clear()
-
-    def add(self, grob):
-        self.data.append(grob)
+    def add(self, grob, priority=3):
+        self.data.add(grob, priority)
 
     def append(self, grob):
-        self.data.append(grob)
+        self.data.add(grob)
 
     def _get_size(self):
         return self.width, self.height
@@ -177,15 +175,15 @@ class CanvasMixin:
         pass
 
     def clear(self):
-        self.data = []
+        self.data.clear()
 
 class StyleMixin:
     def __init__(self):
         pass
 
     def apply_style(self, current_style):
-        if isinstance(current_style, style):
-            pass
+        ## there is no pypaint.styles module to apply yet
+        pass
             
         
 
@@ -0,0 +1,340 @@
+'''
+Headless animation rendering.
+
+A Renderer calls a draw callback once per frame, the same callback
+paint_gtk takes: it draws the frame and returns its RGBA data, usually
+canvas.gtk(). Finished frames go through a bounded queue to a pool of
+writer threads, so the next frame is drawn while the previous ones are
+being encoded. When the writers fall behind the queue fills up and
+drawing waits for them.
+
+    renderer = Renderer(draw, 500, 500, PNGSink("frames/%05d.png"), frames=300)
+    renderer.run()
+    print renderer.report()
+
+or, to stream raw frames into an encoder:
+
+    encoder = subprocess.Popen(["ffmpeg", "-f", "rawvideo", "-pix_fmt", "rgba",
+                                "-s", "500x500", "-r", "30", "-i", "-", "out.mp4"],
+                               stdin=subprocess.PIPE)
+    Renderer(draw, 500, 500, PipeSink(encoder.stdin), seconds=10).run()
+'''
+import multiprocessing
+import Queue
+import threading
+import time
+import sys
+
+class PNGSink:
+    '''
+    Writes every frame to its own PNG file; pattern is formatted with
+    the frame number. Frames can be encoded in any order.
+    '''
+    ordered = False
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+
+    def write(self, frame, size, data):
+        from PIL import Image
+        Image.fromstring("RGBA", size, data).save(self.pattern % frame, "PNG")
+
+    def close(self):
+        pass
+
+class PipeSink:
+    '''
+    Streams the raw RGBA frames, in order, to a file object such as the
+    stdin of an encoder process.
+    '''
+    ordered = True
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, frame, size, data):
+        self.stream.write(data)
+
+    def close(self):
+        self.stream.flush()
+
+class FrameWriter:
+    '''
+    Hands frames to a sink from background threads, through a queue
+    holding at most backlog frames. A sink that needs the frames in
+    order gets a single thread.
+
+    The first error a sink raises is raised again by close().
+    '''
+    def __init__(self, sink, workers=2, backlog=8):
+        if sink.ordered:
+            workers = 1
+
+        self.sink   = sink
+        self.queue  = Queue.Queue(backlog)
+        self.lock   = threading.Lock()
+        self.error  = None
+
+        ## time spent in the sink, summed over the threads, and the
+        ## queue length seen by each new frame
+        self.encode_time  = 0.0
+        self.backlog_sum  = 0
+        self.backlog_max  = 0
+        self.frames       = 0
+
+        self.threads = []
+        for i in xrange(workers):
+            thread = threading.Thread(target=self._work)
+            thread.setDaemon(True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            if self.error is not None:
+                continue
+
+            (frame, size, data) = item
+            start = time.time()
+            try:
+                self.sink.write(frame, size, data)
+            except:
+                self.error = sys.exc_info()
+            elapsed = time.time() - start
+
+            self.lock.acquire()
+            self.encode_time += elapsed
+            self.lock.release()
+
+    def put(self, frame, size, data):
+        '''
+        Queues a frame, blocking while the queue is full.
+        '''
+        if self.error is not None:
+            raise self.error[0], self.error[1], self.error[2]
+
+        backlog = self.queue.qsize()
+        self.backlog_sum += backlog
+        self.backlog_max  = max(self.backlog_max, backlog)
+        self.frames      += 1
+
+        self.queue.put((frame, size, data))
+
+    def close(self):
+        '''
+        Waits for the queued frames to be written and closes the sink.
+        '''
+        for thread in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.sink.close()
+
+        if self.error is not None:
+            raise self.error[0], self.error[1], self.error[2]
+
+class Renderer:
+    '''
+    Renders an animation without a display.
+
+    The number of frames is given directly or as seconds at the
+    framerate. With a Context, its framerate is the default and its
+    FRAME counter is set before each frame is drawn.
+    '''
+    def __init__(self, callback, width, height, sink, frames=None, seconds=None,
+                 context=None, framerate=None, workers=2, backlog=8):
+        if framerate is None:
+            if context is not None:
+                framerate = context.framerate
+            else:
+                framerate = 30
+
+        if frames is None:
+            if seconds is None:
+                raise ValueError("Renderer: give the number of frames or seconds")
+            frames = int(round(seconds * framerate))
+
+        self.callback  = callback
+        self.size      = (width, height)
+        self.sink      = sink
+        self.frames    = frames
+        self.context   = context
+        self.framerate = framerate
+        self.workers   = workers
+        self.backlog   = backlog
+        self.stats     = {}
+
+    def run(self):
+        '''
+        Draws and writes every frame, then returns the stats.
+        '''
+        writer = FrameWriter(self.sink, self.workers, self.backlog)
+
+        draw_time = 0.0
+        wait_time = 0.0
+        start = time.time()
+        try:
+            for frame in xrange(self.frames):
+                if self.context is not None:
+                    self.context.FRAME = frame
+
+                t0 = time.time()
+                data = self.callback()
+                if not isinstance(data, str):
+                    ## a view of a surface the next frame draws on again
+                    data = str(buffer(data))
+                t1 = time.time()
+                writer.put(frame, self.size, data)
+                t2 = time.time()
+
+                draw_time += t1 - t0
+                wait_time += t2 - t1
+        finally:
+            writer.close()
+        elapsed = time.time() - start
+
+        frames = self.frames
+        self.stats = {
+            'frames':      frames,
+            'elapsed':     elapsed,
+            'fps':         elapsed and frames / elapsed or 0.0,
+            'draw_time':   draw_time,
+            'wait_time':   wait_time,
+            'encode_time': writer.encode_time,
+            'backlog_max': writer.backlog_max,
+            'backlog_avg': frames and float(writer.backlog_sum) / frames or 0.0,
+        }
+        return self.stats
+
+    def report(self):
+        stats = self.stats
+        return ("%(frames)d frames in %(elapsed).2fs, %(fps).1f fps; "
+                "draw %(draw_time).2fs, encode %(encode_time).2fs, "
+                "waited on writers %(wait_time).2fs; "
+                "backlog avg %(backlog_avg).1f max %(backlog_max)d" % stats)
+
+class FrameWorker:
+    '''
+    Draws frames on a Context that is kept for the life of the worker,
+    so its canvas surface and font caches stay warm between frames.
+
+    draw is either a callable, called as draw(ctx) with ctx.FRAME set,
+    or the file name of a script. A script runs with the context's
+    methods and WIDTH, HEIGHT and FRAME as globals; if it defines a
+    draw() function the script is run once and draw() is called for
+    every frame, otherwise the whole script runs for every frame.
+    '''
+    def __init__(self, draw, width, height):
+        from pypaint.context               import Context
+        from pypaint.interfaces.PIL.canvas import PILCanvas
+
+        ## the canvas that draws the BezierPath and Text grobs a
+        ## Context makes
+        self.ctx  = Context(width=width, height=height, canvas=PILCanvas(width, height))
+        self.size = (width, height)
+        self.func = None
+        self.code = None
+        self.namespace = None
+
+        if callable(draw):
+            self.func = lambda: draw(self.ctx)
+        else:
+            self.namespace = {}
+            for name in dir(self.ctx):
+                if not name.startswith('_'):
+                    self.namespace[name] = getattr(self.ctx, name)
+            self.namespace['WIDTH']  = width
+            self.namespace['HEIGHT'] = height
+            self.namespace['FRAME']  = 0
+            self.code = compile(open(draw).read(), draw, 'exec')
+
+            self.begin(0)
+            exec self.code in self.namespace
+            if callable(self.namespace.get('draw')):
+                self.func = self.namespace['draw']
+                self.code = None
+
+    def begin(self, frame):
+        self.ctx.canvas.begin_frame()
+        self.ctx.reset()
+        self.ctx.FRAME = frame
+        if self.namespace is not None:
+            self.namespace['FRAME'] = frame
+
+    def render(self, frame):
+        '''
+        Draws frame and returns its RGBA data.
+        '''
+        self.begin(frame)
+        if self.code is not None:
+            exec self.code in self.namespace
+        else:
+            self.func()
+        self.ctx.canvas.draw()
+        return self.ctx.canvas.gtk()
+
+    def save(self, frame, pattern):
+        from PIL import Image
+        filename = pattern % frame
+        Image.fromstring("RGBA", self.size, self.render(frame)).save(filename, "PNG")
+        return filename
+
+## the FrameWorker of a pool process
+_worker = None
+
+def _init_worker(draw, width, height):
+    global _worker
+    _worker = FrameWorker(draw, width, height)
+
+def _render(frame):
+    return (frame, _worker.render(frame))
+
+def _save(args):
+    (frame, pattern) = args
+    return _worker.save(frame, pattern)
+
+def render_frames(draw, frames, width=500, height=500, workers=None, pattern=None, chunksize=None):
+    '''
+    Renders frames, a sequence of frame numbers, in a pool of worker
+    processes; see FrameWorker for draw. Each worker renders a disjoint
+    set of frames, in chunks of chunksize consecutive frames.
+
+    With a pattern, the workers save every frame as a PNG named
+    pattern % frame and the file names are returned in frame order.
+    Otherwise an iterator over (frame, RGBA data) pairs, in frame order,
+    is returned; it can feed a PipeSink.
+
+    workers is the pool size (the number of CPUs by default); with a
+    single worker the frames are drawn in this process.
+    '''
+    frames = list(frames)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if chunksize is None:
+        chunksize = max(1, len(frames) // (workers * 4))
+
+    if workers <= 1:
+        worker = FrameWorker(draw, width, height)
+        if pattern is not None:
+            return [worker.save(frame, pattern) for frame in frames]
+        return ((frame, worker.render(frame)) for frame in frames)
+
+    pool = multiprocessing.Pool(workers, _init_worker, (draw, width, height))
+    if pattern is not None:
+        try:
+            return pool.map(_save, [(frame, pattern) for frame in frames], chunksize)
+        finally:
+            pool.close()
+            pool.join()
+
+    def results():
+        try:
+            for result in pool.imap(_render, frames, chunksize):
+                yield result
+        finally:
+            pool.terminate()
+            pool.join()
+    return results()
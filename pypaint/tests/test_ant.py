@@ -0,0 +1,72 @@
+from pypaint.library.ant import Pheromones, Colony, Food
+
+import unittest
+import random
+
+class testPheromones(unittest.TestCase):
+    def test_deposit(self):
+        field = Pheromones(100, 50, (50, 25), cell=5)
+        assert field.strength.shape == (10, 20)
+        field.deposit(12, 7, 0.5)
+        field.deposit(13, 8, 0.25)
+        assert field.sample(10, 5) == 0.5
+        ## off the field nothing sticks
+        field.deposit(-1, 7)
+        field.deposit(12, 70)
+        assert field.strength.sum() == 0.5
+
+    def test_evaporate(self):
+        field = Pheromones(50, 50, (25, 25), cell=5, evaporation=0.5, diffusion=0.0, threshold=0.2)
+        field.deposit(25, 25, 1.0)
+        field.deposit(5, 5, 0.3)
+        field.evaporate()
+        assert field.sample(25, 25) == 0.5
+        assert field.sample(5, 5) == 0
+
+    def test_diffusion(self):
+        field = Pheromones(50, 50, (25, 25), cell=5, evaporation=1.0, diffusion=0.2, threshold=0.0)
+        field.deposit(25, 25, 1.0)
+        field.evaporate()
+        self.assertAlmostEqual(field.sample(25, 25), 0.8)
+        self.assertAlmostEqual(field.sample(30, 25), 0.05)
+        self.assertAlmostEqual(field.strength.sum(), 1.0)
+
+    def test_sense(self):
+        ## a trail from home at the left out to the right
+        field = Pheromones(50, 50, (0, 25), cell=5)
+        for x in range(0, 50, 5):
+            field.deposit(x, 25, 0.5)
+        assert field.sense(25, 25) == (0.5, 1.0, 0.0)
+        ## next to the trail, the way onto it
+        assert field.sense(25, 30) == (0.5, 1.0, -1.0)
+        assert field.sense(25, 40) == (0.0, 0.0, 0.0)
+
+class testColony(unittest.TestCase):
+    def setUp(self):
+        random.seed(3)
+
+    def test_foodnear(self):
+        colony = Colony(1, 250, 250, 100)
+        near = Food(100, 100, 20)
+        far = Food(400, 400, 20)
+        colony.foodsources.extend([near, far])
+        assert colony.foodnear(105, 100) == [near]
+        assert colony.foodnear(250, 250) == []
+
+        ## the index follows the food sources
+        colony.foodsources.remove(near)
+        assert colony.foodnear(105, 100) == []
+
+    def test_forage(self):
+        colony = Colony(20, 250, 250, 100)
+        food = Food(270, 250, 40)
+        colony.foodsources.append(food)
+        for i in range(100):
+            colony.forage()
+        assert colony.food > 0
+        assert food.size == 40 - colony.food - len([ant for ant in colony if ant.has_food])
+        ## the trail home is marked
+        assert colony.pheromones.strength.any()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+from pypaint.interfaces.PIL.atlas import GlyphAtlas
+
+import unittest
+
+class FakeAtlas(GlyphAtlas):
+    ## every glyph is a 3 x 4 block of its index, 5 pixels wide,
+    ## with "A" and "V" kerned a pixel closer
+    def glyphIndex(self, file, size, char):
+        if char == "?":
+            return 0
+        return ord(char)
+
+    def kerning(self, file, size, left, right):
+        if (left, right) == (ord("A"), ord("V")):
+            return -1.0
+        return 0.0
+
+    def ascender(self, file, size):
+        return 8.0
+
+    def rasterize(self, file, size, index, offset):
+        return (5.0, 1, 6, 3, 4, chr(index) * 12)
+
+class testGlyphAtlas(unittest.TestCase):
+    def test_layout(self):
+        atlas = FakeAtlas(width=16, maxrows=16)
+        boxes = atlas.layout("font", 10, "AV?A", 10, 20)
+        assert boxes == [(0, 0, 3, 4, 11, 22), (4, 0, 3, 4, 15, 22), (0, 0, 3, 4, 20, 22)]
+        assert atlas.renders == 2
+        ## the coverage is copied into the atlas rows
+        assert atlas.data[0:3] == bytearray("AAA")
+        assert atlas.data[16 + 4:16 + 7] == bytearray("VVV")
+
+    def test_layouts_are_reused(self):
+        atlas = FakeAtlas(width=16, maxrows=16)
+        first = atlas.layout("font", 10, "AV", 10, 20)
+        moved = atlas.layout("font", 10, "AV", 30, 20)
+        assert [box[4] - 20 for box in moved] == [box[4] for box in first]
+        assert atlas.renders == 2
+
+    def test_subpixels(self):
+        atlas = FakeAtlas(width=64, maxrows=16, subpixels=4)
+        atlas.layout("font", 10, "A", 10, 20)
+        atlas.layout("font", 10, "A", 10.5, 20)
+        assert sorted([key[3] for key in atlas.glyphs]) == [0, 2]
+
+    def test_full_atlas_is_emptied(self):
+        atlas = FakeAtlas(width=8, maxrows=9)
+        atlas.layout("font", 10, "AB", 0, 0)
+        atlas.layout("font", 10, "CD", 0, 0)
+        assert atlas.resets == 0
+        boxes = atlas.layout("font", 10, "EF", 0, 0)
+        assert atlas.resets == 1
+        assert [box[:2] for box in boxes] == [(0, 0), (4, 0)]
+        assert atlas.data[0:3] == bytearray("EEE")
+
+if __name__ == '__main__':
+    unittest.main()
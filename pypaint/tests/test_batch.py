@@ -0,0 +1,54 @@
+from pypaint.batch            import markers, polylines, ellipseBuffers, polylineBuffers
+from pypaint.types.pathbuffer import PathBuffer, OP_MOVETO, OP_LINETO, OP_CLOSE
+
+import unittest
+import numpy
+
+class testBatch(unittest.TestCase):
+    def test_ellipses(self):
+        ## the same elements as one ellipse at a time
+        buffer = PathBuffer()
+        buffer.ellipse(10, 20, 30, 40)
+        buffer.ellipse(0, 0, 5, 5)
+        (opcodes, coords) = ellipseBuffers([10, 0], [20, 0], [30, 5], [40, 5])
+        assert list(opcodes) == list(buffer.opcodes)
+        for (a, b) in zip(coords, buffer.coords):
+            self.assertAlmostEqual(a, b)
+
+    def test_markers(self):
+        dots = markers([0, 50], [10, 20], 10, 4)
+        assert dots.path.bounds() == (0, 10, 60, 24)
+
+    def test_polyline_buffers(self):
+        points = [(0, 0), (1, 0), (1, 1), (5, 5), (6, 6)]
+        (opcodes, coords) = polylineBuffers(points, [0, 3])
+        assert list(opcodes) == [OP_MOVETO, OP_LINETO, OP_LINETO, OP_MOVETO, OP_LINETO]
+        assert list(coords) == [0, 0, 1, 0, 1, 1, 5, 5, 6, 6]
+
+        (opcodes, coords) = polylineBuffers(points, [0, 3], closed=True)
+        assert list(opcodes) == [OP_MOVETO, OP_LINETO, OP_LINETO, OP_CLOSE,
+                                 OP_MOVETO, OP_LINETO, OP_CLOSE]
+
+    def test_colors(self):
+        ## a path for each color, holding the polylines of that color
+        points = [(0, 0), (1, 1), (10, 10), (11, 11), (20, 20), (21, 21)]
+        lines = polylines(points, [0, 2, 4], [(1, 0, 0, 1), (0, 1, 0, 0.5), (1, 0, 0, 1)])
+        paths = lines.paths()
+        assert len(paths) == 2
+        for (p, fill, stroke) in paths:
+            assert fill is None
+            if stroke.g:
+                assert p.bounds() == (10, 10, 11, 11)
+                self.assertAlmostEqual(stroke.a, 0.5, 2)
+            else:
+                assert p.bounds() == (0, 0, 21, 21)
+                assert (stroke.r, stroke.a) == (1, 1)
+
+        ## closed polylines are filled with their color
+        shapes = polylines(points, [0, 4], numpy.ones((2, 3)), closed=True)
+        (p, fill, stroke) = shapes.paths()[0]
+        assert (fill.r, fill.g, fill.b) == (1, 1, 1)
+        assert stroke is None
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+from pypaint.library.boids import Boids, cohesion, separation, alignment, neighbourhood
+
+import unittest
+import numpy
+
+class testBoids(unittest.TestCase):
+    def setUp(self):
+        numpy.random.seed(1)
+        self.flock = Boids(50, 0, 0, 100, 100)
+        self.flock.velocity[:] = numpy.random.random((50, 3)) * 10 - 5
+
+    def assertRows(self, rows, method):
+        ## the flock rules against the per boid ones
+        for boid in self.flock:
+            for (a, b) in zip(rows[boid.index], method(boid)):
+                self.assertAlmostEqual(a, b)
+
+    def test_rules(self):
+        flock = self.flock
+        self.assertRows(cohesion(flock.position, 100), lambda boid: boid.cohesion(100))
+        self.assertRows(separation(flock.position, 10), lambda boid: boid.separation(10))
+        self.assertRows(alignment(flock.velocity, 5), lambda boid: boid.alignment(5))
+
+    def test_local_rules(self):
+        ## cohesion and alignment over the boids within 20
+        flock = self.flock
+        (force, centre, average) = neighbourhood(flock.position, flock.velocity, 10, 20)
+        local = cohesion(flock.position, 100, centre)
+        steer = alignment(flock.velocity, 5, average)
+        self.assertRows(force, lambda boid: boid.separation(10))
+        for boid in flock:
+            delta = flock.position - flock.position[boid.index]
+            near = ((delta * delta).sum(axis=1) < 400)
+            near[boid.index] = False
+            if not near.any():
+                assert not local[boid.index].any()
+                continue
+            centre = flock.position[near].mean(axis=0)
+            average = flock.velocity[near].mean(axis=0)
+            for (a, b) in zip(local[boid.index], (centre - flock.position[boid.index]) / 100):
+                self.assertAlmostEqual(a, b)
+            for (a, b) in zip(steer[boid.index], (average - flock.velocity[boid.index]) / 5):
+                self.assertAlmostEqual(a, b)
+
+    def test_views(self):
+        boid = self.flock[3]
+        boid.x  = 7.0
+        boid.vz = -2.0
+        assert self.flock.position[3, 0] == 7.0
+        assert self.flock.velocity[3, 2] == -2.0
+
+        copy = boid.copy()
+        copy.x = 8.0
+        assert boid.x == 7.0
+
+    def test_update(self):
+        flock = self.flock
+        flock.noperch()
+        flock.noscatter()
+        flock.goal(50, 50, 0)
+        ## constrain() pushes after the limit, so look at the step taken
+        for radius in (None, 30):
+            position = flock.position.copy()
+            flock.update(limit=3, radius=radius)
+            assert abs(flock.position - position).max() <= 3 + 1e-9
+
+    def test_goal(self):
+        ## a goal pulls the flock's centre towards it, fleeing pushes it away
+        flock = self.flock
+        flock.noperch()
+        flock.noscatter()
+        flock.velocity[:] = 0
+        start = flock.position.copy()
+        goal = numpy.array((100.0, 100.0, 0.0))
+
+        def distance():
+            return numpy.hypot(*(flock.position.mean(axis=0) - goal)[:2])
+        before = distance()
+
+        flock.goal(*goal)
+        flock.update(separation=0)
+        assert distance() < before
+
+        flock.position[:] = start
+        flock.velocity[:] = 0
+        flock.goal(*goal, flee=True)
+        flock.update(separation=0)
+        assert distance() > before
+
+    def test_perching(self):
+        flock = self.flock
+        flock.noscatter()
+        flock.perch(ground=50, frames=2)
+        flock.position[:, 1] = 60
+        flock.constrain()
+        assert flock.perching.all()
+        assert (flock.position[:, 1] == 50).all()
+
+        ## perching boids stay put until their frames run out
+        position = flock.position.copy()
+        flock.update()
+        assert (flock.position[:, 1] == position[:, 1]).all()
+        assert (flock.perch_t == 1).all()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+from pypaint.utils.cache            import LRUCache
+from pypaint.interfaces.PIL.helper import StyleCache
+from pypaint.types.color           import Color
+
+import unittest
+
+class testLRUCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = LRUCache(maxsize=4)
+        assert cache.get('a', lambda: 1) == 1
+        assert cache.get('a', lambda: 2) == 1
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_miss_without_factory(self):
+        cache = LRUCache()
+        assert cache.get('a') is None
+        assert cache.misses == 1
+        assert len(cache) == 0
+
+    def test_eviction(self):
+        cache = LRUCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        ## 'b' was the least recently used
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert 'c' in cache
+
+    def test_stats(self):
+        cache = LRUCache()
+        cache.get('a', lambda: 1)
+        cache.get('a', lambda: 1)
+        assert cache.stats() == {'hits': 1, 'misses': 1, 'size': 1}
+
+class testStyleCache(unittest.TestCase):
+    def test_pens(self):
+        styles = StyleCache()
+        pen = styles.pen(Color(1.0, 0.0, 0.0, 1.0), 2.0)
+        ## equal colors, not the same Color, share a pen
+        assert styles.pen(Color(1.0, 0.0, 0.0, 1.0), 2.0) is pen
+        assert styles.pen(Color(1.0, 0.0, 0.0, 1.0), 3.0) is not pen
+        assert styles.pen(Color(1.0, 0.0, 0.0, 0.5), 2.0) is not pen
+        assert styles.stats()['pen'] == {'hits': 1, 'misses': 3, 'size': 3}
+
+    def test_brushes(self):
+        styles = StyleCache()
+        brush = styles.brush(Color(0.0, 0.5, 0.0, 1.0))
+        assert styles.brush(Color(0.0, 0.5, 0.0, 1.0)) is brush
+        assert styles.brush(Color(0.0, 0.5, 0.0, 1.0)) is brush
+        assert styles.brush(Color(0.0, 0.0, 0.5, 1.0)) is not brush
+        assert styles.stats()['brush'] == {'hits': 2, 'misses': 2, 'size': 2}
+        assert styles.stats()['pen'] == {'hits': 0, 'misses': 0, 'size': 0}
+
+    def test_clear(self):
+        styles = StyleCache()
+        brush = styles.brush(Color(0.0, 0.5, 0.0, 1.0))
+        styles.clear()
+        assert styles.brush(Color(0.0, 0.5, 0.0, 1.0)) is not brush
+
+if __name__ == '__main__':
+    unittest.main()
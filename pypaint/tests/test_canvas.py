@@ -0,0 +1,27 @@
+from pypaint.interfaces.PIL.canvas import PILCanvas
+from pypaint.context               import Context
+
+import unittest
+
+class testPILCanvas(unittest.TestCase):
+    def test_compile_cache(self):
+        ## a redraw reuses the compiled paths, only a mutated one is rebuilt
+        canvas = PILCanvas(50, 50)
+        ctx = Context(width=50, height=50, canvas=canvas)
+        paths = [ctx.rect(i * 10, 10, 5, 5) for i in range(4)]
+
+        canvas.draw()
+        assert (canvas.compiles, canvas.compiles_skipped) == (4, 0)
+        canvas.draw()
+        assert (canvas.compiles, canvas.compiles_skipped) == (0, 4)
+
+        native = paths[1]._native
+        paths[2].lineto(30, 30)
+        canvas.draw()
+        assert (canvas.compiles, canvas.compiles_skipped) == (1, 3)
+        assert paths[1]._native is native
+        canvas.draw()
+        assert (canvas.compiles, canvas.compiles_skipped) == (0, 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,23 @@
+from pypaint.interfaces.PIL.helper import offscreen
+
+import unittest
+
+IDENTITY = (1, 0, 0, 1, 0, 0)
+
+class testCulling(unittest.TestCase):
+    def test_inside_and_outside(self):
+        assert not offscreen((10, 10, 20, 20), IDENTITY, (100, 100))
+        assert offscreen((110, 10, 120, 20), IDENTITY, (100, 100))
+        assert offscreen((-30, -30, -20, -20), IDENTITY, (100, 100))
+
+    def test_transformed(self):
+        ## moved back onto the surface
+        assert not offscreen((110, 10, 120, 20), (1, 0, 0, 1, -50, 0), (100, 100))
+
+    def test_stroke_reaches_surface(self):
+        ## 5 pixels off the edge, a 10 pixel pen still paints the surface
+        assert offscreen((105, 10, 120, 20), IDENTITY, (100, 100))
+        assert not offscreen((105, 10, 120, 20), IDENTITY, (100, 100), 10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+from pypaint.types.displaylist import DisplayList
+
+import unittest
+
+class testDisplayList(unittest.TestCase):
+    def test_priority_order(self):
+        d = DisplayList()
+        d.add('c', 3)
+        d.add('a', 1)
+        d.add('b', 2)
+        assert list(d) == ['a', 'b', 'c']
+
+    def test_stable(self):
+        d = DisplayList()
+        for name in ['a', 'b', 'c', 'd']:
+            d.add(name, 2)
+        d.add('first', 1)
+        assert list(d) == ['first', 'a', 'b', 'c', 'd']
+
+    def test_replay(self):
+        d = DisplayList()
+        d.add('a')
+        d.add('b')
+        assert list(d) == list(d) == ['a', 'b']
+        assert len(d) == 2
+
+    def test_clear(self):
+        d = DisplayList()
+        items = d.items
+        d.add('a')
+        d.clear()
+        assert len(d) == 0
+        assert d.items is items
+
+    def test_remove(self):
+        d = DisplayList()
+        d.add('a')
+        d.add('b')
+        d.remove('a')
+        assert list(d) == ['b']
+        self.assertRaises(ValueError, d.remove, 'a')
+
+if __name__ == '__main__':
+    unittest.main()
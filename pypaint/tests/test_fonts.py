@@ -0,0 +1,140 @@
+from pypaint.utils.fonts import FontRegistry, FontMetrics
+from pypaint.utils       import fonts
+
+import unittest
+import tempfile
+import shutil
+import os
+
+class FakeRegistry(FontRegistry):
+    ## names the fonts after their files instead of opening them
+    def read(self, file):
+        name = os.path.splitext(os.path.basename(file))[0]
+        return {"name": name, "family": name.split("-")[0],
+                "units_per_em": 1000, "ascent": 800, "descent": -200, "line_gap": 0}
+
+class testFontRegistry(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        for name in ("Sans", "Sans-Bold", "Serif"):
+            open(os.path.join(self.dir, name + ".ttf"), "w").close()
+        self.pattern = os.path.join(self.dir, "*.ttf")
+        self.index   = os.path.join(self.dir, "index", "fonts.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def registry(self):
+        return FakeRegistry([self.pattern], self.index)
+
+    def test_lookup(self):
+        fonts = self.registry()
+        assert fonts.lookup("Sans-Bold") == os.path.join(self.dir, "Sans-Bold.ttf")
+        ## the family picks its regular face
+        assert fonts.lookup("Sans") == os.path.join(self.dir, "Sans.ttf")
+        assert fonts.lookup("Mono") is None
+        assert fonts.metrics(fonts.lookup("Serif"))["units_per_em"] == 1000
+
+    def test_index_is_reused(self):
+        first = self.registry()
+        first.refresh()
+        assert first.reads == 3
+
+        second = self.registry()
+        second.refresh()
+        assert second.reads == 0
+        assert second.fonts == first.fonts
+
+    def test_changed_files_are_read_again(self):
+        self.registry().refresh()
+        file = os.path.join(self.dir, "Serif.ttf")
+        mtime = os.path.getmtime(file)
+        os.utime(file, (mtime + 10, mtime + 10))
+        os.remove(os.path.join(self.dir, "Sans.ttf"))
+
+        fonts = self.registry()
+        fonts.refresh()
+        assert fonts.reads == 1
+        assert fonts.lookup("Sans") == os.path.join(self.dir, "Sans-Bold.ttf")
+
+    def test_broken_index(self):
+        self.registry().refresh()
+        open(self.index, "w").write("{not json")
+        fonts = self.registry()
+        fonts.refresh()
+        assert fonts.reads == 3
+
+class Table:
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+class FakeCmap:
+    def __init__(self, cmap):
+        self.tables = [Table(cmap=cmap)]
+
+    def getcmap(self, platform, encoding):
+        if (platform, encoding) == (3, 1):
+            return self.tables[0]
+        return None
+
+def fakeFont():
+    ## a 1000 unit em with "A" and "V" kerned together
+    return {
+        'head': Table(unitsPerEm=1000),
+        'hhea': Table(ascent=800, descent=-200, lineGap=100),
+        'cmap': FakeCmap({ord("A"): "A", ord("V"): "V", ord(" "): "space"}),
+        'hmtx': Table(metrics={"A": (600, 0), "V": (500, 0), "space": (250, 0)}),
+        'kern': Table(kernTables=[Table(format=0, kernTable={("A", "V"): -80})]),
+    }
+
+class testFontMetrics(unittest.TestCase):
+    def test_advance(self):
+        metrics = FontMetrics(fakeFont())
+        assert metrics.advance("A V") == 1350
+        assert metrics.advance("AV") == 1020
+        ## no glyph, no room
+        assert metrics.advance("A?") == 600
+
+    def test_textsize(self):
+        metrics = FontMetrics(fakeFont())
+        (width, height) = metrics.textsize("AV", 20)
+        self.assertAlmostEqual(width, 20.4)
+        self.assertAlmostEqual(height, 22.0)
+
+    def test_context_textmetrics(self):
+        from pypaint.context import Context
+        fonts._metrics["fake.ttf"] = FontMetrics(fakeFont())
+        try:
+            ctx = Context(width=10, height=10)
+            ctx.font("fake.ttf", 20)
+            (width, height) = ctx.textmetrics("AV")
+            self.assertAlmostEqual(width, 20.4)
+            self.assertAlmostEqual(height, 22.0)
+            ## a size given to the call wins over the context's
+            (width, height) = ctx.textmetrics("AV", fontsize=10)
+            self.assertAlmostEqual(width, 10.2)
+            self.assertAlmostEqual(height, 11.0)
+            self.assertRaises(TypeError, ctx.textmetrics, "AV", align="center")
+        finally:
+            del fonts._metrics["fake.ttf"]
+
+    def test_text_bounds(self):
+        ## the kerned advance and the line height, and the pivot of
+        ## CENTER transforms in the middle of them
+        from pypaint.text import text
+        fonts._metrics["fake.ttf"] = FontMetrics(fakeFont())
+        try:
+            label = text("AV", 10, 30, font_file="fake.ttf")
+            label.fontsize = 20
+            bounds = label.bounds
+            for (a, b) in zip(bounds, (10, 30, 30.4, 52.0)):
+                self.assertAlmostEqual(a, b)
+            for (a, b) in zip(label.center, (20.2, 41.0)):
+                self.assertAlmostEqual(a, b)
+            for (a, b) in zip(label.metrics, (20.4, 22.0)):
+                self.assertAlmostEqual(a, b)
+        finally:
+            del fonts._metrics["fake.ttf"]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+from pypaint.types.pathbuffer import PathBuffer
+from pypaint.utils.defaults   import *
+
+import unittest
+
+class testPathBuffer(unittest.TestCase):
+    def test_relative_normalized(self):
+        b = PathBuffer()
+        b.moveto(1, 2)
+        b.rellineto(3, 4)
+        b.relcurveto(1, 1, 2, 2, 3, 3)
+        assert [e.cmd for e in b] == [MOVETO, LINETO, CURVETO]
+        assert b[1].values == (4.0, 6.0)
+        assert b[2].values == (5.0, 7.0, 6.0, 8.0, 7.0, 9.0)
+
+    def test_close_resets_current_point(self):
+        b = PathBuffer()
+        b.moveto(10, 10)
+        b.lineto(20, 20)
+        b.closepath()
+        b.rellineto(1, 0)
+        assert b[-1].values == (11.0, 10.0)
+
+    def test_ellipse(self):
+        b = PathBuffer()
+        b.ellipse(0, 0, 10, 20)
+        assert [e.cmd for e in b] == [MOVETO] + [CURVETO] * 4 + [CLOSE]
+        assert b.bounds() == (0.0, 0.0, 10.0, 20.0)
+
+    def test_exact_bounds(self):
+        b = PathBuffer()
+        b.moveto(0, 0)
+        b.curveto(25, 100, 75, 100, 100, 0)
+        assert b.bounds() == (0.0, 0.0, 100.0, 75.0)
+
+        b = PathBuffer()
+        b.moveto(0, 0)
+        b.curve3to(50, 100, 100, 0)
+        assert b.bounds() == (0.0, 0.0, 100.0, 50.0)
+
+    def test_views(self):
+        b = PathBuffer()
+        b.moveto(1, 2)
+        assert b[0][0] == MOVETO
+        assert b[0][1:] == (1.0, 2.0)
+        assert list(b[0].XY) == [1.0, 2.0]
+        self.assertRaises(IndexError, b.__getitem__, 1)
+
+    def test_transform(self):
+        b = PathBuffer()
+        b.moveto(1, 0)
+        b.lineto(0, 1)
+        t = b.transform((0, 1, -1, 0, 10, 0))
+        assert t[0].values == (10.0, 1.0)
+        assert t[1].values == (9.0, 0.0)
+        assert b[0].values == (1.0, 0.0)
+
+    def test_extend_buffer(self):
+        glyph = PathBuffer()
+        glyph.moveto(0, 0)
+        glyph.curve3to(1, 1, 2, 0)
+        glyph.closepath()
+
+        b = PathBuffer()
+        b.moveto(5, 5)
+        b.extend_buffer(glyph, (2, 0, 0, -2, 10, 20))
+        b.extend_buffer(glyph)
+        assert [e.cmd for e in b] == [MOVETO, MOVETO, CURVE3TO, CLOSE, MOVETO, CURVE3TO, CLOSE]
+        assert b[2].values == (12.0, 18.0, 14.0, 20.0)
+        assert b[5].values == (1.0, 1.0, 2.0, 0.0)
+        b.rellineto(1, 1)
+        assert b[-1].values == (1.0, 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+from pypaint.utils.profile            import RenderStats, profiled
+from pypaint.types.canvas             import PILCanvas
+from pypaint.interfaces.PIL           import canvas as PIL
+from pypaint.context                  import Context
+from pypaint.shape                    import shape
+from pypaint.batch                    import polylines
+from pypaint.text                     import text
+from pypaint.utils                    import fonts
+
+from StringIO import StringIO
+
+import glob
+import json
+import unittest
+
+def drawShapes(canvas):
+    ## two rectangles, one of them off the surface, and a batch of
+    ## polylines in two colors
+    canvas.clear()
+    s = shape()
+    for x in (10, 500):
+        rect = s.rectangle(x, 10, 20, 20)
+        rect.fill_color = (1, 0, 0, 1)
+        canvas.add(rect)
+    canvas.add(polylines([(0, 0), (10, 0), (10, 10), (50, 50), (60, 50), (60, 60)],
+                         [0, 3], [(1, 0, 0, 1), (0, 0, 1, 1)], closed=True))
+    canvas.draw()
+
+class testProfile(unittest.TestCase):
+    def test_disabled(self):
+        canvas = PILCanvas(100, 100)
+        drawShapes(canvas)
+        assert canvas.stats() == {}
+
+    def test_stages(self):
+        canvas = PILCanvas(100, 100)
+        canvas.enable_stats()
+        drawShapes(canvas)
+        stats = canvas.stats()
+        assert stats['frames'] == 1
+        assert stats['counts'] == {'path': 3, 'culled': 1}
+        for stage in ('transform', 'compile', 'style', 'rasterize', 'flush', 'draw', 'path'):
+            assert stats['times'][stage] >= 0.0, stage
+
+    def test_text(self):
+        files = sum([glob.glob(pattern) for pattern in fonts.FONT_PATHS], [])
+        if not files:
+            self.skipTest("no TrueType fonts installed")
+        canvas = PILCanvas(100, 100)
+        canvas.enable_stats()
+        label = text("stats", 10, 10, font_file=files[0])
+        label.fill_color = (0, 0, 0, 1)
+        canvas.add(label)
+        canvas.draw()
+        stats = canvas.stats()
+        assert stats['counts'] == {'text': 1}
+        for stage in ('transform', 'rasterize', 'text', 'draw'):
+            assert stage in stats['times'], stage
+
+    def test_context_canvas(self):
+        ## the canvas a Context draws on
+        canvas = PIL.PILCanvas(100, 100)
+        ctx = Context(width=100, height=100, canvas=canvas)
+        ctx.rect(10, 10, 20, 20)
+        ctx.rect(500, 10, 20, 20)
+        canvas.enable_stats()
+        canvas.draw()
+        stats = canvas.stats()
+        assert stats['counts'] == {'path': 1, 'culled': 1}
+        for stage in ('transform', 'compile', 'style', 'rasterize', 'flush', 'draw', 'path'):
+            assert stage in stats['times'], stage
+
+        ## the second frame reuses the compiled path
+        canvas.draw()
+        stats = canvas.profiler
+        assert stats.frames == 1
+        assert 'compile' not in stats.frame_times
+        assert stats.frame_counts == {'path': 1, 'culled': 1}
+
+    def test_json_log(self):
+        log = StringIO()
+        canvas = PILCanvas(100, 100)
+        with profiled(canvas, log) as stats:
+            drawShapes(canvas)
+            drawShapes(canvas)
+        assert canvas.profiler is None
+        lines = [json.loads(line) for line in log.getvalue().splitlines()]
+        assert [line['frame'] for line in lines] == [0, 1]
+        assert [line['counts'] for line in lines] == [{'path': 3, 'culled': 1}] * 2
+        assert 'rasterize' in lines[1]['times']
+
+    def test_frames_add_up(self):
+        stats = RenderStats()
+        stats.count('path', 2)
+        stats.begin_frame()
+        stats.count('path', 3)
+        assert stats.as_dict()['frames'] == 2
+        assert stats.as_dict()['counts'] == {'path': 5}
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+from pypaint.render import Renderer, PipeSink, FrameWorker, render_frames
+
+from StringIO import StringIO
+
+import os
+import shutil
+import tempfile
+import unittest
+
+class FakeContext:
+    framerate = 10
+    FRAME = 0
+
+class ListSink:
+    ordered = False
+
+    def __init__(self):
+        self.frames = []
+
+    def write(self, frame, size, data):
+        self.frames.append((frame, data))
+
+    def close(self):
+        pass
+
+class BrokenSink(ListSink):
+    def write(self, frame, size, data):
+        raise IOError("disk full")
+
+def shade(ctx):
+    ## a square whose red is the frame number, in tenths
+    ctx.fill(ctx.FRAME / 10.0, 0, 0)
+    ctx.rect(0, 0, 4, 4)
+
+def red(data):
+    ## the red of the first pixel of RGBA data
+    return ord(data[0])
+
+class testRender(unittest.TestCase):
+    def test_frames_follow_context(self):
+        ctx  = FakeContext()
+        sink = ListSink()
+        Renderer(lambda: "frame %d" % ctx.FRAME, 1, 1, sink, seconds=2, context=ctx).run()
+        assert sorted(sink.frames) == [(i, "frame %d" % i) for i in range(20)]
+
+    def test_pipe_keeps_order(self):
+        stream = StringIO()
+        frames = iter("abcdefgh")
+        stats = Renderer(lambda: frames.next(), 1, 1, PipeSink(stream), frames=8, backlog=2).run()
+        assert stream.getvalue() == "abcdefgh"
+        assert stats['frames'] == 8
+        assert stats['backlog_max'] <= 2
+
+    def test_buffers_are_copied(self):
+        data = bytearray("aa")
+        def draw():
+            data[0] += 1
+            return data
+        sink = ListSink()
+        Renderer(draw, 1, 1, sink, frames=2).run()
+        assert sorted(sink.frames) == [(0, "ba"), (1, "ca")]
+
+    def test_sink_errors_surface(self):
+        renderer = Renderer(lambda: "x", 1, 1, BrokenSink(), frames=3)
+        self.assertRaises(IOError, renderer.run)
+
+class testFrames(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_frames_in_order(self):
+        for workers in (1, 2):
+            frames = list(render_frames(shade, [5, 0, 3, 1], 4, 4, workers=workers, chunksize=1))
+            assert [frame for (frame, data) in frames] == [5, 0, 3, 1]
+            assert [red(data) for (frame, data) in frames] == [127, 0, 76, 25]
+            assert len(frames[0][1]) == 4 * 4 * 4
+
+    def test_pattern(self):
+        from PIL import Image
+        for workers in (1, 2):
+            pattern = os.path.join(self.directory, "%d-%%03d.png" % workers)
+            names = render_frames(shade, range(4), 4, 4, workers=workers, pattern=pattern)
+            assert names == [pattern % frame for frame in range(4)]
+            for (frame, name) in enumerate(names):
+                assert Image.open(name).convert("RGB").getpixel((0, 0)) == (int(frame * 25.5), 0, 0)
+
+    def test_scripts(self):
+        ## a script with a draw() runs once, one without runs every frame
+        script = os.path.join(self.directory, "script.py")
+        for source in ("calls = []\ndef draw():\n    calls.append(FRAME)\n    fill(FRAME / 10.0, 0, 0)\n    rect(0, 0, 4, 4)\n",
+                       "fill(FRAME / 10.0, 0, 0)\nrect(0, 0, 4, 4)\n"):
+            open(script, "w").write(source)
+            worker = FrameWorker(script, 4, 4)
+            assert [red(worker.render(frame)) for frame in (2, 4)] == [51, 102]
+            if "calls" in worker.namespace:
+                assert worker.namespace["calls"] == [2, 4]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+from pypaint.geometry.spatial import SpatialHash
+
+import unittest
+import numpy
+
+def bruteforce(points, radius):
+    pairs = set()
+    for i in range(len(points)):
+        for j in range(len(points)):
+            if i != j and ((points[i] - points[j]) ** 2).sum() < radius * radius:
+                pairs.add((i, j))
+    return pairs
+
+class testSpatialHash(unittest.TestCase):
+    def setUp(self):
+        numpy.random.seed(2)
+        self.points = numpy.random.random((200, 3)) * 100 - 50
+
+    def test_pairs(self):
+        for (cell, radius) in ((10, 10), (25, 10), (3, 2.5)):
+            (i, j) = SpatialHash(self.points, cell).pairs(radius)
+            assert len(i) == len(set(zip(i, j)))
+            assert set(zip(i, j)) == bruteforce(self.points, radius)
+
+    def test_query(self):
+        grid = SpatialHash(self.points[:, :2], 10)
+        found = grid.query((5, 5), 8)
+        distance = ((self.points[:, :2] - (5, 5)) ** 2).sum(axis=1)
+        assert list(found) == list(numpy.nonzero(distance < 64)[0])
+        ## points outside the grid find nothing
+        assert len(grid.query((1000, 1000), 8)) == 0
+
+    def test_within(self):
+        grid = SpatialHash(self.points, 10)
+        others = numpy.random.random((20, 3)) * 120 - 60
+        (i, j) = grid.within(others, 10)
+        expected = set()
+        for a in range(len(others)):
+            for b in numpy.nonzero(((self.points - others[a]) ** 2).sum(axis=1) < 100)[0]:
+                expected.add((a, b))
+        assert set(zip(i, j)) == expected
+
+    def test_empty(self):
+        (i, j) = SpatialHash(numpy.zeros((0, 2)), 1).pairs(1)
+        assert len(i) == len(j) == 0
+
+    def test_radius(self):
+        grid = SpatialHash(self.points, 5)
+        self.assertRaises(ValueError, grid.pairs, 6)
+        self.assertRaises(ValueError, SpatialHash, self.points, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+from pypaint.interfaces.PIL.tiles  import tile_boxes, bin_records, stitch, render, TileRecorder
+from pypaint.interfaces.PIL.helper import paddedRect
+from pypaint.types.canvas          import PILCanvas
+from pypaint.batch                 import polylines
+from pypaint.text                  import text
+from pypaint.utils                 import fonts
+
+import aggdraw
+import glob
+import math
+import random
+import unittest
+
+IDENTITY = (1, 0, 0, 1, 0, 0)
+
+def randomRecords(size, count, seed):
+    ## transformed, stroked and filled paths scattered over and past the
+    ## edges of a surface of size, as TileRecorder makes them
+    rand = random.Random(seed)
+    (width, height) = size
+    records = []
+    extents = []
+    for i in xrange(count):
+        path = aggdraw.Path()
+        path.moveto(rand.uniform(-20, 20), rand.uniform(-20, 20))
+        for j in xrange(3):
+            if rand.random() < 0.5:
+                path.lineto(rand.uniform(-20, 20), rand.uniform(-20, 20))
+            else:
+                path.curveto(*[rand.uniform(-20, 20) for k in xrange(6)])
+        path.close()
+
+        angle = rand.uniform(0, 2 * math.pi)
+        scale = rand.uniform(0.5, 2)
+        (c, s) = (math.cos(angle) * scale, math.sin(angle) * scale)
+        matrix = (c, -s, rand.uniform(-10, width + 10),
+                  s, c, rand.uniform(-10, height + 10))
+
+        strokewidth = rand.choice([None, 1, 2.5, 6])
+        pen = None
+        if strokewidth is not None:
+            pen = ((rand.randrange(256), 0, 0), strokewidth, rand.choice([255, 128]))
+        brush = ((0, rand.randrange(256), 0), rand.choice([255, 128]))
+
+        (opcodes, coords) = path.dump()
+        records.append(('path', opcodes, coords, matrix, pen, brush))
+        extents.append(paddedRect(path.bounds(), matrix, strokewidth))
+    return records, extents
+
+def randomPolylines(size, count, seed):
+    ## closed, stroked polylines in a few colors, over the surface edges
+    rand = random.Random(seed)
+    (width, height) = size
+    points = []
+    for i in xrange(count * 4):
+        points.append((rand.uniform(-20, width + 20), rand.uniform(-20, height + 20)))
+    colors = [rand.choice([(1, 0, 0, 1), (0, 0, 1, 0.5)]) for i in xrange(count)]
+    lines = polylines(points, range(0, count * 4, 4), colors, closed=True)
+    lines.stroke_color = (0, 0, 0, 1)
+    lines.stroke_width = 2
+    return lines
+
+class testTiles(unittest.TestCase):
+    def test_boxes_cover_surface(self):
+        boxes = tile_boxes((100, 50), 40)
+        assert len(boxes) == 6
+        assert boxes[0] == (0, 0, 40, 40)
+        assert boxes[-1] == (80, 40, 100, 50)
+
+    def test_binning_keeps_order(self):
+        boxes = tile_boxes((100, 100), 50)
+        bins  = bin_records(['a', 'b', 'c'], [(10, 10, 20, 20), None, (60, 10, 70, 20)], boxes)
+        assert bins[0] == ['a', 'b']
+        assert bins[1] == ['b', 'c']
+        assert bins[2] == ['b']
+
+    def test_stitch(self):
+        tiles = [((0, 0, 1, 2), 'AAAAaaaa'), ((1, 0, 2, 2), 'BBBBbbbb')]
+        assert stitch((2, 2), tiles) == 'AAAABBBBaaaabbbb'
+
+    def test_tiles_match_one_surface(self):
+        ## geometry crossing tile seams and the surface edge rasterizes to
+        ## the same pixels, tile by tile, as on one surface
+        size = (130, 90)
+        (records, extents) = randomRecords(size, 60, 1)
+        for (record, extent) in TileRecorder().polylines(randomPolylines(size, 20, 2), IDENTITY):
+            records.append(record)
+            extents.append(extent)
+        for antialias in (False, True):
+            whole = render(size, records, extents, antialias=antialias, tile=10000, workers=1)
+            for tile in (17, 64):
+                tiled = render(size, records, extents, antialias=antialias, tile=tile, workers=1)
+                assert tiled == whole, (antialias, tile)
+
+    def test_draw_tiled(self):
+        ## the canvas draws the same pixels with and without tiles,
+        ## batched polylines included
+        canvas = PILCanvas(130, 90)
+        lines = randomPolylines((130, 90), 20, 3)
+        canvas.add(lines)
+        canvas.draw()
+        tiled = canvas.draw_tiled(tile=17, workers=1)
+        assert len(lines.paths()) == 2
+        assert tiled.tostring() == canvas.AGG_canvas.tostring()
+
+    def test_draw_tiled_text(self):
+        ## text across tile seams is drawn as the canvas draws it, from
+        ## the glyph atlas when ft2 is there
+        files = sum([glob.glob(pattern) for pattern in fonts.FONT_PATHS], [])
+        if not files:
+            self.skipTest("no TrueType fonts installed")
+        canvas = PILCanvas(130, 90)
+        canvas.add(randomPolylines((130, 90), 10, 4))
+        for (x, y, size) in [(3, 5, 12), (-6, 30.5, 20), (40.25, 70, 16)]:
+            label = text("Tiles AVA", x, y, font_file=files[0])
+            label.fontsize = size
+            label.fill_color = (0.2, 0.3, 0.9, 0.8)
+            canvas.add(label)
+        canvas.draw()
+        for workers in (1, 2):
+            tiled = canvas.draw_tiled(tile=17, workers=workers)
+            assert tiled.tostring() == canvas.AGG_canvas.tostring()
+
+if __name__ == '__main__':
+    unittest.main()
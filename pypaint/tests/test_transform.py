@@ -0,0 +1,61 @@
+from pypaint.types.transform import Transform
+from pypaint.utils.defaults  import CENTER, CORNER
+
+from math import pi
+
+import unittest
+
+def close(p1, p2):
+    return abs(p1[0] - p2[0]) < 1e-9 and abs(p1[1] - p2[1]) < 1e-9
+
+class testTransform(unittest.TestCase):
+    def test_rotate_around_center(self):
+        t = Transform()
+        t.rotate(pi / 2)
+        m = t.getMatrixWCenter(5, 5, CENTER)
+        assert close(t.transform_point(5, 5, m), (5, 5))
+        assert close(t.transform_point(10, 5, m), (5, 10))
+
+    def test_corner(self):
+        t = Transform()
+        t.translate(10, 0)
+        t.scale(2)
+        m = t.getMatrixWCenter(5, 5, CORNER)
+        assert close(t.transform_point(1, 1, m), (12, 2))
+
+    def test_cache_invalidated(self):
+        t = Transform()
+        m1 = t.getMatrixWCenter(0, 0, CENTER)
+        assert t.getMatrixWCenter(0, 0, CENTER) is m1
+        t.translate(1, 0)
+        assert t.getMatrixWCenter(0, 0, CENTER)[4] == 1.0
+
+    def test_skew(self):
+        t = Transform()
+        t.skew(pi / 4, 0)
+        m = t.getMatrixWCenter(0, 0, CORNER)
+        assert close(t.transform_point(0, 10, m), (10, 10))
+        assert close(t.transform_point(10, 0, m), (10, 0))
+
+    def test_push_pop(self):
+        t = Transform()
+        t.translate(1, 2)
+        t.push()
+        t.rotate(1.0)
+        t.pop()
+        assert t.matrix == (1.0, 0.0, 0.0, 1.0, 1.0, 2.0)
+
+    def test_append_prepend(self):
+        t = Transform()
+        t.scale(2)
+        before = Transform()
+        before.translate(1, 0)
+        after = Transform()
+        after.translate(1, 0)
+        t.prepend(before)
+        t.append(after)
+        ## (x + 1) * 2 + 1
+        assert close(t.transform_point(0, 0), (3, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,8 @@
-from fontTools.ttLib    import TTFont
 from pypaint.mixins     import *
 from pypaint.path       import path
+from pypaint.utils      import fonts
 from aggdraw            import *
 
-import glob
-
 class text(Grob, TransformMixin, ColorMixin):
     FONT_SPECIFIER_NAME_ID   = 4
     FONT_SPECIFIER_FAMILY_ID = 1
@@ -108,13 +106,12 @@ class text(Grob, TransformMixin, ColorMixin):
         self.x = x
         self.y = y
 
-        self.fonts = {}
-        self.font_by_name = {}
-        self.find_fonts()
         self.fontsize = 10
 
-        if font_name and self.font_by_name.has_key(font_name):
-            self.fontfile = self.font_by_name[font_name]
+        ## a dict lookup once the registry has been loaded
+        fontfile = font_name and fonts.registry().lookup(font_name)
+        if fontfile:
+            self.fontfile = fontfile
         elif font_file:
             self.fontfile = font_file
         else:
@@ -122,9 +119,15 @@ class text(Grob, TransformMixin, ColorMixin):
 
     @property
     def bounds(self):
-        tmp_canvas = Draw('RGB', (1000, 1000))
-        font = Font((0.1), self.fontfile, self.fontsize)
-        W, H = tmp_canvas.textsize(self.text, font)
+        '''
+        The box of one line of the text, measured from the font tables:
+        the kerned advance width and the line height, ascent - descent
+        + line gap, at fontsize, without hinting. Draw.textsize() gave
+        the same line height hinted and the advance unkerned, so center,
+        which CENTER transforms pivot on, can move by the kerning and a
+        fraction of a pixel. Neither is the extent of the drawn glyphs.
+        '''
+        W, H = fonts.textsize(self.fontfile, self.fontsize, self.text)
         return (self.x, self.y, self.x+W, self.y+H)
 
     @property
@@ -152,9 +155,10 @@ class text(Grob, TransformMixin, ColorMixin):
 
     @property
     def metrics(self):
-        tmp_draw = Draw("RGB", (800, 600), "white")
-        font = Font('black', self.fontfile, size=self.fontsize)
-        return tmp_draw.textsize(self.text, font)
+        '''
+        The (width, height) of bounds.
+        '''
+        return fonts.textsize(self.fontfile, self.fontsize, self.text)
 
     def _get_font_size(self):
         return self.fontsize
@@ -164,22 +168,7 @@ class text(Grob, TransformMixin, ColorMixin):
     font_size = property(_get_font_size, _set_font_size)
 
     def get_short_name(self, font_handle):
-	name   = ""
-	family = ""
-	for record in font_handle['name'].names:
-            if record.nameID == self.FONT_SPECIFIER_NAME_ID and not name:
-                if '\000' in record.string:
-                    name = unicode(record.string, 'utf-16-be').encode('utf-8')
-                else:
-                    name = record.string
-            elif record.nameID == self.FONT_SPECIFIER_FAMILY_ID and not family:
-                if '\000' in record.string:
-                    family = unicode(record.string, 'utf-16-be').encode('utf-8')
-                else:
-                    family = record.string
-            if name and family:
-                break
-        return name, family
+        return fonts.readNames(font_handle)
 
     def get_family(self, font_handle):
 	HIBYTE = 65280
@@ -196,15 +185,10 @@ class text(Grob, TransformMixin, ColorMixin):
 	return (familyName, subFamily)
 
     def find_fonts(self):
-        paths = ["/usr/share/fonts/truetype/*/*.ttf"]
-        files = []
-
-        for path in paths:
-            files.append(glob.glob(path))
-
-        for file_set in files:
-            for file in file_set:
-                font_handle = TTFont(file)
-                short_name = self.get_short_name(font_handle)
-                self.font_by_name[short_name[0]] = file
-                self.fonts[file] = short_name[0]
+        '''
+        Sets fonts (file to name) and font_by_name (name to file) from
+        the font registry.
+        '''
+        registry = fonts.registry()
+        self.fonts        = registry.fonts
+        self.font_by_name = registry.font_by_name
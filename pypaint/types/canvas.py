@@ -1,113 +1,319 @@
 from pypaint.interfaces.PIL.helper  import PILHelper
+from pypaint.interfaces.PIL.helper  import style_cache
+from pypaint.interfaces.PIL.helper  import offscreen
+from pypaint.interfaces.PIL.helper  import surfaceArray
+from pypaint.interfaces.PIL.helper  import loadedType
 from pypaint.interfaces.PIL.context import PILContext
 from pypaint.types.transform        import Transform
-from pypaint.types.text             import Text
+from pypaint.types.color            import Color
 from pypaint.path                   import path
-from pypaint.text                   import text
 from pypaint.utils.defaults         import *
 from pypaint.mixins                 import *
-from pypaint.grid                   import Grid
 from pypaint.utils.util             import *
-from fontTools.ttLib                import TTFont
+from pypaint.utils.profile          import StatsMixin
 
-from PIL      import Image
-from uuid     import uuid4
+from time     import time
 import aggdraw 
 
 import os
-import numpy
 
-class PILCanvas(CanvasMixin):
+class PILCanvas(CanvasMixin, StatsMixin):
     def __init__(self, width=None, height=None, gtk=False):
         CanvasMixin.__init__(self, width, height)
         
         #self.canvas      = Image.new("RGBA", (width, height), "white")
-        self.AGG_canvas  = aggdraw.Draw("RGBA", (width, height), "white")
+        self.background  = "white"
+        self.antialias   = False
+        self.AGG_canvas  = aggdraw.Draw("RGBA", (width, height), self.background)
         self.gtk_draw    = gtk
+        self.styles      = style_cache
         
-        self.AGG_canvas.setantialias(False)
+        self.AGG_canvas.setantialias(self.antialias)
+
+        ## Draw.paths() takes the whole frame in one call
+        self.batch_paths = hasattr(self.AGG_canvas, "paths")
+
+        ## untransformed text is blended from a glyph atlas with
+        ## Draw.masks(); the atlas is made on the first text drawn
+        self.glyph_masks = hasattr(self.AGG_canvas, "masks")
+        self.atlas       = None
+
+        ## skip paths that fall entirely outside the surface; culled
+        ## counts them for the last draw()
+        self.cull   = True
+        self.culled = 0
 
     def reset_canvas(self, r, g, b):
         self.AGG_canvas.clear((r, g, b))
+
+    def begin_frame(self, background=None):
+        '''
+        Starts a new frame on the same surface: the display list is
+        emptied and the pixels are cleared to background (any value
+        Color takes, the canvas background by default). Nothing is
+        allocated, so an animation can draw every frame on one canvas.
+        '''
+        self.clear()
+        if background is None:
+            background = self.background
+        elif not isinstance(background, str):
+            if not isinstance(background, Color):
+                background = Color(background)
+            background = PILHelper().decToRgba(background)
+        self.AGG_canvas.clear(background)
+        self.culled = 0
         
     def show(self, *arguments):
         self.AGG_canvas.flush()
         self.canvas.show()
 
     def gtk(self):
-        return self.AGG_canvas.tostring()
+        profile = self.profiler
+        if profile:
+            start = time()
+        data = self.AGG_canvas.tostring()
+        if profile:
+            profile.lap('encode', start)
+        return data
+
+    def pixels(self):
+        '''
+        The surface as a (height, width, 4) RGBA numpy array, without a
+        copy; see surfaceArray.
+        '''
+        return surfaceArray(self.AGG_canvas)
         
     def output(self, filename, file_ext):
+        profile = self.profiler
+        if profile:
+            start = time()
+
         if not self.gtk_draw:
             self.AGG_canvas.flush()
+        if profile:
+            start = profile.lap('flush', start)
 
         self.canvas.save(filename, file_ext)
+        if profile:
+            profile.lap('encode', start)
         
-    def draw(self, stack=None):
-        ## for   = 0.373 per call
-        ## while = 0.441 per call
-        last_transform = None
+    def draw(self, stack=None, scale=None):
+        ## paths are collected into (path, transform, pen, brush) records
+        ## and handed to aggdraw in a single Draw.paths() call; text breaks
+        ## the batch so the stacking order is kept.
+        if stack is None:
+            stack = self.data
+
+        self.culled = 0
+        size = (self.width, self.height)
+
+        ## stats are taken only with a profiler; clock is the start of
+        ## the current lap
+        profile = self.profiler
+        if profile:
+            profile.begin_frame()
+            start = clock = time()
+
+        ## text and the batched grobs only need testing for once their
+        ## modules are loaded
+        text      = loadedType("pypaint.text", "text")
+        markers   = loadedType("pypaint.batch", "markers")
+        polylines = loadedType("pypaint.batch", "polylines")
+
+        records = []
         for item in stack:
-            transform = item.transform
-            data = item.data
-            if last_transform != transform.affine:
-                self.AGG_canvas.settransform(transform)
-                last_transform = transform.affine
-
-            if path.type == 'path':
-                """
-                n_path = aggdraw.Path()
-                for element in data:
-                    cmd    = element[0]
-                    values = element[1:]
-                    
-                    if cmd == 'moveto':
-                        n_path.moveto(*values)
-                    elif cmd == 'lineto':
-                        n_path.lineto(*values)
-                    elif cmd == 'curveto':
-                        n_path.curveto(*values)
-                    elif cmd == CURVE3TO:
-                        n_path.curve3to(*values)
-                    elif cmd == CURVE4TO:
-                        n_path.curve4to(*values)
-                    elif cmd == RLINETO:
-                        n_path.rlineto(*values)
-                    elif cmd == RCURVETO:
-                        n_path.rcurveto(*values)
-                    elif cmd == ARC:
-                        n_path.curveto(*values)
-                    elif cmd == CLOSE:
-                        n_path.close()
-                    elif cmd == ELLIPSE:
-                        x, y, w, h = values
-                        k = 0.5522847498    
-                        n_path.moveto(x, y+h/2)
-                        n_path.curveto(x, y+(1-k)*h/2, x+(1-k)*w/2, y, x+w/2, y)
-                        n_path.curveto(x+(1+k)*w/2, y, x+w, y+(1-k)*h/2, x+w, y+h/2)
-                        n_path.curveto(x+w, y+(1+k)*h/2, x+(1+k)*w/2, y+h,x+w/2, y+h)
-                        n_path.curveto(x+(1-k)*w/2, y+h, x, y+(1+k)*h/2, x, y+h/2)
-                        n_path.close()
-
-                    else:
-                        raise Exception("PathElement(): error parsing path element command (got '%s')" % cmd)
-                """
-                arguments = self.buildPenBrush(item, templateArgs=item.path)
-                self.AGG_canvas.path(*arguments)
-
-                if not self.gtk_draw:
-                    self.AGG_canvas.flush()
-
-            elif isinstance(item, text):
-                (R, G, B, A)= item.fill_color
-                R = int(R/1.0*255)
-                G = int(G/1.0*255)
-                B = int(B/1.0*255)
-
-                font = Font((R, G, B), item.font_file, item.font_size)
-
-                self.AGG_canvas.settransform(item.transform)
-                self.AGG_canvas.text((item.X, item.Y), item.Text, font)
+            if isinstance(item, text):
+                self.drawpaths(records)
+                records = []
+                if profile:
+                    item_start = clock = time()
+
+                affine = item.transform.affine
+                if scale:
+                    affine = tuple([v * scale for v in affine])
+                if profile:
+                    clock = profile.lap('transform', clock)
+
+                if not self.drawmasks(item, affine):
+                    font = self.styles.font(item.fill_color, item.font_file, item.font_size)
+                    if profile:
+                        clock = profile.lap('style', clock)
+
+                    self.AGG_canvas.settransform(affine)
+                    self.AGG_canvas.text((item.X, item.Y), item.Text, font)
+                if profile:
+                    clock = profile.lap('rasterize', clock)
+                    profile.add('text', clock - item_start)
+                    profile.count('text')
+
+            elif isinstance(item, (path, markers)):
+                if profile:
+                    item_start = clock = time()
+
+                affine = item.transform.affine
+                if scale:
+                    affine = tuple([v * scale for v in affine])
+                if profile:
+                    clock = profile.lap('transform', clock)
+
+                if self.cull:
+                    strokewidth = item._strokecolor and item._strokewidth
+                    if offscreen(item.path.bounds(), affine, size, strokewidth):
+                        self.culled += 1
+                        if profile:
+                            profile.count('culled')
+                        continue
+
+                pen, brush = self.penBrush(item)
+                records.append((item.path, affine, pen, brush))
+                if profile:
+                    clock = profile.lap('style', clock)
+                    profile.add('path', clock - item_start)
+                    profile.count('path')
+
+            elif isinstance(item, polylines):
+                if profile:
+                    item_start = clock = time()
+
+                ## a path for each color of the batch
+                affine = item.transform.affine
+                if scale:
+                    affine = tuple([v * scale for v in affine])
+                if profile:
+                    clock = profile.lap('transform', clock)
+
+                paths = item.paths()
+                if profile:
+                    clock = profile.lap('compile', clock)
+
+                for (n_path, fillcolor, strokecolor) in paths:
+                    if self.cull:
+                        strokewidth = strokecolor and item._strokewidth
+                        if offscreen(n_path.bounds(), affine, size, strokewidth):
+                            self.culled += 1
+                            if profile:
+                                profile.count('culled')
+                            continue
+
+                    pen = brush = None
+                    if fillcolor:
+                        brush = self.styles.brush(fillcolor)
+                    if strokecolor:
+                        pen = self.styles.pen(strokecolor, item._strokewidth)
+                    records.append((n_path, affine, pen, brush))
+                    if profile:
+                        profile.count('path')
+
+                if profile:
+                    clock = profile.lap('style', clock)
+                    profile.add('path', clock - item_start)
+
+        self.drawpaths(records)
+
+        if not self.gtk_draw:
+            if profile:
+                clock = time()
+            self.AGG_canvas.flush()
+            if profile:
+                profile.lap('flush', clock)
+
+        if profile:
+            profile.lap('draw', start)
+
+    def drawmasks(self, item, affine):
+        ## blends text from the glyph atlas; returns False when it has to
+        ## be drawn with Draw.text(): transformed text, or no ft2
+        if not self.glyph_masks or tuple(affine[:4]) != (1, 0, 0, 1):
+            return False
+        if self.atlas is None:
+            try:
+                from pypaint import ft2
+            except ImportError:
+                self.glyph_masks = False
+                return False
+            from pypaint.interfaces.PIL.atlas import GlyphAtlas
+            self.atlas = GlyphAtlas()
+
+        boxes = self.atlas.layout(item.font_file, item.font_size, item.Text,
+                                  item.X + affine[4], item.Y + affine[5])
+        if boxes is None:
+            return False
+        if boxes:
+            self.AGG_canvas.masks(self.atlas.data, self.atlas.width, boxes,
+                                  self.styles.brush(item.fill_color))
+        return True
+
+    def draw_tiled(self, stack=None, tile=None, workers=None, threads=False):
+        '''
+        Renders the display list tile by tile in a pool of workers and
+        returns the result as an RGBA PIL image. The surface this canvas
+        draws on is not touched. tile is the tile size, tiles.DEFAULT_TILE
+        by default.
+        '''
+        from pypaint.interfaces.PIL import tiles
+        if stack is None:
+            stack = self.data
+        if tile is None:
+            tile = tiles.DEFAULT_TILE
+
+        text      = loadedType("pypaint.text", "text")
+        markers   = loadedType("pypaint.batch", "markers")
+        polylines = loadedType("pypaint.batch", "polylines")
+
+        recorder = tiles.TileRecorder()
+        records  = []
+        extents  = []
+        for item in stack:
+            if isinstance(item, text):
+                recorded = [recorder.text(item, item.transform.affine)]
+            elif isinstance(item, (path, markers)):
+                recorded = [recorder.path(item, item.transform.affine)]
+            elif isinstance(item, polylines):
+                recorded = recorder.polylines(item, item.transform.affine)
+            else:
+                continue
+            for (record, extent) in recorded:
+                records.append(record)
+                extents.append(extent)
+
+        from PIL import Image
+
+        size = (self.width, self.height)
+        data = tiles.render(size, records, extents, self.background, self.antialias,
+                            tile=tile, workers=workers, threads=threads,
+                            glyph_masks=self.glyph_masks)
+        return Image.fromstring("RGBA", size, data)
+
+    def drawpaths(self, records):
+        if not records:
+            return
+
+        profile = self.profiler
+        if profile:
+            start = time()
+
+        if self.batch_paths:
+            self.AGG_canvas.paths(records)
+            if profile:
+                profile.lap('rasterize', start)
+            return
+
+        ## older aggdraw builds, one call per path
+        last_transform = None
+        for (n_path, affine, pen, brush) in records:
+            if last_transform != affine:
+                self.AGG_canvas.settransform(affine)
+                last_transform = affine
+
+            arguments = [n_path]
+            if pen:
+                arguments.append(pen)
+            if brush:
+                arguments.append(brush)
+            self.AGG_canvas.path(*arguments)
+
+        if profile:
+            profile.lap('rasterize', start)
 
     def decToRgba(self, RGBA):
         R = int(RGBA.r * 255)
@@ -116,36 +322,34 @@ class PILCanvas(CanvasMixin):
         A = int(RGBA.a * 255)
         return (R, G, B, A)
 
-    def buildPenBrush(self, path, templateArgs=None):
-        if templateArgs:
-            PathArgs      = [templateArgs]
-        else:
-            PathArgs      = []
-
-        PenArguments  = []
-        PenDict       = {}
+    def penBrush(self, path):
+        pen   = None
         brush = None
 
         fillcolor = path._fillcolor
         strokecolor = path._strokecolor
         if fillcolor:
-            (R, G, B, A) = self.decToRgba(fillcolor)
-            color = (R, G, B)
-            brush = aggdraw.Brush(color, opacity=A)
+            brush = self.styles.brush(fillcolor)
 
         if strokecolor:
-            (R, G, B, A) = self.decToRgba(strokecolor)
-            PenDict["color"]   = (R, G, B)
-            PenDict["opacity"] = A
-        
-        PenDict["width"] = path._strokewidth
+            pen = self.styles.pen(strokecolor, path._strokewidth)
+
+        return pen, brush
 
-        if PenDict.has_key("color"):
-            PathArgs.append(aggdraw.Pen(**PenDict))
+    def cache_stats(self):
+        return self.styles.stats()
+
+    def buildPenBrush(self, path, templateArgs=None):
+        if templateArgs:
+            PathArgs      = [templateArgs]
+        else:
+            PathArgs      = []
+
+        pen, brush = self.penBrush(path)
+        if pen:
+            PathArgs.append(pen)
         if brush:
             PathArgs.append(brush)
-        
+
         arguments = tuple(PathArgs)
         return arguments
-
-
@@ -95,7 +95,7 @@ class Color(object):
             self.red, self.green, self.blue, self.alpha)
 
     def copy(self):
-        return tuple(self.data)
+        return Color(self)
         
     def _update_rgb(self, r, g, b):
         self.__dict__["__r"] = r
@@ -0,0 +1,59 @@
+from operator import itemgetter
+
+class DisplayList:
+    '''
+    Retained, priority ordered list of grobs.
+
+    Grobs are stored as (priority, grob) pairs in a plain list and put in
+    order with a stable sort the first time the list is read after an
+    out-of-order add, so grobs of equal priority keep the order they were
+    added in. Lower priorities are drawn first.
+
+    Unlike a queue, iterating does not consume the list: a scene can be
+    drawn any number of times until clear() is called.
+    '''
+    def __init__(self):
+        self.items   = []
+        self._sorted = True
+
+    def add(self, grob, priority=3):
+        items = self.items
+        if items and priority < items[-1][0]:
+            self._sorted = False
+        items.append((priority, grob))
+
+    append = add
+
+    def extend(self, grobs, priority=3):
+        for grob in grobs:
+            self.add(grob, priority)
+
+    def remove(self, grob):
+        for i, (priority, item) in enumerate(self.items):
+            if item is grob:
+                del self.items[i]
+                return
+        raise ValueError("DisplayList.remove(): %s is not in the list" % (grob,))
+
+    def sort(self):
+        if not self._sorted:
+            self.items.sort(key=itemgetter(0))
+            self._sorted = True
+
+    def __iter__(self):
+        self.sort()
+        for priority, grob in self.items:
+            yield grob
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        self.sort()
+        return self.items[index][1]
+
+    def clear(self):
+        ## keeps the list object, so a canvas reused across frames does
+        ## not reallocate it
+        del self.items[:]
+        self._sorted = True
@@ -1,8 +1,9 @@
 from pypaint.utils.defaults      import *
 from pypaint.types.transform     import Transform
 from pypaint.types.color         import Color
+from pypaint.types.displaylist   import DisplayList
 
-import Queue
+from math                        import pi
 
 _STATE_NAMES = {
     '_outputmode':    'outputmode',
@@ -115,7 +116,9 @@ class TransformMixin(object):
         self._transform = Transform()
 
     def rotate(self, degrees=0, radians=0):
-        self._transform.rotate(-degrees,-radians)
+        if not radians:
+            radians = degrees * pi / 180.0
+        self._transform.rotate(-radians)
 
     def translate(self, x=0, y=0):
         self._transform.translate(x,y)
@@ -124,7 +127,8 @@ class TransformMixin(object):
         self._transform.scale(x,y)
 
     def skew(self, x=0, y=0):
-        self._transform.skew(x,y)
+        ## in degrees, as NodeBox's skew()
+        self._transform.skew(x * pi / 180.0, y * pi / 180.0)
         
 class ColorMixin(object):
     """Mixin class for color support.
@@ -176,20 +180,18 @@ class CanvasMixin:
         self.width  = width
         self.height = height
 
-        self.grobstack = []
         self.font_size = 12
 
-        self.clear()
-        self.grobStack = Queue.PriorityQueue()
+        self.displaylist = DisplayList()
 
     def add(self, grob, priority=3):
         if not isinstance(grob, Grob):
-            raise ("Canvas.add() - wrong argument: expecting a Grob, received %s") % (grob)
+            raise Exception("Canvas.add() - wrong argument: expecting a Grob, received %s" % (grob))
 
-        self.grobStack.put((priority, grob))
+        self.displaylist.add(grob, priority)
 
     def append(self, grob):
-        self.add(self, grob)
+        self.add(grob)
 
     def setsurface(self):
         pass
@@ -205,9 +207,6 @@ class CanvasMixin:
 
     size = property(_get_size)
 
-    def append(self, el):
-        self._container.append(el)
-
     def draw(self, ctx=None):
         pass
 
@@ -215,4 +214,4 @@ class CanvasMixin:
         pass
 
     def clear(self):
-        self.grobStack = Queue.PriorityQueue()
+        self.displaylist.clear()
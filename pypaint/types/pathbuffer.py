@@ -0,0 +1,355 @@
+from pypaint.utils.defaults import *
+from pypaint.geometry.bezier import calculateCubicExtrema, calculateQuadraticExtrema
+
+from array import array
+from math  import *
+
+import numpy
+
+## opcodes, as stored in PathBuffer.opcodes and read by aggdraw's Path.extend()
+OP_MOVETO   = 0
+OP_LINETO   = 1
+OP_CURVE3TO = 2
+OP_CURVETO  = 3
+OP_CLOSE    = 4
+
+## coordinates consumed by each opcode
+OP_SIZES = (2, 2, 4, 6, 0)
+
+OP_COMMANDS = (MOVETO, LINETO, CURVE3TO, CURVETO, CLOSE)
+
+## magic number for a quarter ellipse made of a single cubic
+KAPPA = 0.5522847498
+
+class PathBuffer:
+    '''
+    Compact storage for path geometry: one opcode byte per element in an
+    array('B') and the element coordinates packed in an array('d').
+
+    Relative commands, ellipses and arcs are normalized to absolute
+    moveto/lineto/curve3to/curveto/close while appending, so every
+    element is described by its opcode alone. Both arrays grow amortized
+    in place.
+
+    Elements can still be read one by one, as PathElementView objects
+    that index into the buffers, so code written against a list of
+    PathElements keeps working.
+
+    Note that views returned by coords_view() share memory with the
+    coordinate array: use them right away, appending may reallocate it.
+    '''
+    def __init__(self, elements=None):
+        self.opcodes = array('B')
+        self.coords  = array('d')
+        ## start of each element's coordinates, for random access
+        self.offsets = array('I')
+
+        ## current point and start of the current subpath
+        self._x,  self._y  = 0.0, 0.0
+        self._sx, self._sy = 0.0, 0.0
+
+        if elements is not None:
+            for element in elements:
+                self.append(element)
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.opcodes)
+        if not 0 <= index < len(self.opcodes):
+            raise IndexError("PathBuffer index out of range")
+        return PathElementView(self, index)
+
+    def __iter__(self):
+        for index in xrange(len(self.opcodes)):
+            yield PathElementView(self, index)
+
+    def _get_nbytes(self):
+        '''
+        Bytes held by the element buffers.
+        '''
+        return sum([a.itemsize * len(a) for a in (self.opcodes, self.coords, self.offsets)])
+    nbytes = property(_get_nbytes)
+
+    def _push(self, opcode, *values):
+        self.offsets.append(len(self.coords))
+        self.opcodes.append(opcode)
+        self.coords.extend(values)
+
+    ### Path methods ###
+    def moveto(self, x, y):
+        self._push(OP_MOVETO, x, y)
+        self._x, self._y = self._sx, self._sy = x, y
+
+    def lineto(self, x, y):
+        self._push(OP_LINETO, x, y)
+        self._x, self._y = x, y
+
+    def curveto(self, c1x, c1y, c2x, c2y, x, y):
+        self._push(OP_CURVETO, c1x, c1y, c2x, c2y, x, y)
+        self._x, self._y = x, y
+
+    curve4to = curveto
+
+    def curve3to(self, cx, cy, x, y):
+        self._push(OP_CURVE3TO, cx, cy, x, y)
+        self._x, self._y = x, y
+
+    def relmoveto(self, x, y):
+        self.moveto(self._x + x, self._y + y)
+
+    def rellineto(self, x, y):
+        self.lineto(self._x + x, self._y + y)
+
+    def relcurveto(self, c1x, c1y, c2x, c2y, x, y):
+        X, Y = self._x, self._y
+        self.curveto(X + c1x, Y + c1y, X + c2x, Y + c2y, X + x, Y + y)
+
+    def closepath(self):
+        self._push(OP_CLOSE)
+        self._x, self._y = self._sx, self._sy
+
+    def ellipse(self, x, y, w, h):
+        k = KAPPA
+        self.moveto(x, y+h/2.0)
+        self.curveto(x, y+(1-k)*h/2, x+(1-k)*w/2, y, x+w/2.0, y)
+        self.curveto(x+(1+k)*w/2, y, x+w, y+(1-k)*h/2, x+w, y+h/2.0)
+        self.curveto(x+w, y+(1+k)*h/2, x+(1+k)*w/2, y+h, x+w/2.0, y+h)
+        self.curveto(x+(1-k)*w/2, y+h, x, y+(1+k)*h/2, x, y+h/2.0)
+        self.closepath()
+
+    def arc(self, x, y, radius, angle1, angle2):
+        '''
+        Appends a circular arc around (x, y) from angle1 to angle2, in
+        degrees, as cubic segments of at most 90 degrees. The arc is
+        connected to the current point with a line, if there is one.
+        '''
+        a1 = radians(angle1)
+        a2 = radians(angle2)
+
+        segments = max(1, int(ceil(abs(a2 - a1) / (pi / 2))))
+        step = (a2 - a1) / segments
+        k = 4.0 / 3.0 * tan(step / 4.0)
+
+        X, Y = x + radius * cos(a1), y + radius * sin(a1)
+        if len(self.opcodes):
+            self.lineto(X, Y)
+        else:
+            self.moveto(X, Y)
+
+        a = a1
+        for i in xrange(segments):
+            b = a + step
+            ca, sa, cb, sb = cos(a), sin(a), cos(b), sin(b)
+            self.curveto(x + radius * (ca - k * sa), y + radius * (sa + k * ca),
+                         x + radius * (cb + k * sb), y + radius * (sb - k * cb),
+                         x + radius * cb,            y + radius * sb)
+            a = b
+
+    def add(self, cmd, *values):
+        '''
+        Appends an element given as a command constant and its values.
+        '''
+        if   cmd == MOVETO:   self.moveto(*values)
+        elif cmd == LINETO:   self.lineto(*values)
+        elif cmd == CURVETO:  self.curveto(*values)
+        elif cmd == CURVE4TO: self.curveto(*values)
+        elif cmd == CURVE3TO: self.curve3to(*values)
+        elif cmd == RMOVETO:  self.relmoveto(*values)
+        elif cmd == RLINETO:  self.rellineto(*values)
+        elif cmd == RCURVETO: self.relcurveto(*values)
+        elif cmd == ARC:      self.arc(*values)
+        elif cmd == ELLIPSE:  self.ellipse(*values)
+        elif cmd == CLOSE:    self.closepath()
+        else:
+            raise Exception("PathBuffer(): unknown path command '%s'" % (cmd,))
+
+    def append(self, element):
+        self.add(element.cmd, *element.values)
+
+    def extend(self, elements):
+        for element in elements:
+            self.append(element)
+
+    ### Vectorized operations ###
+    def coords_view(self):
+        '''
+        Returns the coordinates as an (n, 2) numpy array sharing memory
+        with the buffer.
+        '''
+        if not len(self.coords):
+            return numpy.zeros((0, 2))
+        return numpy.frombuffer(self.coords, dtype=numpy.float64).reshape(-1, 2)
+
+    def bounds(self):
+        '''
+        Returns the exact (min_x, min_y, max_x, max_y) of the geometry:
+        anchors, plus the x and y extrema of every curve segment. Control
+        points that lie outside the curve are not included.
+        '''
+        count = len(self.opcodes)
+        if not len(self.coords):
+            return (0, 0, 0, 0)
+
+        ops     = numpy.frombuffer(self.opcodes, dtype=numpy.uint8)
+        offsets = numpy.frombuffer(self.offsets, dtype=numpy.uint32).astype(numpy.intp)
+        coords  = numpy.frombuffer(self.coords,  dtype=numpy.float64)
+
+        ## current point after each element: the last coordinate pair,
+        ## or for close the start of the subpath (the last moveto)
+        index  = numpy.arange(count)
+        moveto = numpy.maximum.accumulate(numpy.where(ops == OP_MOVETO, index, 0))
+        sizes  = numpy.array(OP_SIZES)[ops]
+
+        closed = ops == OP_CLOSE
+        end = numpy.where(closed, offsets[moveto], offsets + sizes - 2)
+        end = numpy.minimum(end, len(coords) - 2)
+        current = numpy.column_stack((coords[end], coords[end+1]))
+
+        points = [current[~closed]]
+
+        ## each segment starts at the current point of the previous element
+        start = numpy.vstack((current[:1], current[:-1]))
+
+        cubic = numpy.nonzero(ops == OP_CURVETO)[0]
+        if len(cubic):
+            off = offsets[cubic]
+            points.append(calculateCubicExtrema(start[cubic],
+                numpy.column_stack((coords[off],   coords[off+1])),
+                numpy.column_stack((coords[off+2], coords[off+3])),
+                numpy.column_stack((coords[off+4], coords[off+5]))))
+
+        quadratic = numpy.nonzero(ops == OP_CURVE3TO)[0]
+        if len(quadratic):
+            off = offsets[quadratic]
+            points.append(calculateQuadraticExtrema(start[quadratic],
+                numpy.column_stack((coords[off],   coords[off+1])),
+                numpy.column_stack((coords[off+2], coords[off+3]))))
+
+        points = numpy.concatenate(points)
+        (min_x, min_y) = points.min(axis=0)
+        (max_x, max_y) = points.max(axis=0)
+        return (float(min_x), float(min_y), float(max_x), float(max_y))
+
+    def transform(self, matrix):
+        '''
+        Returns a new buffer with every point mapped through the affine
+        matrix (a, b, c, d, e, f), with x' = a*x + c*y + e and
+        y' = b*x + d*y + f.
+        '''
+        (a, b, c, d, e, f) = matrix
+        points = self.coords_view()
+
+        result = numpy.empty_like(points)
+        result[:, 0] = a * points[:, 0] + c * points[:, 1] + e
+        result[:, 1] = b * points[:, 0] + d * points[:, 1] + f
+
+        other = self.copy()
+        other.coords = array('d', result.tostring())
+
+        ## later relative commands continue from the transformed current point
+        (other._x,  other._y)  = (a*self._x  + c*self._y  + e, b*self._x  + d*self._y  + f)
+        (other._sx, other._sy) = (a*self._sx + c*self._sy + e, b*self._sx + d*self._sy + f)
+        return other
+
+    def extend_buffer(self, other, matrix=None):
+        '''
+        Appends the elements of another buffer, with every point mapped
+        through the affine matrix (a, b, c, d, e, f) if one is given.
+        Works on the arrays directly, so no element objects are made;
+        meant for many small buffers, such as glyph outlines.
+        '''
+        base = len(self.coords)
+        self.opcodes.extend(other.opcodes)
+        self.offsets.extend(array('I', [offset + base for offset in other.offsets]))
+
+        if matrix is None:
+            self.coords.extend(other.coords)
+            (self._x,  self._y)  = (other._x,  other._y)
+            (self._sx, self._sy) = (other._sx, other._sy)
+            return
+
+        (a, b, c, d, e, f) = matrix
+        coords = other.coords
+        xs, ys = coords[0::2], coords[1::2]
+        points = array('d', coords)
+        points[0::2] = array('d', [a*x + c*y + e for (x, y) in zip(xs, ys)])
+        points[1::2] = array('d', [b*x + d*y + f for (x, y) in zip(xs, ys)])
+        self.coords.extend(points)
+
+        (self._x,  self._y)  = (a*other._x  + c*other._y  + e, b*other._x  + d*other._y  + f)
+        (self._sx, self._sy) = (a*other._sx + c*other._sy + e, b*other._sx + d*other._sy + f)
+
+    def copy(self):
+        other = PathBuffer()
+        other.opcodes = array('B', self.opcodes)
+        other.offsets = array('I', self.offsets)
+        other.coords  = array('d', self.coords)
+        other._x,  other._y  = self._x, self._y
+        other._sx, other._sy = self._sx, self._sy
+        return other
+
+    def compile(self, path):
+        '''
+        Appends the buffer to a native aggdraw Path. Uses Path.extend(),
+        which reads both arrays in one call, when aggdraw provides it.
+        '''
+        if hasattr(path, 'extend'):
+            path.extend(self.opcodes, self.coords)
+            return path
+
+        coords = self.coords
+        for index, opcode in enumerate(self.opcodes):
+            offset = self.offsets[index]
+            values = coords[offset:offset+OP_SIZES[opcode]]
+            if opcode == OP_MOVETO:
+                path.moveto(*values)
+            elif opcode == OP_LINETO:
+                path.lineto(*values)
+            elif opcode == OP_CURVE3TO:
+                path.curve3to(*values)
+            elif opcode == OP_CURVETO:
+                path.curveto(*values)
+            elif opcode == OP_CLOSE:
+                path.close()
+        return path
+
+class PathElementView(object):
+    '''
+    A PathElement-alike reading element index of a PathBuffer.
+    '''
+    __slots__ = ('buffer', 'index')
+
+    def __init__(self, buffer, index):
+        self.buffer = buffer
+        self.index  = index
+
+    def _get_cmd(self):
+        return OP_COMMANDS[self.buffer.opcodes[self.index]]
+    cmd = property(_get_cmd)
+
+    def _get_values(self):
+        buffer = self.buffer
+        offset = buffer.offsets[self.index]
+        size   = OP_SIZES[buffer.opcodes[self.index]]
+        return tuple(buffer.coords[offset:offset+size])
+    values = property(_get_values)
+
+    def getXY(self):
+        return self.values
+    XY = property(getXY)
+
+    def __getitem__(self, index):
+        return ((self.cmd,) + self.values)[index]
+
+    def __repr__(self):
+        return "PathElement" + str((self.cmd,) + self.values)
+
+    def __eq__(self, other):
+        if other is None: return False
+        return self.cmd == other.cmd and tuple(self.values) == tuple(other.values)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
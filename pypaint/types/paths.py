@@ -1,6 +1,7 @@
 from pypaint.types.mixins           import *
 from pypaint.geometry.bezier        import *
 from pypaint.interfaces.PIL.path    import PathWrap
+from pypaint.types.pathbuffer       import PathBuffer
 
 import collections
 
@@ -8,7 +9,7 @@ class BezierPath(Grob, TransformMixin, ColorMixin):
     stateAttributes = ('_fillcolor', '_strokecolor', '_strokewidth', '_transform', '_transformmode')
     kwargs = ('fill', 'stroke', 'strokewidth')
     
-    def __init__(self, ctx, path=None, **kwargs):
+    def __init__(self, ctx, path=None, compact=False, **kwargs):
         self._ctx = ctx
         
         super(BezierPath, self).__init__(ctx)
@@ -23,17 +24,34 @@ class BezierPath(Grob, TransformMixin, ColorMixin):
         else:
             self._path = path
        
+        ## _version is bumped on every mutation, so backends can tell
+        ## whether a native path they compiled earlier is still current
+        self._version = 0
+        self._native = None
+        self._native_version = None
+        self._bounds = None
+        self._bounds_version = None
+
+        ## compact paths keep their elements in a PathBuffer instead of
+        ## a list of PathElements
+        self.compact = compact
+
         if path is None:
-            self.data = []
+            self.data = self._newdata()
         
         elif isinstance(path, (tuple,list)):
             ## list of path elements
-            self.data = []
+            self.data = self._newdata()
             for element in path:
                 self.append(element)
 
         elif isinstance(path, BezierPath):
-            self.data = path.data
+            if compact and path.compact:
+                self.data = path.data.copy()
+            else:
+                self.data = self._newdata()
+                for element in path.data:
+                    self.append(element)
             copy_attrs(path, self, self.stateAttributes)
 
         else:
@@ -41,6 +59,38 @@ class BezierPath(Grob, TransformMixin, ColorMixin):
 
         self.closed = False
 
+    def _get_data(self):
+        return self._data
+    def _set_data(self, data):
+        self._data = data
+        self._version += 1
+    data = property(_get_data, _set_data)
+
+    def _get_version(self):
+        '''
+        Changes whenever the path's elements change. Elements should be
+        added through the path methods; appending to data directly is
+        only caught when it changes the element count.
+        '''
+        return (self._version, len(self._data))
+    version = property(_get_version)
+
+    def _newdata(self):
+        if self.compact:
+            return PathBuffer()
+        return []
+
+    def append(self, element):
+        self._data.append(element)
+        self._version += 1
+
+    def _add(self, cmd, *values):
+        if self.compact:
+            self._data.add(cmd, *values)
+        else:
+            self._data.append(PathElement(cmd, *values))
+        self._version += 1
+
 
     def __getitem__(self, index):
         return self.data[index]
@@ -53,7 +103,7 @@ class BezierPath(Grob, TransformMixin, ColorMixin):
         return len(self.data)
 
     def copy(self):
-        p = self.__class__(self._ctx, self)
+        p = self.__class__(self._ctx, self, compact=self.compact)
         copy_attrs(self._ctx, p, self.stateAttributes)
         return p
 
@@ -61,39 +111,39 @@ class BezierPath(Grob, TransformMixin, ColorMixin):
 
     ### Path methods ###
     def moveto(self, x, y):
-        self.data.append(PathElement(MOVETO, x, y))
+        self._add(MOVETO, x, y)
 
     def lineto(self, x, y):
-        self.data.append(PathElement(LINETO, x, y))
+        self._add(LINETO, x, y)
 
     def curveto(self, c1x, c1y, c2x, c2y, x, y):
-        self.data.append(PathElement(CURVETO, c1x, c1y, c2x, c2y, x, y))
+        self._add(CURVETO, c1x, c1y, c2x, c2y, x, y)
 
     def curve3to(self, c1x, c1y, x, y):
-        self.data.append(PathElement(CURVE3TO, c1x, c1y, x, y))
+        self._add(CURVE3TO, c1x, c1y, x, y)
 
     def curve4to(self, c1x, c1y, c2x, c2y, x, y):
-        self.data.append(PathElement(CURVE4TO, c1x, c1y, c2x, c2y, x, y))
+        self._add(CURVE4TO, c1x, c1y, c2x, c2y, x, y)
 
 
     def relmoveto(self, x, y):
-        self.data.append(PathElement(RMOVETO, x, y))
+        self._add(RMOVETO, x, y)
 
     def rellineto(self, x, y):
-        self.data.append(PathElement(RLINETO, x, y))
+        self._add(RLINETO, x, y)
 
     def relcurveto(self, c1x, c1y, c2x, c2y, x, y):
-        self.data.append(PathElement(RCURVETO, c1x, c1y, c2x, c2y, x, y))
+        self._add(RCURVETO, c1x, c1y, c2x, c2y, x, y)
 
     def arc(self, x, y, radius, angle1, angle2):
-        self.data.append(PathElement(ARC, x, y, radius, angle1, angle2))
+        self._add(ARC, x, y, radius, angle1, angle2)
 
     def closepath(self):
-        self.data.append(PathElement(CLOSE))
+        self._add(CLOSE)
         self.closed = True
 
     def ellipse(self,x,y,w,h):
-        self.data.append(PathElement(ELLIPSE, x, y, w, h))
+        self._add(ELLIPSE, x, y, w, h)
         self.closepath()
 
     def rect(self, x, y, w, h):
@@ -111,88 +161,38 @@ class BezierPath(Grob, TransformMixin, ColorMixin):
         self.moveto(x1, y1)
         self.lineto(x2, y2)
 
+    def extend_buffer(self, buffer, matrix=None):
+        '''
+        Appends the elements of a PathBuffer, mapped through the affine
+        matrix if one is given; see PathBuffer.extend_buffer().
+        '''
+        if self.compact:
+            self._data.extend_buffer(buffer, matrix)
+        else:
+            if matrix is not None:
+                moved = PathBuffer()
+                moved.extend_buffer(buffer, matrix)
+                buffer = moved
+            for element in buffer:
+                self._data.append(PathElement(element.cmd, *element.values))
+        self._version += 1
+
     def _get_bounds(self):
         '''
         Returns the path's bounding box. Note that this doesn't
         take transforms into account.
-        '''
-
-        X, Y  = 0, 0
-
-        X_set = []
-        Y_set = []
-
-        for element in self.data:
-            cmd    = element[0]
-            values = element[1:]
-
-            if cmd == MOVETO:
-                X = values[0]
-                Y = values[1]
-
-            elif cmd == LINETO:
-                X1, Y1 = values
-
-                X_set.append(X)
-                Y_set.append(Y)
-                X_set.append(X1)
-                Y_set.append(Y1)
 
-            elif cmd == CURVETO:
-                X1, Y1, X2, Y2, X3, Y3 = values
-
-                X_set.append(X)
-                Y_set.append(Y)
-                X_set.append(X1)
-                Y_set.append(Y1)
-                X_set.append(X2)
-                Y_set.append(Y2)
-                X_set.append(X3)
-                Y_set.append(Y3)
-
-
-            elif cmd == RLINETO:
-                X1, Y1 = values
-                X_set.append(X)
-                Y_set.append(Y)
-                X_set.append(X+X1)
-                Y_set.append(Y+Y1)
-
-
-            elif cmd == RCURVETO:
-                X1, Y1, X2, Y2, X3, Y3 = values
-
-                #calculateQuadraticBounds((X1, Y1), (X2, Y2), (X3, Y3))
-
-                X_set.append(X)
-                Y_set.append(Y)
-                X_set.append(X+X1)
-                Y_set.append(Y+Y1)
-                X_set.append(X+X2)
-                Y_set.append(Y+Y2)
-                X_set.append(X+X3)
-                Y_set.append(Y+Y3)
-
-            elif cmd == ELLIPSE:
-                X, Y, W, H = values
-                X_set.append(X)
-                Y_set.append(Y)
-                X_set.append(W)
-                Y_set.append(H)
-
-        
-        if len(X_set) and len(Y_set):
-            max_X = max(X_set)
-            max_Y = max(Y_set)
-
-            min_X = min(X_set)
-            min_Y = min(Y_set)
-
-            #print (min_X, min_Y, max_X, max_Y)
-            return (min_X, min_Y, max_X, max_Y)
-        else:
-            return (0, 0, 0, 0)
-        
+        The box is exact for curves (their extrema, not their control
+        points) and is cached until the path changes.
+        '''
+        version = self.version
+        if self._bounds_version != version:
+            data = self._data
+            if not self.compact:
+                data = PathBuffer(data)
+            self._bounds = data.bounds()
+            self._bounds_version = version
+        return self._bounds
 
     bounds = property(_get_bounds)
 
@@ -341,6 +341,12 @@ class PathElement:
     def __ne__(self, other):
         return not self.__eq__(other)
     
+    def __getitem__(self, index):
+        '''
+        Elements also index like the tuple (cmd, value1, value2, ...).
+        '''
+        return ((self.cmd,) + tuple(self.values))[index]
+
     def getXY(self):
         return self.values
     XY = property(getXY)
@@ -2,12 +2,14 @@ from pypaint.utils.util          import *
 from pypaint.types.mixins        import *
 from pypaint.types.paths         import BezierPath
 from pypaint.types.paths         import PathElement
+from pypaint.types.pathbuffer    import PathBuffer
+from pypaint.utils.cache         import LRUCache
+from pypaint.utils               import fonts
 
 from pypaint.geometry.points     import Point_Set
 from pypaint.geometry.bezier     import *
 from pypaint.geometry.transform  import *
 from pypaint.geometry.array      import *
-from fontTools.ttLib          import TTFont
 from fontTools.pens.basePen   import BasePen
 
 import numpy
@@ -19,6 +21,72 @@ glyph_swap = {
     " ":"space",
 }
 
+## glyph outlines in font units, keyed on (font file, glyph name)
+glyph_outlines = LRUCache(4096)
+
+def decomposeContour(buffer, points, on_curve):
+    '''
+    Appends a closed TrueType contour to buffer. Two off-curve points in
+    a row have an implied on-curve point halfway between them.
+    '''
+    if 1 in on_curve:
+        ## start on an on-curve point
+        first = on_curve.index(1)
+        points   = points[first:] + points[:first]
+        on_curve = on_curve[first:] + on_curve[:first]
+    else:
+        (x0, y0), (x1, y1) = points[-1], points[0]
+        points   = [((x0 + x1) * 0.5, (y0 + y1) * 0.5)] + points
+        on_curve = [1] + on_curve
+
+    buffer.moveto(*points[0])
+    control = None
+    for (x, y), on in zip(points[1:], on_curve[1:]):
+        if on:
+            if control is None:
+                buffer.lineto(x, y)
+            else:
+                buffer.curve3to(control[0], control[1], x, y)
+                control = None
+        else:
+            if control is not None:
+                buffer.curve3to(control[0], control[1],
+                                (control[0] + x) * 0.5, (control[1] + y) * 0.5)
+            control = (x, y)
+    if control is not None:
+        buffer.curve3to(control[0], control[1], points[0][0], points[0][1])
+    buffer.closepath()
+
+def decomposeGlyph(font_handle, glyph_name):
+    '''
+    Returns the outline of a glyph as a PathBuffer in font units, y up,
+    with the glyph origin at (0, 0).
+    '''
+    buffer = PathBuffer()
+    glyph_table = font_handle['glyf']
+    glyph = glyph_table[glyph_name]
+    if not glyph.numberOfContours:
+        return buffer
+
+    coordinates, end_points, flags = glyph.getCoordinates(glyph_table)
+    points = [(float(x), float(y)) for (x, y) in coordinates]
+    flags  = [int(flag) & 1 for flag in flags]
+
+    start = 0
+    for end in end_points:
+        end = end + 1
+        decomposeContour(buffer, points[start:end], flags[start:end])
+        start = end
+    return buffer
+
+def glyphOutline(font_file, glyph_name):
+    '''
+    Returns the cached outline of a glyph; see decomposeGlyph. The
+    buffer is shared, so it must not be changed.
+    '''
+    return glyph_outlines.get((font_file, glyph_name),
+                              lambda: decomposeGlyph(fonts.handle(font_file), glyph_name))
+
 class Text(Grob, TransformMixin, ColorMixin):
     stateAttributes = ('_transform', '_transformmode', '_fillcolor', '_fontfile', '_fontsize', '_align', '_lineheight')
     
@@ -143,7 +211,7 @@ class Text(Grob, TransformMixin, ColorMixin):
         if context:
             copy_attrs(self._ctx, self, self.stateAttributes)
 
-        self.font_handle = TTFont(self._fontfile)        
+        self.font_handle = fonts.handle(self._fontfile)
 
         self.x = x
         self.y = y
@@ -298,45 +366,6 @@ class Text(Grob, TransformMixin, ColorMixin):
         return (self.font_handle['OS/2'].fsSelection &1 or self.font_handle['head'].macStyle&2)
     italic = property(_get_italic)
 
-    def decomposeQuad(self, points):
-        n = len(points) - 1
-	assert n > 0
-	quadSegments = []
-	for i in range(n - 1):
-            x, y = points[i]
-            nx, ny = points[i+1]
-            impliedPt = (0.5 * (x + nx), 0.5 * (y + ny))
-            quadSegments.append((points[i], impliedPt))
-
-	quadSegments.append((points[-2], points[-1]))
-	return quadSegments
-
-    def _q_curveTo(self, *points):
-        n = len(points) - 1
-
-        if points[-1] is None:
-            x, y   = points[-2]  ## last off-curve point
-            nx, ny = points[0]   ## first off-curve point
-
-            impliedStartPoint = (0.5 * (x + nx), 0.5 * (y + ny))
-            impliedStartPoint = self.aux_transform.transformPoint(impliedStartPoint)
-            self.currentPoint = impliedStartPoint
-            self.path.moveto(impliedStartPoint)
-
-            points = points[:-1] + (impliedStartPoint,)
-
-        if n > 0:
-            for pt1, pt2 in self.decomposeQuad(points):
-                #self.path.moveto()
-                pt0 = self.aux_transform.transformPoint(pt1)
-                pt1 = self.aux_transform.transformPoint(pt2)
-                self.path.curve3to(pt0[0], pt0[1], pt1[0], pt1[1])
-                self.current_pt = (pt1[0], pt1[1])
-        else: 
-            (X, Y) = self.aux_transform.transformPoint((points[0][0], points[0][1]))
-            self.path.lineto(X, Y)
-            self.current_pt = (pt2[0], pt2[1])
-
     def glyph_width(self, glyph_name):
         try:
             return self.font_handle['hmtx'].metrics[glyph_name][0]*self.scale
@@ -380,92 +409,27 @@ class Text(Grob, TransformMixin, ColorMixin):
         #self.metrics[letter].update(glyph_set._ttFont.tables['hhea'].__dict__)
         #self.metrics[letter].update(glyph_set._ttFont.tables['head'].__dict__)
     
-    def decomposeOutline(self, glyph, letter, glyph_set, halign='center'):
-        hmtx = glyph_set._ttFont['hmtx']
-        width_, lsb = hmtx[letter]
-        rsb = width_ - lsb - (glyph.xMax - glyph.xMin)
-        extent = lsb + (glyph.xMax - glyph.xMin)
-        coordinates, end_points, flags = glyph.getCoordinates(self.glyph_table)
-        
-        offsetx_ = 0
-        idx = self.text.index(letter)
-        if idx+1 < len(self.text):
-            _letter = self.text[idx+1]
-            _glyph  = self.glyph_table[_letter]
-
-            next_width = ((hmtx[_letter][0] + hmtx[_letter][1]) * self.scale)*0.5
-            _offsetx = (glyph.xMin + next_width)
-
-        if halign=='center':
-            offsetx = (glyph.xMin + width_)
-        elif halign=='right': 
-            offsetx = glyph.xMin + width_
-        else: 
-            offsetx = glyph.xMin
-
-        offsetx = (offsetx + offsetx_) * self.scale
-
-
-        
-        idx = self.text.index(letter)
-        if idx+1 < len(self.text):
-            n_width = hmtx[self.text[idx+1]]
-        
-        self.aux_transform *= Transform(dx=offsetx)
-
-        if not coordinates.any():
-            return
-        
-        ## in the rare case that it doesnt have an xMin
-        if hasattr(glyph, "xMin"):
-            #offset = (lsb_*self.scale - glyph.xMin*self.scale)
-            offset = 0
-        else:
-            offset = 0
-
-        start = 0
-        for end in end_points:
-            end = end + 1
-            contour = coordinates[start:end].tolist()
-            contour_flags = flags[start:end].tolist()
-            start = end
-            
-            if 1 not in contour_flags:
-                contour.append(None)
-                self._q_curveTo(*contour)
-            else:
-                f_on_curve = contour_flags.index(1) + 1
-                contour    = contour[f_on_curve:] + contour[:f_on_curve]
-                contour_flags = contour_flags[f_on_curve:] + contour_flags[:f_on_curve]
-                
-                (X, Y) = self.aux_transform.transformPoint(contour[-1])
-                self.path.moveto(X, Y)
-                self.current_pt=(X, Y)
-
-                while contour:
-                    n_on_curve = contour_flags.index(1) + 1
-                    if n_on_curve == 1:
-                        (X, Y) = self.aux_transform.transformPoint(contour[0])
-                        self.path.lineto(X, Y)
-                        self.current_pt=(X, Y)
-                    else:
-                        self._q_curveTo(*contour[:n_on_curve])
-
-                    contour        = contour[n_on_curve:]
-                    contour_flags  = contour_flags[n_on_curve:]
-                
-            self.path.closepath()
-
-        self.aux_transform *= Transform(dx=(rsb*self.scale))
-
     def sentence(self):
+        '''
+        Appends the outline of the whole text to path and returns it.
+        '''
+        if self.path is None:
+            self.path = BezierPath(self._ctx, compact=True)
+        self.posX = 0
         for letter in self.text:
-            rendered = self.draw(letter)
-
+            self.draw(letter)
+        return self.path
 
     def draw(self, letter):
-        glyph_set   = self.font_handle.getGlyphSet()
-        self.glyph_table = glyph_set._ttFont['glyf']
-        #self.metrics[letter] = self.font_handle['hmtx'].metrics[letter]
-        glyph = self.glyph_table[letter]
-        self.decomposeOutline(glyph, letter, glyph_set)
+        '''
+        Appends the outline of letter at the pen position and moves the
+        pen past it. The outline is decomposed once per font and glyph;
+        after that this is an affine transform of the cached buffer.
+        '''
+        glyph_name = self.table.cmap.get(ord(letter), '.notdef')
+        outline = glyphOutline(self._fontfile, glyph_name)
+
+        ## font units are y up, the canvas is y down
+        matrix = (self.scale, 0, 0, -self.scale, self.x + self.posX, self.y)
+        self.path.extend_buffer(outline, matrix)
+        self.posX += self.glyph_width(glyph_name)
@@ -1,218 +1,186 @@
+from pypaint.utils.defaults import CENTER
+
 from math import *
-import numpy as np
-from numpy import array
 
 TRANSFORMS = ['translate', 'scale', 'rotate', 'skew', 'push', 'pop']
 
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+def multiply(m1, m2):
+    '''
+    Returns the product m1 * m2 of two affine matrices in aggdraw order
+    (a, b, c, d, e, f), where x' = a*x + c*y + e and y' = b*x + d*y + f.
+    The product maps a point through m2 first, then through m1.
+    '''
+    (a1, b1, c1, d1, e1, f1) = m1
+    (a2, b2, c2, d2, e2, f2) = m2
+    return (a1*a2 + c1*b2,
+            b1*a2 + d1*b2,
+            a1*c2 + c1*d2,
+            b1*c2 + d1*d2,
+            a1*e2 + c1*f2 + e1,
+            b1*e2 + d1*f2 + f1)
+
 class Matrix:
     matrix = None
 
     def __init__(self, matrix=None):
         if not matrix:
-            self.matrix = np.array([1.0, 0.0, 0.0, 1.0, 0.0, 0.0])
+            self.matrix = IDENTITY
         else:
-            self.matrix = np.array(matrix)
+            self.matrix = tuple([float(v) for v in matrix])
 
     def _setTuple(self, matrix):
-        self.matrix = matrix
+        self.matrix = tuple(matrix)
 
     def _toTuple(self):
-        return self.matrix.tolist()
-    
+        return list(self.matrix)
+
     Tuple = property(_toTuple, _setTuple)
 
     def _setNumpy(self, matrix):
-        self.matrix = np.array(matrix)
-        
-    def _getNumpy(self):
-        return self.matrix
-    
-    numpy = property(_getNumpy, _setNumpy)
+        self.matrix = tuple([float(v) for v in matrix])
 
-    def __add__(self, other_add):
-        (sx1, shy1, shx1, sy1, tx1, ty1) = self._toTuple()
-        (sx2, shy2, shx2, sy2, tx2, ty2) = other_add.Tuple
+    def _getNumpy(self):
+        import numpy
+        return numpy.array(self.matrix)
 
-        return Matrix([sx2, shy1+shy2, shx1+shx2, sy2, tx1+tx2, ty1+ty2])
+    numpy = property(_getNumpy, _setNumpy)
 
+    def __mul__(self, other):
+        return Matrix(multiply(self.matrix, other.matrix))
 
+    def transform_point(self, x, y):
+        (a, b, c, d, e, f) = self.matrix
+        return (a*x + c*y + e, b*x + d*y + f)
 
 
 class Transform(object):
+    '''
+    An affine transform built from translate/rotate/scale/skew calls.
+
+    Every operation is folded into a single 6-float matrix as soon as it
+    is made, so drawing never replays a list of operations. Like
+    NodeBox's transforms, a new operation applies to points before the
+    ones already in the transform; append() adds a transform that applies
+    after, prepend() one that applies before.
+
+    push() and pop() save and restore the matrix, which is the only
+    state kept as a stack.
+
+    The matrix to draw with depends on the grob's center in CENTER mode;
+    it is cached for the last (center, mode) it was asked for, until the
+    transform changes.
+    '''
     def __init__(self, transform=None):
-        self._transforms = []
-        self.stack = []
+        self._matrix = IDENTITY
+        self._saved  = []
+        self._centered_key = None
+        self._centered     = None
 
         if transform is None:
             pass
 
         elif isinstance(transform, Transform):
-            self.append(transform)
+            self._matrix = transform._matrix
+            self._saved  = list(transform._saved)
 
         elif isinstance(transform, (list, tuple)):
-            matrix = tuple(transform)
-            t = Matrix(*matrix)
-            self.append(t)
+            self._matrix = Matrix(transform).matrix
 
         elif isinstance(transform, Matrix):
-            self.append(transform)
+            self._matrix = transform.matrix
 
         else:
             raise Exception("Transform: Don't know how to handle transform %s." % transform)
-        
-        
+
+    def _get_matrix(self):
+        return self._matrix
+    def _set_matrix(self, matrix):
+        self._matrix = tuple(matrix)
+        self._centered_key = None
+    matrix = property(_get_matrix, _set_matrix)
+
+    ## the matrix as a tuple, ready for aggdraw's settransform()
+    affine = property(_get_matrix)
+
+    def _concat(self, matrix):
+        self._matrix = multiply(self._matrix, matrix)
+        self._centered_key = None
+
     def translate(self, x, y):
-        t = ('translate', x, y)
-        self.stack.append(t)
+        self._concat((1.0, 0.0, 0.0, 1.0, x, y))
 
-    def scale(self, x, y):
-        t = ('scale', x, y)
-        self.stack.append(t)
+    def scale(self, x, y=None):
+        if y is None:
+            y = x
+        self._concat((x, 0.0, 0.0, y, 0.0, 0.0))
 
     def rotate(self, a):
-        t = ('rotate', a)
-        self.stack.append(t)
+        ct = cos(a)
+        st = sin(a)
+        self._concat((ct, st, -st, ct, 0.0, 0.0))
 
     def skew(self, x, y):
-        t = ('skew', x, y)
-        self.stack.append(t)
+        ## x and y are angles in radians, as for rotate(): x slants
+        ## vertical lines, y horizontal ones
+        self._concat((1.0, tan(y), tan(x), 1.0, 0.0, 0.0))
 
     def push(self):
-        t = ('push',)
-        self.stack.append(t)
+        self._saved.append(self._matrix)
 
     def pop(self):
-        t = ('pop',)
-        self.stack.append(t)
+        self._matrix = self._saved.pop()
+        self._centered_key = None
 
     def append(self, t):
         if isinstance(t, Transform):
-            for item in t.stack:
-                self.stack.append(item)
+            self._matrix = multiply(t._matrix, self._matrix)
         elif isinstance(t, Matrix):
-            self.stack.append(t)
+            self._matrix = multiply(t.matrix, self._matrix)
         else:
             raise Exception("Transform: Can only append Transforms or Matrices (got %s)" % (t))
+        self._centered_key = None
 
     def prepend(self,t):
         if isinstance(t, Transform):
-            newstack = []
-            for item in t.stack:
-                newstack.append(item)
-            for item in self.stack:
-                newstack.append(item)
-            self.stack = newstack
+            self._matrix = multiply(self._matrix, t._matrix)
         elif isinstance(t, Matrix):
-            self.stack.insert(0,t)
+            self._matrix = multiply(self._matrix, t.matrix)
         else:
-            raise Exception("Transform: Can only append Transforms or Matrices (got %s)" % (t))
+            raise Exception("Transform: Can only prepend Transforms or Matrices (got %s)" % (t))
+        self._centered_key = None
 
     def copy(self):
         return self.__class__(self)
 
     def __iter__(self):
-        for value in self.stack:
+        for value in self._matrix:
             yield value
 
-    def __iter__(self):
-        for value in self.matrix:
-            yield value
-
-    def transform_point(self, x, y, matrix):
-        (sx, shy, shx, sy, tx, ty) = matrix.tolist()
-        deltax = x * sx  +  y * shx + tx
-        deltay = x * shy +  y * sy  + ty
-        return (x-deltax, y-deltay)
+    def transform_point(self, x, y, matrix=None):
+        (sx, shy, shx, sy, tx, ty) = matrix or self._matrix
+        return (x * sx + y * shx + tx, x * shy + y * sy + ty)
 
     def getMatrixWCenter(self, x, y, mode):
-        centerx = x
-        centery = y
-
-        m_archived = []
-
-        m = Matrix()
-
-        for trans in self.stack: 
-            if isinstance(trans, tuple) and trans[0] in TRANSFORMS:
-                ## parse transform command
-                cmd  = trans[0]
-                args = trans[1:]
-                
-                if cmd == 'translate':       
-                    xt = args[0]
-                    yt = args[1]
-                    
-                    m += Matrix([1.0, 0.0, 0.0, 1.0,  xt,  yt])
-
-                elif cmd == 'rotate':
-                    if mode == 'corner':                        
-                        # apply existing transform to cornerpoint
-                        deltax, deltay = m.transform_point(0, 0)
-                        
-                        a = args[0]
-
-                        ct = cos(a)
-                        st = sin(a)
-
-                        m += Matrix([ct, st, -st, ct, deltax - (ct*deltax) + (st*deltay), deltay-(st*deltax)-(ct*deltay)]) 
-
-                    if mode == 'center':
-                        ## apply existing transform to centerpoint
-                        ## sx(1.0), shy(0.0), shx(0.0), sy(1.0), tx(0.0), ty(0.0)
-
-                        radians = args[0]
-                        m_ = np.array([cos(radians), sin(radians), -sin(radians), cos(radians), 0, 0])
-                        (deltax, deltay) = self.transform_point(centerx, centery, m_)
-
-                        m += Matrix([cos(radians), sin(radians), -sin(radians), cos(radians), deltax, deltay])
-
-                elif cmd == 'scale':
-                    if mode == 'corner':
-                        self.scale(args[0], args[1])
-                        #m *= t
-
-                    elif mode == 'center':
-                        # apply existing transform to centerpoint
-                        #deltax, deltay = m.transform_point(centerx, centery)
-                        m += Matrix((x, 0, 0, y, 0, 0))
-
-                elif cmd == 'skew':
-                    if mode == 'corner':
-                        x, y = args
-                        ## TODO: x and y should be the tangent of an angle
-                        t *= Matrix(1,0,x,1,0,0)
-                        t *= Matrix(1,y,0,1,0,0)
-                        m *= t
-                    elif mode == 'center':
-                        # apply existing transform to centerpoint
-                        deltax, deltay = m.transform_point(centerx, centery)
-                        x,y = args
-                        m1 = cairo.Matrix()
-                        m2 = cairo.Matrix()
-                        m1.translate(-deltax, -deltay)
-                        m2.translate(deltax, deltay)
-                        t *= m
-                        t *= m1
-                        t *= cairo.Matrix(1,0,x,1,0,0)
-                        t *= cairo.Matrix(1,y,0,1,0,0)
-                        t *= m2
-                        m = t
-
-                elif cmd == 'push':
-                    m_archived.append(m)
-
-                elif cmd == 'pop':
-                    m = m_archived.pop()
-        
-        
-        if isinstance(m, Matrix):
-            return m.Tuple
-        else:
-            return m.tolist()
+        '''
+        Returns the matrix to draw with, as a tuple. In CENTER mode the
+        transform is applied around (x, y): the point is moved to the
+        origin, transformed, and moved back.
+        '''
+        key = (x, y, mode)
+        if self._centered_key != key:
+            (a, b, c, d, e, f) = self._matrix
+            if mode == CENTER:
+                e = e + x - (a*x + c*y)
+                f = f + y - (b*x + d*y)
+            self._centered = (a, b, c, d, e, f)
+            self._centered_key = key
+        return self._centered
 
     def get_matrix(self):
         '''
         Returns this transform's matrix. Its centerpoint is presumed to be (0,0).
         '''
 
-        return self.getMatrixWCenter(0,0)
+        return self.getMatrixWCenter(0, 0, 'corner')
@@ -0,0 +1,56 @@
+from collections import OrderedDict
+
+class LRUCache:
+    '''
+    A bounded mapping that evicts the least recently used entry once
+    it holds more than maxsize items.
+
+    Keeps hit/miss counters so callers can check how well the cache
+    is doing.
+    '''
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.data    = OrderedDict()
+        self.hits    = 0
+        self.misses  = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, factory=None):
+        '''
+        Returns the cached value for key. On a miss, factory() is called
+        to build the value, which is then stored; without a factory a miss
+        returns None.
+        '''
+        try:
+            value = self.data.pop(key)
+        except KeyError:
+            self.misses += 1
+            if factory is None:
+                return None
+            value = factory()
+            self.put(key, value)
+            return value
+
+        ## re-inserting moves the key to the most recently used end
+        self.data[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.data.pop(key, None)
+        self.data[key] = value
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def clear(self):
+        self.data.clear()
+        self.hits   = 0
+        self.misses = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.data)}
@@ -0,0 +1,301 @@
+'''
+The font registry: the installed TrueType fonts, by file, short name and
+family, found once per process.
+
+Reading the name records means opening every font file with fontTools,
+so the results are kept in an index on disk (~/.pypaint/fonts.json, or
+$PYPAINT_FONT_INDEX) keyed on the file path and its mtime. Only new and
+changed files are read again; after that, looking a font up is a dict
+lookup:
+
+    from pypaint.utils.fonts import registry
+    registry().lookup("DejaVu Sans")    # -> '/usr/share/fonts/...ttf'
+
+handle() shares one fontTools TTFont per file across the process, and
+textsize() measures text from the font tables, without a surface.
+'''
+from pypaint.utils.cache import LRUCache
+
+import glob
+import json
+import os
+
+FONT_PATHS = ["/usr/share/fonts/truetype/*/*.ttf"]
+
+## bumped when the entries change shape, so old indexes are rebuilt
+INDEX_VERSION = 1
+
+FONT_SPECIFIER_NAME_ID   = 4
+FONT_SPECIFIER_FAMILY_ID = 1
+
+def defaultIndex():
+    return os.environ.get("PYPAINT_FONT_INDEX",
+                          os.path.expanduser(os.path.join("~", ".pypaint", "fonts.json")))
+
+def readNames(font_handle):
+    '''
+    Returns the (full name, family) of a fontTools TTFont.
+    '''
+    name   = ""
+    family = ""
+    for record in font_handle['name'].names:
+        if record.nameID == FONT_SPECIFIER_NAME_ID and not name:
+            if '\000' in record.string:
+                name = unicode(record.string, 'utf-16-be').encode('utf-8')
+            else:
+                name = record.string
+        elif record.nameID == FONT_SPECIFIER_FAMILY_ID and not family:
+            if '\000' in record.string:
+                family = unicode(record.string, 'utf-16-be').encode('utf-8')
+            else:
+                family = record.string
+        if name and family:
+            break
+    return name, family
+
+class FontRegistry:
+    '''
+    Maps font names to files. An entry holds the names and the basic
+    metrics of a file, in font units:
+
+        {"mtime": ..., "name": "DejaVu Sans Bold", "family": "DejaVu Sans",
+         "units_per_em": 2048, "ascent": 1901, "descent": -483, "line_gap": 0}
+
+    With index=None nothing is read from or written to disk.
+    '''
+    def __init__(self, patterns=FONT_PATHS, index=None):
+        self.patterns = patterns
+        self.index    = index
+
+        self.entries      = {}
+        self.font_by_name = {}
+        self.families     = {}
+        self.scanned      = False
+
+        ## font files read on the last refresh(), for checking the index
+        self.reads = 0
+
+    def refresh(self):
+        '''
+        Finds the font files again, reading only those the index has no
+        entry for at their current mtime, and saves the index if anything
+        changed.
+        '''
+        known = self.load()
+
+        entries = {}
+        for pattern in self.patterns:
+            for file in glob.glob(pattern):
+                try:
+                    mtime = os.path.getmtime(file)
+                except OSError:
+                    continue
+
+                entry = known.get(file)
+                if entry is None or entry["mtime"] != mtime:
+                    try:
+                        entry = self.read(file)
+                    except Exception:
+                        ## not a font fontTools can read
+                        continue
+                    entry["mtime"] = mtime
+                    self.reads += 1
+                entries[file] = entry
+
+        if entries != known:
+            self.save(entries)
+        self.update(entries)
+        self.scanned = True
+
+    def read(self, file):
+        from fontTools.ttLib import TTFont
+
+        font_handle = TTFont(file)
+        name, family = readNames(font_handle)
+        hhea = font_handle['hhea']
+        return {
+            "name":         name,
+            "family":       family,
+            "units_per_em": font_handle['head'].unitsPerEm,
+            "ascent":       hhea.ascent,
+            "descent":      hhea.descent,
+            "line_gap":     hhea.lineGap,
+        }
+
+    def update(self, entries):
+        self.entries      = entries
+        self.font_by_name = {}
+        self.families     = {}
+
+        ## sorted, so the same name always picks the same file
+        for file in sorted(entries):
+            entry = entries[file]
+            if not self.font_by_name.has_key(entry["name"]):
+                self.font_by_name[entry["name"]] = file
+            family = entry["family"]
+            ## the regular face, named after the family, wins
+            if not self.families.has_key(family) or entry["name"] == family:
+                self.families[family] = file
+
+    def load(self):
+        if self.index is None:
+            return {}
+        try:
+            data = json.load(open(self.index))
+        except (IOError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return {}
+        fonts = {}
+        ## json hands back unicode
+        for file, entry in data.get("fonts", {}).iteritems():
+            for key in ("name", "family"):
+                entry[key] = entry[key].encode('utf-8')
+            fonts[file.encode('utf-8')] = entry
+        return fonts
+
+    def save(self, entries):
+        if self.index is None:
+            return
+        ## written aside and renamed, so readers never see half an index
+        temp = "%s.%d" % (self.index, os.getpid())
+        try:
+            directory = os.path.dirname(self.index)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            output = open(temp, "w")
+            json.dump({"version": INDEX_VERSION, "fonts": entries}, output, sort_keys=True)
+            output.close()
+            os.rename(temp, self.index)
+        except (IOError, OSError):
+            ## a read-only home still gets the fonts, just not the index
+            pass
+
+    def _get_fonts(self):
+        if not self.scanned:
+            self.refresh()
+        fonts = {}
+        for file, entry in self.entries.iteritems():
+            fonts[file] = entry["name"]
+        return fonts
+    fonts = property(_get_fonts)
+
+    def lookup(self, name):
+        '''
+        Returns the file of the font with the given full name or family
+        name, or None.
+        '''
+        if not self.scanned:
+            self.refresh()
+        return self.font_by_name.get(name) or self.families.get(name)
+
+    def metrics(self, file):
+        '''
+        Returns the index entry of file, or None for unknown files.
+        '''
+        if not self.scanned:
+            self.refresh()
+        return self.entries.get(file)
+
+## open fontTools handles by file; tables are parsed on first access,
+## so everything sharing a handle shares the parsed tables
+_handles = {}
+
+def handle(file):
+    '''
+    Returns the fontTools TTFont of file, opened once per process.
+    '''
+    font_handle = _handles.get(file)
+    if font_handle is None:
+        from fontTools.ttLib import TTFont
+        font_handle = _handles[file] = TTFont(file)
+    return font_handle
+
+class FontMetrics:
+    '''
+    The horizontal metrics of a font, in font units: advance widths,
+    kerning pairs and the hhea ascent, descent and line gap.
+    '''
+    def __init__(self, font_handle):
+        self.units_per_em = font_handle['head'].unitsPerEm
+
+        hhea = font_handle['hhea']
+        self.ascent   = hhea.ascent
+        self.descent  = hhea.descent
+        self.line_gap = hhea.lineGap
+
+        ## character code -> glyph name, from the Unicode cmap
+        cmap  = font_handle['cmap']
+        table = cmap.getcmap(3, 10) or cmap.getcmap(3, 1) or cmap.getcmap(0, 3) or cmap.tables[0]
+        self.glyphs   = table.cmap
+        self.advances = font_handle['hmtx'].metrics
+
+        ## (left glyph, right glyph) -> adjustment; only the classic
+        ## kern table, GPOS kerning is not read
+        self.kerning = {}
+        if font_handle.has_key('kern'):
+            for kern_table in font_handle['kern'].kernTables:
+                if getattr(kern_table, 'format', 0) == 0:
+                    self.kerning.update(kern_table.kernTable)
+
+    def advance(self, string):
+        '''
+        Returns the advance width of string, kerned. Characters the font
+        has no glyph for take no room, as in Draw.textsize().
+        '''
+        glyphs   = self.glyphs
+        advances = self.advances
+        kerning  = self.kerning
+
+        width = 0
+        previous = None
+        for char in string:
+            name = glyphs.get(ord(char))
+            if name is None:
+                continue
+            width += advances[name][0]
+            if previous is not None and kerning:
+                width += kerning.get((previous, name), 0)
+            previous = name
+        return width
+
+    def textsize(self, string, size):
+        '''
+        Returns the (width, height) of string at size pixels per em: the
+        kerned advance width and the line height.
+        '''
+        scale = float(size) / self.units_per_em
+        return (self.advance(string) * scale,
+                (self.ascent - self.descent + self.line_gap) * scale)
+
+_metrics = {}
+
+def fontMetrics(file):
+    '''
+    Returns the FontMetrics of file, read once per process.
+    '''
+    metrics = _metrics.get(file)
+    if metrics is None:
+        metrics = _metrics[file] = FontMetrics(handle(file))
+    return metrics
+
+## (file, size, string) -> (width, height)
+text_sizes = LRUCache(4096)
+
+def textsize(file, size, string):
+    '''
+    Returns the (width, height) in pixels of string set in the font file
+    at size, like aggdraw's Draw.textsize() but kerned, without hinting
+    and without a surface to measure on. Results are memoized.
+    '''
+    return text_sizes.get((file, size, string),
+                          lambda: fontMetrics(file).textsize(string, size))
+
+## the process-wide registry
+_registry = None
+
+def registry():
+    global _registry
+    if _registry is None:
+        _registry = FontRegistry(index=defaultIndex())
+    return _registry
@@ -0,0 +1,159 @@
+'''
+Opt-in render instrumentation.
+
+A canvas with a RenderStats in its profiler attribute counts the grobs
+it draws and times the stages of a frame:
+
+    compile     building native aggdraw paths
+    style       looking up or building pens, brushes and fonts
+    transform   computing the matrices grobs are drawn with
+    rasterize   aggdraw drawing calls
+    flush       copying the surface into the PIL image
+    encode      tostring() for gtk and saving output files
+    draw        the whole draw() call
+
+Counts are kept per grob type ('path', 'text', 'image') plus 'culled',
+and the time spent on each grob type, outside of batched rasterizing,
+is kept under its name too. Without a profiler the canvas only pays for
+an "if profile:" test at each stage.
+
+A frame runs from one draw() to the next, so it includes the encoding
+of its output. With a log, every finished frame is written to it as a
+line of JSON:
+
+    {"frame": 12, "counts": {"path": 530, ...}, "times": {"rasterize": 0.011, ...}}
+'''
+from time import time
+
+import json
+
+class RenderStats:
+    def __init__(self, log=None):
+        self.frames = 0
+        self.counts = {}
+        self.times  = {}
+
+        ## the frame being drawn
+        self.frame_counts = {}
+        self.frame_times  = {}
+
+        self.log  = log
+        self.file = None
+
+    def count(self, name, n=1):
+        counts = self.frame_counts
+        counts[name] = counts.get(name, 0) + n
+
+    def add(self, name, seconds):
+        times = self.frame_times
+        times[name] = times.get(name, 0.0) + seconds
+
+    def lap(self, name, since):
+        '''
+        Adds the time since since to name and returns the current time,
+        to start the next lap from.
+        '''
+        now = time()
+        times = self.frame_times
+        times[name] = times.get(name, 0.0) + (now - since)
+        return now
+
+    def begin_frame(self):
+        if self.frame_counts or self.frame_times:
+            self.end_frame()
+
+    def end_frame(self):
+        for name, n in self.frame_counts.iteritems():
+            self.counts[name] = self.counts.get(name, 0) + n
+        for name, seconds in self.frame_times.iteritems():
+            self.times[name] = self.times.get(name, 0.0) + seconds
+
+        if self.log is not None:
+            if self.file is None:
+                if isinstance(self.log, basestring):
+                    self.file = open(self.log, "a")
+                else:
+                    self.file = self.log
+            line = {"frame": self.frames, "counts": self.frame_counts, "times": self.frame_times}
+            self.file.write(json.dumps(line, sort_keys=True) + "\n")
+
+        self.frames += 1
+        self.frame_counts = {}
+        self.frame_times  = {}
+
+    def as_dict(self):
+        '''
+        Returns the totals, including the frame in progress.
+        '''
+        counts = dict(self.counts)
+        for name, n in self.frame_counts.iteritems():
+            counts[name] = counts.get(name, 0) + n
+        times = dict(self.times)
+        for name, seconds in self.frame_times.iteritems():
+            times[name] = times.get(name, 0.0) + seconds
+
+        frames = self.frames
+        if self.frame_counts or self.frame_times:
+            frames += 1
+        return {"frames": frames, "counts": counts, "times": times}
+
+    def close(self):
+        '''
+        Finishes the frame in progress and closes a log opened by name.
+        '''
+        self.begin_frame()
+        if self.file is not None:
+            if isinstance(self.log, basestring):
+                self.file.close()
+            else:
+                self.file.flush()
+            self.file = None
+
+class StatsMixin:
+    '''
+    The stats switches of a canvas; drawing code reads self.profiler.
+    '''
+    profiler = None
+
+    def enable_stats(self, log=None):
+        self.disable_stats()
+        self.profiler = RenderStats(log)
+        return self.profiler
+
+    def disable_stats(self):
+        if self.profiler is not None:
+            self.profiler.close()
+            self.profiler = None
+
+    def stats(self):
+        '''
+        Returns the counts and times recorded so far as a dict, empty
+        when stats are disabled.
+        '''
+        if self.profiler is None:
+            return {}
+        return self.profiler.as_dict()
+
+class profiled:
+    '''
+    Records stats for the draws inside a with block:
+
+        with profiled(canvas, "frames.jsonl") as stats:
+            for i in range(100):
+                draw_frame(canvas)
+        print stats.as_dict()
+    '''
+    def __init__(self, canvas, log=None):
+        self.canvas = canvas
+        self.log    = log
+
+    def __enter__(self):
+        self.saved = self.canvas.profiler
+        self.stats = RenderStats(self.log)
+        self.canvas.profiler = self.stats
+        return self.stats
+
+    def __exit__(self, *exc_info):
+        self.canvas.profiler = self.saved
+        self.stats.close()
+        return False
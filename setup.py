@@ -52,6 +52,11 @@ Supershape  = Extension("pypaint.cSuperformula", sources = ["ext/supershape/supe
 
 modules     = [Aggdraw, Geometry, Pathmatics, Supershape]
 
+if FREETYPE:
+    ## the font engine the glyph atlas renders with
+    FontEngine = Extension("pypaint.ft2", sources = ["ext/font_engine/ft2module.c"], libraries=["freetype"], include_dirs=[os.path.join(FREETYPE_ROOT, "include/freetype2")])
+    modules.append(FontEngine)
+
 if FFTW:
     Fluids  = Extension("pypaint.cFluid", sources = ["ext/fluid/fluid.c"], libraries=['fftw', 'rfftw'], library_dirs=['/usr/lib', '/usr/local/lib'])
     modules.append(Fluids)